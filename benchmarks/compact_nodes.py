@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+"""Compares the doctrees with/without apiblueprint_compact
+
+Measures the number of nodes, the size of the pickled doctree and the time
+to build the document as HTML.
+
+Usage: python benchmarks/compact_nodes.py [number of actions] [responses per action]
+"""
+import os
+import sys
+import time
+import pickle
+import shutil
+import tempfile
+from sphinx.application import Sphinx
+
+RESPONSE = ("+ Response %d (application/json)\n"
+            "    + Headers\n"
+            "\n"
+            "            X-Request-Id: %d\n"
+            "\n"
+            "    + Body\n"
+            "\n"
+            "            {\"id\": %d}\n"
+            "\n")
+
+
+def generate(srcdir, actions, responses):
+    with open(os.path.join(srcdir, 'conf.py'), 'w') as fd:
+        fd.write("extensions = ['sphinxcontrib.apiblueprint']\n")
+
+    with open(os.path.join(srcdir, 'index.rst'), 'w') as fd:
+        fd.write("API\n===\n\n.. apiblueprint:: api.md\n")
+
+    with open(os.path.join(srcdir, 'api.md'), 'w') as fd:
+        fd.write("# Example API\n")
+        for i in range(actions):
+            fd.write("## GET /items/%d\n" % i)
+            for j in range(responses):
+                fd.write(RESPONSE % (200 + j, j, j))
+
+
+def measure(actions, responses, compact):
+    srcdir = tempfile.mkdtemp()
+    try:
+        generate(srcdir, actions, responses)
+        outdir = os.path.join(srcdir, '_build')
+        app = Sphinx(srcdir, srcdir, outdir, os.path.join(outdir, '.doctrees'), 'html',
+                     confoverrides={'apiblueprint_compact': compact, 'apiblueprint_html_cache': False},
+                     status=None, warning=None, freshenv=True)
+
+        started = time.time()
+        app.build()
+        elapsed = time.time() - started
+
+        doctree = app.env.get_doctree('index')
+        count = len(list(doctree.traverse()))
+        size = len(pickle.dumps(doctree, pickle.HIGHEST_PROTOCOL))
+        return count, size, elapsed
+    finally:
+        shutil.rmtree(srcdir)
+
+
+def main(argv=sys.argv[1:]):
+    actions = int(argv[0]) if argv else 200
+    responses = int(argv[1]) if len(argv) > 1 else 10
+    for compact in (False, True):
+        count, size, elapsed = measure(actions, responses, compact)
+        print('%-8s: %d nodes, pickle %.1f KB, build %.2fs' %
+              ('compact' if compact else 'default', count, size / 1024.0, elapsed))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+"""Measures the time to import sphinxcontrib.apiblueprint and to set it up
+
+The setup is measured in a Sphinx application, so the modules Sphinx loads
+by itself (e.g. ``sphinx.builders``) are not counted.
+
+Usage: python benchmarks/import_time.py [repeat]
+"""
+import subprocess
+import sys
+
+SCRIPT = """
+import os, sys, time, tempfile
+started = time.time()
+import sphinxcontrib.apiblueprint
+imported = time.time() - started
+heavy = [name for name in ('recommonmark', 'docutils.core', 'sphinxcontrib.apiblueprint.translator')
+         if name in sys.modules]
+
+from sphinx.application import Sphinx
+srcdir = tempfile.mkdtemp()
+open(os.path.join(srcdir, 'conf.py'), 'w').close()
+app = Sphinx(srcdir, srcdir, os.path.join(srcdir, '_build'), os.path.join(srcdir, '_doctrees'), 'html',
+             status=None, warning=None)
+started = time.time()
+app.setup_extension('sphinxcontrib.apiblueprint')
+print('%f %f %s' % (imported, time.time() - started, ','.join(heavy)))
+"""
+
+
+def measure(repeat):
+    imports = []
+    setups = []
+    for _ in range(repeat):
+        output = subprocess.check_output([sys.executable, '-c', SCRIPT]).decode('utf-8').split()
+        imports.append(float(output[0]))
+        setups.append(float(output[1]))
+        loaded = output[2] if len(output) > 2 else ''
+
+    return sorted(imports), sorted(setups), loaded
+
+
+def report(title, timings):
+    print(title)
+    print('  min: %.2f ms, median: %.2f ms, max: %.2f ms' %
+          (timings[0] * 1000, timings[len(timings) // 2] * 1000, timings[-1] * 1000))
+
+
+def main(argv=sys.argv[1:]):
+    repeat = int(argv[0]) if argv else 10
+    imports, setups, loaded = measure(repeat)
+    report('import sphinxcontrib.apiblueprint (%d runs)' % repeat, imports)
+    print('  parsing stack loaded on import: %s' % (loaded or 'none'))
+    report('app.setup_extension() (%d runs)' % repeat, setups)
+
+
+if __name__ == '__main__':
+    main()
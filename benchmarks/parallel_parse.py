@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+"""Measures reading time of a large blueprint with apiblueprint_parallel_jobs
+
+Usage: python benchmarks/parallel_parse.py [number of groups] [actions per group]
+"""
+import os
+import sys
+import time
+import shutil
+import tempfile
+import multiprocessing
+from sphinx.application import Sphinx
+
+ACTION = ("## GET /groups/%d/items/%d\n"
+          "+ Response 200 (application/json)\n"
+          "\n"
+          "        {\"id\": %d, \"name\": \"item\"}\n"
+          "\n")
+
+
+def generate(srcdir, groups, actions):
+    with open(os.path.join(srcdir, 'conf.py'), 'w') as fd:
+        fd.write("extensions = ['sphinxcontrib.apiblueprint']\n")
+
+    with open(os.path.join(srcdir, 'index.rst'), 'w') as fd:
+        fd.write("API\n===\n\n.. apiblueprint:: api.md\n")
+
+    with open(os.path.join(srcdir, 'api.md'), 'w') as fd:
+        fd.write("# Example API\n")
+        for i in range(groups):
+            fd.write("# Group Group%d\n" % i)
+            for j in range(actions):
+                fd.write(ACTION % (i, j, j))
+
+
+def measure(srcdir, jobs):
+    outdir = os.path.join(srcdir, '_build', str(jobs))
+    app = Sphinx(srcdir, srcdir, outdir, os.path.join(outdir, '.doctrees'), 'dummy',
+                 confoverrides={'apiblueprint_parallel_jobs': jobs},
+                 status=None, warning=None, freshenv=True)
+
+    start = time.time()
+    app.build()
+    return time.time() - start
+
+
+def main(argv=sys.argv[1:]):
+    groups = int(argv[0]) if argv else 16
+    actions = int(argv[1]) if len(argv) > 1 else 250
+    srcdir = tempfile.mkdtemp()
+    try:
+        generate(srcdir, groups, actions)
+        for jobs in sorted(set([1, multiprocessing.cpu_count()])):
+            print('jobs=%-3d: %.2f sec' % (jobs, measure(srcdir, jobs)))
+    finally:
+        shutil.rmtree(srcdir)
+
+
+if __name__ == '__main__':
+    main()
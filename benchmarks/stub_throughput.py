@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+"""Measures throughput of apiblueprint-stub on localhost
+
+The server runs in a separate process; the clients keep keep-alive
+connections and send pipelined requests to static and templated URIs.
+
+Usage: python benchmarks/stub_throughput.py [number of actions] [seconds] [connections]
+"""
+import os
+import sys
+import time
+import shutil
+import asyncio
+import tempfile
+import multiprocessing
+from sphinxcontrib.apiblueprint.stub import build_routes, load_blueprint, serve
+
+ACTIONS = ("## GET /items/%d\n"
+           "+ Response 200 (application/json)\n"
+           "\n"
+           "        {\"id\": %d, \"name\": \"item\"}\n"
+           "\n"
+           "## GET /items/%d/children/{child_id}\n"
+           "+ Response 200 (application/json)\n"
+           "\n"
+           "        {\"id\": %d, \"children\": []}\n"
+           "\n")
+PIPELINE = 32
+
+
+def generate(srcdir, actions):
+    with open(os.path.join(srcdir, 'api.md'), 'w') as fd:
+        fd.write("# Example API\n# Group Items\n")
+        for i in range(actions):
+            fd.write(ACTIONS % (i, i, i, i))
+
+
+def run_server(srcdir, queue):
+    routes = build_routes([load_blueprint(srcdir, 'api.md')])
+    serve(routes, '127.0.0.1', 0, queue.put)
+
+
+async def run_client(port, batch, size, deadline, counter):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    while time.time() < deadline:
+        writer.write(batch)
+        await reader.readexactly(size)
+        counter[0] += PIPELINE
+    writer.close()
+
+
+async def run_clients(port, batches, seconds, connections):
+    counter = [0]
+    deadline = time.time() + seconds
+    await asyncio.gather(*[run_client(port, batch, size, deadline, counter)
+                           for batch, size in batches[:connections]])
+    return counter[0]
+
+
+def main(argv=sys.argv[1:]):
+    actions = int(argv[0]) if argv else 1000
+    seconds = float(argv[1]) if len(argv) > 1 else 5
+    connections = int(argv[2]) if len(argv) > 2 else 8
+
+    srcdir = tempfile.mkdtemp()
+    try:
+        generate(srcdir, actions)
+        routes = build_routes([load_blueprint(srcdir, 'api.md')])
+
+        # each connection requests different URIs; half of them match URI templates
+        batches = []
+        for i in range(connections):
+            targets = [b'/items/%d' % ((i * PIPELINE + j) % actions) for j in range(PIPELINE)]
+            targets = [target + b'/children/1' if j % 2 else target for j, target in enumerate(targets)]
+            batch = b''.join(b'GET %s HTTP/1.1\r\nHost: localhost\r\n\r\n' % target for target in targets)
+            size = sum(len(routes.lookup(b'GET', target)) for target in targets)
+            batches.append((batch, size))
+
+        queue = multiprocessing.Queue()
+        server = multiprocessing.Process(target=run_server, args=(srcdir, queue))
+        server.start()
+        try:
+            port = queue.get(timeout=60)
+            count = asyncio.run(run_clients(port, batches, seconds, connections))
+        finally:
+            server.terminate()
+            server.join()
+
+        print('%d actions, %d connections: %.0f requests/s' % (actions * 2, connections, count / seconds))
+    finally:
+        shutil.rmtree(srcdir)
+
+
+if __name__ == '__main__':
+    main()
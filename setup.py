@@ -32,5 +32,18 @@ setup(
     packages=find_packages(),
     include_package_data=True,
     install_requires=requires,
+    extras_require={
+        'validation': ['jsonschema'],
+    },
     namespace_packages=['sphinxcontrib'],
+    entry_points={
+        'console_scripts': [
+            'apiblueprint-compile = sphinxcontrib.apiblueprint.compiler:main',
+            'apiblueprint-preview = sphinxcontrib.apiblueprint.preview:main',
+            'apiblueprint-daemon = sphinxcontrib.apiblueprint.daemon:main',
+            'apiblueprint-affected = sphinxcontrib.apiblueprint.includes:main',
+            'apiblueprint-changelog = sphinxcontrib.apiblueprint.changelog:main',
+            'apiblueprint-stub = sphinxcontrib.apiblueprint.stub:main',
+        ],
+    },
 )
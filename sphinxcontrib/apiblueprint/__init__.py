@@ -1,7 +1,76 @@
 # -*- coding: utf-8 -*-
-from sphinxcontrib.apiblueprint.directive import ApiBlueprintDirective
+import sphinx
+from importlib import import_module
+
+
+def lazy_handler(modname, funcname):
+    """Returns an event handler which imports the feature module on the first call"""
+    def handler(*args):
+        module = import_module('sphinxcontrib.apiblueprint.' + modname)
+        return getattr(module, funcname)(*args)
+
+    return handler
 
 
 def setup(app):
+    # the modules are imported here to keep import of this package light
+    from sphinxcontrib.apiblueprint import collector, compact, directive, endpoints, lint, search
+    from sphinxcontrib.apiblueprint.addnodes import CompactPayload, EndpointIndex, SearchBox
+    from sphinxcontrib.apiblueprint.directive import ApiBlueprintDirective
+    from sphinxcontrib.apiblueprint.openapi import ApiBlueprintOpenAPIBuilder
+    from sphinxcontrib.apiblueprint.parser import ApiBlueprintParser
+    from sphinxcontrib.apiblueprint.split import generate_group_documents
+
     app.add_directive('apiblueprint', ApiBlueprintDirective)
+    app.add_directive('apiblueprint-endpoints', endpoints.ApiBlueprintEndpointsDirective)
+    app.add_directive('apiblueprint-search', search.ApiBlueprintSearchDirective)
+    if sphinx.version_info >= (1, 8):
+        app.add_source_suffix('.apib', 'apiblueprint')
+        app.add_source_parser(ApiBlueprintParser)
+    else:
+        app.add_source_parser('.apib', ApiBlueprintParser)
+    app.add_node(CompactPayload,
+                 html=(compact.visit_compact_payload_html, compact.depart_compact_payload_html),
+                 latex=(compact.visit_compact_payload_latex, compact.depart_compact_payload_latex))
+    app.add_node(EndpointIndex)
+    app.add_node(SearchBox, html=(search.visit_search_box_html, search.depart_search_box_html))
+    app.add_builder(lint.ApiBlueprintLintBuilder)
+    app.add_builder(ApiBlueprintOpenAPIBuilder)
+    app.add_config_value('apiblueprint_export_json', False, '')
+    app.add_config_value('apiblueprint_include_graph', False, '')
+    app.add_config_value('apiblueprint_manifest', False, 'env')
+    app.add_config_value('apiblueprint_daemon_socket', None, '')
+    app.add_config_value('apiblueprint_parallel_jobs', 1, '')
+    app.add_config_value('apiblueprint_html_cache', False, 'html')
+    app.add_config_value('apiblueprint_html_cache_size', 10000, 'html')
+    app.add_config_value('apiblueprint_compact', False, 'env')
+    app.add_config_value('apiblueprint_validate_bodies', False, 'env')
+    app.add_config_value('apiblueprint_search_index', False, 'html')
     app.setup_extension('sphinxcontrib.httpdomain')
+    app.connect('builder-inited', generate_group_documents)
+    app.connect('builder-inited', directive.on_builder_inited)
+    app.connect('builder-inited', lazy_handler('htmlcache', 'on_builder_inited'))
+    app.connect('env-before-read-docs', collector.on_env_before_read_docs)
+    app.connect('env-purge-doc', collector.on_env_purge_doc)
+    app.connect('env-merge-info', collector.on_env_merge_info)
+    app.connect('env-purge-doc', endpoints.on_env_purge_doc)
+    app.connect('env-merge-info', endpoints.on_env_merge_info)
+    app.connect('env-updated', endpoints.on_env_updated)
+    app.connect('missing-reference', collector.on_missing_reference)
+    app.connect('doctree-resolved', collector.on_doctree_resolved)
+    app.connect('doctree-resolved', compact.on_doctree_resolved)
+    app.connect('doctree-resolved', endpoints.on_doctree_resolved)
+    app.connect('doctree-resolved', search.on_doctree_resolved)
+    app.connect('html-page-context', search.on_html_page_context)
+    app.connect('build-finished', lazy_handler('elements', 'on_build_finished'))
+    app.connect('build-finished', lazy_handler('includes', 'on_build_finished'))
+    app.connect('build-finished', lazy_handler('changelog', 'on_build_finished'))
+    app.connect('build-finished', lazy_handler('htmlcache', 'on_build_finished'))
+    app.connect('build-finished', search.on_build_finished)
+    app.connect('build-finished', directive.on_build_finished)
+    app.connect('build-finished', lint.on_build_finished)
+
+    return {
+        'parallel_read_safe': True,
+        'parallel_write_safe': True,
+    }
@@ -4,7 +4,7 @@ from docutils import nodes
 from textwrap import dedent
 from sphinx import addnodes as sphinxnodes
 from sphinxcontrib.apiblueprint.utils import (
-    HTTP_METHODS, extract_option, get_children, transpose_subnodes
+    HTTP_METHODS, MODEL_REFERENCE, extract_option, get_children, transpose_subnodes
 )
 
 
@@ -12,15 +12,42 @@ class ParseError(Exception):
     pass
 
 
+class CompactPayload(nodes.General, nodes.Element):
+    """A Request or Response rendered in compact mode
+
+    The title, headers, body and schema are kept as attributes; the children
+    are the description of the payload.
+    """
+    pass
+
+
+class EndpointIndex(nodes.General, nodes.Element):
+    """A placeholder of the endpoint table; replaced on doctree-resolved"""
+    pass
+
+
+class SearchBox(nodes.General, nodes.Element):
+    """A search box of endpoints; rendered only by HTML builders"""
+    pass
+
+
 class Section(nodes.Element):
     @classmethod
     def parse_node(cls, node):
 
         section = cls(**node.attributes)
+        children = node[:]
         transpose_subnodes(node, section)
-        section.validate()
-        section.parse_title()
-        section.parse_content()
+        try:
+            section.validate()
+            section.parse_title()
+            section.parse_content()
+        except Exception:
+            # restore the original node to keep translating the rest of document
+            section.children = []
+            node.extend(children)
+            raise
+
         return section
 
     def parse_title(self):
@@ -91,9 +118,16 @@ class PayloadSection(Section):
     def parse_content(self):
         """restructs nested sections:
 
+        * take a reference to Resource Model (``[<identifier>][]``) out of contents
         * consider the contents as Body section if no nested sections
         * merge content-type to Header section
         """
+        if len(self) == 1 and isinstance(self[0], nodes.paragraph):
+            matched = MODEL_REFERENCE.match(self[0].astext().strip())
+            if matched:
+                self['model_ref'] = matched.group(1)
+                self.pop(0)
+
         if len(self) > 0 and not get_children(self, Section):
             body = Body()
             transpose_subnodes(self, body)
@@ -134,24 +168,40 @@ class ResourceGroup(Section):
 
 
 class Resource(Section):
-    def parse_title(self):
-        title = self.pop(0).astext()
+    @classmethod
+    def parse_node(cls, node):
+        try:
+            return super(Resource, cls).parse_node(node)
+        except Exception:
+            # the actions are still translated; give them the URI in the heading
+            _, uri = cls.parse_heading(node[0].astext())
+            for action in node.traverse(Action):
+                if action.get('uri') is None:
+                    action['uri'] = uri
+            raise
+
+    @staticmethod
+    def parse_heading(title):
+        """Returns a pair of the identifier and the URI template in the heading"""
         parts = title.split()
-        option = extract_option(title)
         if len(parts) == 1:
             # <URI template>
-            self['identifier'] = ''
-            self['uri'] = parts[0]
+            return '', parts[0]
         else:
             # <identifier> [<URI template>]
-            self['identifier'] = re.sub('\s*\[(.*)\]$', '', title)
-            self['uri'] = option
+            return re.sub('\s*\[(.*)\]$', '', title), extract_option(title)
+
+    def parse_title(self):
+        self['identifier'], self['uri'] = self.parse_heading(self.pop(0).astext())
 
     def parse_content(self):
         for node in get_children(self, Action):
             if node.get('uri') is None:
                 node['uri'] = self['uri']
 
+        for node in get_children(self, Model):
+            node['identifier'] = self['identifier']
+
     def validate(self):
         self.assert_having_only((Parameters, Attributes, Model, Action))
         self.assert_having_at_most_one(Parameters)
@@ -270,6 +320,11 @@ class Headers(Section):
         self.headers = []
         Section.__init__(self, **kwargs)
 
+    def copy(self):
+        obj = Section.copy(self)
+        obj.headers = self.headers[:]
+        return obj
+
     def parse_content(self):
         for header in self.pop(0).astext().splitlines():
             self.headers.append(header.strip())
@@ -316,5 +371,9 @@ class DataStructures(Section):
 
 
 class Relation(Section):
+    def parse_title(self):
+        title = self.pop(0).astext()
+        self['identifier'] = title.split(':', 1)[1].strip()
+
     def validate(self):
         self.assert_having_no_sections()
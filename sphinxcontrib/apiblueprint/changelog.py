@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+"""Manifest of structural hashes of actions and changelog between manifests
+
+When :confval:`apiblueprint_manifest` is set, the hashes of each action and
+its requests and responses are computed from the IR on reading, and written
+to ``apiblueprint-manifest.json`` in the output directory::
+
+    {"endpoints": {"GET /message": {"document": "index",
+                                    "hash": "...",
+                                    "requests": {},
+                                    "responses": {"200": "...", "404": "..."}}}}
+
+``apiblueprint-changelog`` compares two manifests and prints the added,
+removed and changed endpoints as reST.
+"""
+import io
+import os
+import sys
+import json
+import argparse
+from sphinxcontrib.apiblueprint.ir import digest
+
+MANIFEST_FILE = 'apiblueprint-manifest.json'
+
+
+def payload_hashes(payloads, keyfunc):
+    """Returns a dict which maps keys of payloads to their hashes
+
+    Payloads having the same key (e.g. two ``Response 200``) are numbered
+    in order: ``200``, ``200#2``, ...
+    """
+    hashes = {}
+    for payload in payloads:
+        key = base = keyfunc(payload)
+        count = 1
+        while key in hashes:
+            count += 1
+            key = '%s#%d' % (base, count)
+        hashes[key] = digest(payload)
+
+    return hashes
+
+
+def hash_action(action):
+    """Returns the hashes of the action and its requests and responses"""
+    return {'hash': digest(action),
+            'requests': payload_hashes(action.requests, lambda request: request.identifier or ''),
+            'responses': payload_hashes(action.responses, lambda response: str(response.status_code))}
+
+
+def endpoint_key(action):
+    return '%s %s' % (action.method, action.uri)
+
+
+def dump(env):
+    """Returns the manifest of all endpoints as a JSON serializable dict"""
+    from sphinxcontrib.apiblueprint.collector import get_action_hashes
+
+    hashes = get_action_hashes(env)
+    endpoints = {}
+    for docname in sorted(hashes):
+        for key, entry in hashes[docname]:
+            if key not in endpoints:  # the first definition wins
+                endpoints[key] = dict(entry, document=docname)
+
+    return {'endpoints': endpoints}
+
+
+def diff_payloads(kind, old, new):
+    changes = []
+    for key in sorted(set(old) | set(new)):
+        title = ('%s %s' % (kind, key)).strip()
+        if key not in old:
+            changes.append('%s added' % title)
+        elif key not in new:
+            changes.append('%s removed' % title)
+        elif old[key] != new[key]:
+            changes.append('%s changed' % title)
+
+    return changes
+
+
+def diff(old, new):
+    """Compares two manifests; returns the lists of added, removed and changed endpoints
+
+    Each item of changed endpoints is a pair of the endpoint and the list of
+    changes in it.
+    """
+    old = old['endpoints']
+    new = new['endpoints']
+    added = sorted(key for key in new if key not in old)
+    removed = sorted(key for key in old if key not in new)
+
+    changed = []
+    for key in sorted(key for key in new if key in old and new[key]['hash'] != old[key]['hash']):
+        changes = (diff_payloads('Request', old[key]['requests'], new[key]['requests']) +
+                   diff_payloads('Response', old[key]['responses'], new[key]['responses']))
+        changed.append((key, changes or ['action changed']))
+
+    return added, removed, changed
+
+
+def format_changelog(title, added, removed, changed):
+    """Formats the result of :func:`diff` as reST"""
+    lines = [title, '=' * len(title), '']
+    if not (added or removed or changed):
+        lines += ['No changes.', '']
+
+    for section, endpoints in (('Added', added), ('Removed', removed)):
+        if endpoints:
+            lines += [section, '-' * len(section), '']
+            lines += ['* ``%s``' % key for key in endpoints]
+            lines += ['']
+
+    if changed:
+        lines += ['Changed', '-------', '']
+        lines += ['* ``%s``: %s' % (key, ', '.join(changes)) for key, changes in changed]
+        lines += ['']
+
+    return '\n'.join(lines)
+
+
+def on_build_finished(app, exception):
+    if exception or not app.config.apiblueprint_manifest:
+        return
+
+    with io.open(os.path.join(app.builder.outdir, MANIFEST_FILE), 'w', encoding='utf-8') as fd:
+        fd.write(json.dumps(dump(app.builder.env), sort_keys=True, ensure_ascii=False))
+
+
+def load(filename):
+    with io.open(filename, encoding='utf-8') as fd:
+        return json.load(fd)
+
+
+def get_parser():
+    parser = argparse.ArgumentParser(prog='apiblueprint-changelog',
+                                     description='Print changes of endpoints between two manifests')
+    parser.add_argument('old', metavar='OLD', help='manifest of the old version (%s)' % MANIFEST_FILE)
+    parser.add_argument('new', metavar='NEW', help='manifest of the new version (%s)' % MANIFEST_FILE)
+    parser.add_argument('-t', '--title', default='API Changes',
+                        help='title of the changelog (default: API Changes)')
+    return parser
+
+
+def main(argv=sys.argv[1:]):
+    options = get_parser().parse_args(argv)
+    added, removed, changed = diff(load(options.old), load(options.new))
+    sys.stdout.write(format_changelog(options.title, added, removed, changed))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+"""Stores parsed blueprints (IR) into the build environment"""
+from sphinxcontrib.apiblueprint.utils import model_id
+
+
+def get_blueprints(env):
+    """Returns a dict which maps docnames to the list of their blueprints"""
+    if not hasattr(env, 'apiblueprint_blueprints'):
+        env.apiblueprint_blueprints = {}
+
+    return env.apiblueprint_blueprints
+
+
+def get_updated_docs(env):
+    """Returns a set of docnames read in the current build"""
+    return getattr(env, 'apiblueprint_updated_docs', set())
+
+
+def get_models(env):
+    """Returns a dict which maps identifiers of resources to the locations of their Models"""
+    if not hasattr(env, 'apiblueprint_models'):
+        env.apiblueprint_models = {}
+
+    return env.apiblueprint_models
+
+
+def get_relations(env):
+    """Returns the link graph of actions
+
+    It maps URIs of resources to dicts which map relation identifiers to the
+    locations of the actions: ``(docname, anchor, method, uri)``.
+    """
+    if not hasattr(env, 'apiblueprint_relations'):
+        env.apiblueprint_relations = {}
+
+    return env.apiblueprint_relations
+
+
+def get_action_hashes(env):
+    """Returns a dict which maps docnames to the list of pairs of endpoints and their hashes"""
+    if not hasattr(env, 'apiblueprint_action_hashes'):
+        env.apiblueprint_action_hashes = {}
+
+    return env.apiblueprint_action_hashes
+
+
+def get_includes(env):
+    """Returns the include graph of documents
+
+    It maps docnames to dicts which map filenames to the set of files
+    included from them.  The source of the document itself is the root of
+    the graph (e.g. ``index.rst`` -> ``api.md`` -> ``fragment.md``).
+    """
+    if not hasattr(env, 'apiblueprint_includes'):
+        env.apiblueprint_includes = {}
+
+    return env.apiblueprint_includes
+
+
+def note_includes(env, relfn, includes):
+    """Notes the blueprint (*relfn*) and files included from it to the include graph"""
+    graph = get_includes(env).setdefault(env.docname, {})
+    source = str(env.doc2path(env.docname, base=None))
+    if relfn != source:
+        graph.setdefault(source, set()).add(relfn)
+    for filename, included in includes.items():
+        graph.setdefault(filename, set()).update(included)
+
+
+def note_blueprint(env, blueprint):
+    from sphinxcontrib.httpdomain import http_resource_anchor
+
+    get_blueprints(env).setdefault(env.docname, []).append(blueprint)
+
+    models = get_models(env)
+    for resource in blueprint.resources():
+        if resource.model is not None and resource.identifier:
+            models[resource.identifier] = (env.docname, model_id(resource.identifier))
+
+    relations = get_relations(env)
+    for resource in blueprint.resources():
+        for action in resource.actions:
+            if action.relation:
+                anchor = http_resource_anchor(action.method, action.uri)
+                location = (env.docname, anchor, action.method, action.uri)
+                relations.setdefault(resource.uri, {})[action.relation] = location
+
+    if env.config.apiblueprint_manifest:
+        from sphinxcontrib.apiblueprint.changelog import endpoint_key, hash_action
+
+        hashes = get_action_hashes(env).setdefault(env.docname, [])
+        hashes.extend((endpoint_key(action), hash_action(action)) for action in blueprint.actions())
+
+
+def on_env_before_read_docs(app, env, docnames):
+    env.apiblueprint_updated_docs = set(docnames)
+
+
+def on_env_purge_doc(app, env, docname):
+    get_blueprints(env).pop(docname, None)
+    get_includes(env).pop(docname, None)
+    get_action_hashes(env).pop(docname, None)
+
+    models = get_models(env)
+    for identifier, (fn, _) in list(models.items()):
+        if fn == docname:
+            del models[identifier]
+
+    relations = get_relations(env)
+    for uri, links in list(relations.items()):
+        for identifier, location in list(links.items()):
+            if location[0] == docname:
+                del links[identifier]
+        if not links:
+            del relations[uri]
+
+
+def on_env_merge_info(app, env, docnames, other):
+    blueprints = get_blueprints(other)
+    for docname in docnames:
+        if docname in blueprints:
+            get_blueprints(env)[docname] = blueprints[docname]
+
+    includes = get_includes(other)
+    for docname in docnames:
+        if docname in includes:
+            get_includes(env)[docname] = includes[docname]
+
+    hashes = get_action_hashes(other)
+    for docname in docnames:
+        if docname in hashes:
+            get_action_hashes(env)[docname] = hashes[docname]
+
+    models = get_models(env)
+    for identifier, location in get_models(other).items():
+        if location[0] in docnames:
+            models[identifier] = location
+
+    relations = get_relations(env)
+    for uri, links in get_relations(other).items():
+        for identifier, location in links.items():
+            if location[0] in docnames:
+                relations.setdefault(uri, {})[identifier] = location
+
+
+def on_missing_reference(app, env, node, contnode):
+    """Resolves references to Resource Models"""
+    if node['reftype'] != 'apiblueprint-model':
+        return None
+
+    location = get_models(env).get(node['reftarget'])
+    if location is None:
+        return None
+
+    from sphinx.util.nodes import make_refnode
+    docname, node_id = location
+    return make_refnode(app.builder, node['refdoc'], docname, node_id, contnode)
+
+
+def on_doctree_resolved(app, doctree, docname):
+    """Adds links to the related actions to the contents of actions"""
+    from docutils import nodes
+    from sphinx import addnodes
+    from sphinx.util.nodes import make_refnode
+
+    relations = get_relations(app.builder.env)
+    for node in doctree.traverse(addnodes.desc_content):
+        if 'apiblueprint_resource' not in node:
+            continue
+
+        links = relations.get(node['apiblueprint_resource'], {})
+        related = sorted(identifier for identifier in links if identifier != node['apiblueprint_relation'])
+        if not related:
+            continue
+
+        paragraph = nodes.paragraph(text='Related: ')
+        for i, identifier in enumerate(related):
+            if i > 0:
+                paragraph += nodes.Text(', ')
+            todocname, anchor, method, uri = links[identifier]
+            contnode = nodes.inline(text=identifier)
+            paragraph += make_refnode(app.builder, docname, todocname, anchor, contnode,
+                                      '%s %s' % (method, uri))
+        node += paragraph
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+"""Compact representation of payloads
+
+On ``apiblueprint_compact`` mode, each Request and Response is represented
+by a :class:`CompactPayload` node instead of containers, paragraphs and
+literal blocks (see :class:`CompactAPIBlueprintRepresenter`).  The node is
+rendered by its own HTML and LaTeX visitors; for the other builders, it is
+expanded to the common nodes on doctree-resolved.
+"""
+from docutils import nodes
+from sphinxcontrib.apiblueprint.addnodes import CompactPayload
+
+ASSETS = (('headers', 'Headers'), ('body', 'Body'), ('schema', 'Schema'))
+
+
+def expand(node):
+    """Converts the compact payload to the common nodes"""
+    container = nodes.container()
+    title = nodes.paragraph()
+    title += nodes.strong(text=node['kind'])
+    if node['title'] and node['literal']:
+        title += nodes.Text(' ')
+        title += nodes.literal(text=node['title'])
+    elif node['title']:
+        title += nodes.Text(' ' + node['title'])
+    container += title
+    container.extend(node.children[:])
+
+    for key, label in ASSETS:
+        if node.get(key) is not None:
+            asset = nodes.container()
+            asset += nodes.paragraph(text=label + ':')
+            asset += nodes.literal_block(text=node[key])
+            container += asset
+
+    return container
+
+
+def visit_compact_payload_html(self, node):
+    self.body.append(self.starttag(node, 'div', CLASS='apiblueprint-payload'))
+    self.body.append('<p><strong>%s</strong>' % self.encode(node['kind']))
+    if node['title'] and node['literal']:
+        self.body.append(' <code class="docutils literal">%s</code>' % self.encode(node['title']))
+    elif node['title']:
+        self.body.append(' %s' % self.encode(node['title']))
+    self.body.append('</p>\n')
+
+
+def depart_compact_payload_html(self, node):
+    for key, label in ASSETS:
+        if node.get(key) is not None:
+            self.body.append('<p>%s:</p>\n<pre>%s</pre>\n' % (label, self.encode(node[key])))
+    self.body.append('</div>\n')
+
+
+def visit_compact_payload_latex(self, node):
+    self.body.append('\n\n\\textbf{%s}' % self.encode(node['kind']))
+    if node['title'] and node['literal']:
+        self.body.append(' \\texttt{%s}' % self.encode(node['title']))
+    elif node['title']:
+        self.body.append(' %s' % self.encode(node['title']))
+    self.body.append('\\par\n')
+
+
+def depart_compact_payload_latex(self, node):
+    for key, label in ASSETS:
+        if node.get(key) is not None:
+            # highlighted (and escaped) as same as literal blocks
+            hlcode = self.highlighter.highlight_block(node[key], self.config.highlight_language, location=node)
+            hlcode = hlcode.replace('\\begin{Verbatim}', '\\begin{sphinxVerbatim}')
+            hlcode = hlcode.rstrip()[:-len('\\end{Verbatim}')] + '\\end{sphinxVerbatim}'
+            self.body.append('\n%s:\n%s\n' % (label, hlcode))
+
+
+def on_doctree_resolved(app, doctree, docname):
+    if app.builder.format not in ('html', 'latex'):
+        for node in doctree.traverse(CompactPayload):
+            node.replace_self(expand(node))
@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+import os
+import sys
+import json
+import argparse
+import multiprocessing
+from sphinxcontrib.apiblueprint.addnodes import ParseError
+from sphinxcontrib.apiblueprint.directive import MarkdownReader
+
+
+def compile_file(srcdir, relfn):
+    """Reads, parses and translates a blueprint file
+
+    Returns a tuple of the IR of the blueprint and the set of the files read
+    (relative to *srcdir*).
+    """
+    from docutils.core import publish_doctree
+    from recommonmark.parser import CommonMarkParser
+    from sphinxcontrib.apiblueprint.translator import parse
+
+    reader = MarkdownReader(srcdir, cache_fragments=True)
+    content = reader.read(relfn, os.path.join(srcdir, relfn), [])
+    doctree = publish_doctree(content, parser=CommonMarkParser(),
+                              settings_overrides={'doctitle_xform': False})
+    blueprint = parse(None, doctree, reader.fragments)
+    for error in blueprint.errors:
+        error.source, error.line = reader.locate(error.line)
+
+    return blueprint, reader.processed
+
+
+def dump(blueprint, dependencies, filename):
+    dirname = os.path.dirname(filename)
+    if dirname and not os.path.exists(dirname):
+        os.makedirs(dirname)
+
+    data = {
+        'blueprint': blueprint.to_dict(),
+        'dependencies': sorted(dependencies),
+    }
+    with open(filename, 'wb') as fd:
+        fd.write(json.dumps(data, sort_keys=True).encode('utf-8'))
+
+
+def process(args):
+    srcdir, relfn, outdir = args
+    try:
+        blueprint, dependencies = compile_file(srcdir, relfn)
+        if outdir:
+            dump(blueprint, dependencies, os.path.join(outdir, relfn + '.json'))
+
+        return relfn, [str(error) for error in blueprint.errors]
+    except (ParseError, AssertionError, RuntimeError, IOError, ValueError) as exc:
+        return relfn, ['%s: %s' % (relfn, exc)]
+    except Exception as exc:
+        # report the failure of the file; other files are still compiled
+        return relfn, ['%s: %s: %s' % (relfn, exc.__class__.__name__, exc)]
+
+
+def get_parser():
+    parser = argparse.ArgumentParser(prog='apiblueprint-compile',
+                                     description='Parse and translate API Blueprint files')
+    parser.add_argument('files', metavar='FILE', nargs='+',
+                        help='API Blueprint files to compile')
+    parser.add_argument('-s', '--srcdir', default='.',
+                        help='base directory to resolve absolute includes (default: current directory)')
+    parser.add_argument('-o', '--outdir', default=None,
+                        help='directory to write compiled blueprints (default: validate only)')
+    parser.add_argument('-j', '--jobs', type=int, default=multiprocessing.cpu_count(),
+                        help='number of processes (default: number of CPUs)')
+    return parser
+
+
+def get_relfn(srcdir, filename):
+    """Returns the path of *filename* relative to *srcdir*, or None if it is not in *srcdir*"""
+    try:
+        relfn = os.path.relpath(os.path.abspath(filename), os.path.abspath(srcdir))
+    except ValueError:  # on another drive
+        return None
+
+    if relfn == os.pardir or relfn.startswith(os.pardir + os.sep):
+        return None
+    else:
+        return relfn
+
+
+def main(argv=sys.argv[1:]):
+    options = get_parser().parse_args(argv)
+
+    failed = 0
+    tasks = []
+    for filename in options.files:
+        relfn = get_relfn(options.srcdir, filename)
+        if relfn is None:
+            # the output for it would be written outside of outdir
+            sys.stderr.write('%s: not in the source directory %s\n' % (filename, options.srcdir))
+            failed += 1
+        else:
+            tasks.append((options.srcdir, relfn, options.outdir))
+
+    if options.jobs > 1 and len(tasks) > 1:
+        pool = multiprocessing.Pool(min(options.jobs, len(tasks)))
+        try:
+            results = pool.map(process, tasks, chunksize=1)
+        finally:
+            pool.close()
+            pool.join()
+    else:
+        results = [process(task) for task in tasks]
+
+    for relfn, errors in results:
+        if errors:
+            failed += 1
+        for error in errors:
+            sys.stderr.write('%s\n' % error)
+
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
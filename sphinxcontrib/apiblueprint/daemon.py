@@ -0,0 +1,261 @@
+# -*- coding: utf-8 -*-
+"""Parsing daemon shared by multiple sphinx-build processes
+
+The daemon reads blueprints with :class:`MarkdownReader` and keeps the parsed
+(not represented) doctrees in memory, keyed by the hash of the expanded
+content.  The ``apiblueprint`` directive asks the daemon over a Unix socket
+when :confval:`apiblueprint_daemon_socket` is set, and falls back to parse
+the blueprint by itself if the daemon is not available.
+
+Messages are length-prefixed; requests are JSON and replies are pickles.
+Both sides check that the peer is run by the same user before reading
+anything from it, and the socket is created with mode 0600.
+"""
+import os
+import sys
+import json
+import stat
+import socket
+import struct
+import pickle
+import hashlib
+import argparse
+import tempfile
+import threading
+from collections import OrderedDict
+
+try:
+    from socketserver import StreamRequestHandler, ThreadingUnixStreamServer
+except ImportError:
+    from SocketServer import StreamRequestHandler, ThreadingUnixStreamServer
+
+HEADER = struct.Struct('!I')
+PEERCRED = struct.Struct('3i')  # pid, uid and gid
+PICKLE_PROTOCOL = 2
+MAX_REQUEST_SIZE = 65536
+
+
+def send_message(fd, data):
+    fd.sendall(HEADER.pack(len(data)) + data)
+
+
+def recv_exactly(fd, size):
+    chunks = []
+    while size > 0:
+        chunk = fd.recv(size)
+        if not chunk:
+            raise EOFError('connection closed')
+        chunks.append(chunk)
+        size -= len(chunk)
+
+    return b''.join(chunks)
+
+
+def recv_message(fd, maxsize=None):
+    size, = HEADER.unpack(recv_exactly(fd, HEADER.size))
+    if maxsize is not None and size > maxsize:
+        raise EOFError('message too large')
+    return recv_exactly(fd, size)
+
+
+def get_peer_uid(sock):
+    """Returns the uid of the process connected to the socket, or None if unknown on this platform"""
+    if not hasattr(socket, 'SO_PEERCRED'):
+        return None
+
+    creds = sock.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, PEERCRED.size)
+    return PEERCRED.unpack(creds)[1]
+
+
+def is_private(path):
+    """Returns True if only the current user can access the socket and its directory"""
+    uid = os.getuid()
+    sockstat = os.stat(path)
+    dirstat = os.stat(os.path.dirname(os.path.abspath(path)))
+    return (sockstat.st_uid == uid and not sockstat.st_mode & 0o077 and
+            dirstat.st_uid == uid and not dirstat.st_mode & 0o077)
+
+
+def is_trusted_peer(sock, path):
+    """Returns True if the peer of the socket is run by the current user
+
+    Without ``SO_PEERCRED``, the socket and its directory must be accessible
+    only by the current user.
+    """
+    try:
+        uid = get_peer_uid(sock)
+        if uid is not None:
+            return uid == os.getuid()
+        else:
+            return is_private(path)
+    except (socket.error, OSError):
+        return False
+
+
+def request(path, srcdir, relfn, timeout=60):
+    """Asks the daemon to read and parse the blueprint
+
+    Returns a dict having the parsed doctree (``doctree``), its IR
+    (``blueprint``), and the state of the reader (``processed``,
+    ``includes`` and ``sourcemap``).  Returns None if the daemon is not
+    available or the socket is not owned by the current user.  Errors on
+    reading are raised as same as :meth:`MarkdownReader.read`.
+    """
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.settimeout(timeout)
+        sock.connect(path)
+        if not is_trusted_peer(sock, path):
+            return None  # the reply might be a malicious pickle
+
+        message = {'srcdir': u'%s' % srcdir, 'relfn': u'%s' % relfn}  # paths might be path objects
+        send_message(sock, json.dumps(message).encode('utf-8'))
+        reply = pickle.loads(recv_message(sock))
+    except (socket.error, EOFError, struct.error):
+        return None
+    finally:
+        sock.close()
+
+    if isinstance(reply, Exception):
+        raise reply
+
+    reply['doctree'], reply['blueprint'] = pickle.loads(reply.pop('parsed'))
+    return reply
+
+
+def is_listening(path):
+    """Returns True if any process accepts connections on the socket"""
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(path)
+        return True
+    except socket.error:
+        return False
+    finally:
+        sock.close()
+
+
+class ParsingDaemon(object):
+    """Reads blueprints and caches their parsed doctrees by content hash"""
+
+    def __init__(self, maxsize=256):
+        self.maxsize = maxsize
+        self.cache = OrderedDict()
+        self.lock = threading.Lock()
+
+    def parse(self, srcdir, relfn):
+        from sphinxcontrib.apiblueprint.directive import MarkdownReader
+
+        reader = MarkdownReader(srcdir, cache_fragments=True)
+        content = reader.read(relfn, os.path.join(srcdir, relfn), [])
+        key = hashlib.sha1(content.encode('utf-8')).hexdigest()
+
+        with self.lock:
+            parsed = self.cache.pop(key, None)
+        if parsed is None:
+            parsed = self.parse_content(content, reader.fragments)
+
+        with self.lock:
+            self.cache[key] = parsed  # move to the end
+            while len(self.cache) > self.maxsize:
+                self.cache.popitem(last=False)
+
+        return {'parsed': parsed, 'processed': reader.processed, 'includes': reader.includes,
+                'sourcemap': reader.sourcemap}
+
+    def parse_content(self, content, fragments):
+        from sphinxcontrib.apiblueprint.directive import parse_chunk
+
+        return pickle.dumps(parse_chunk((content, fragments)), PICKLE_PROTOCOL)
+
+    def handle(self, srcdir, relfn):
+        try:
+            return self.parse(srcdir, relfn)
+        except (RuntimeError, IOError) as exc:
+            return exc
+
+
+class ParsingDaemonRequestHandler(StreamRequestHandler):
+    def handle(self):
+        if not is_trusted_peer(self.connection, self.server.server_address):
+            return
+
+        try:
+            message = json.loads(recv_message(self.connection, MAX_REQUEST_SIZE).decode('utf-8'))
+            srcdir, relfn = message['srcdir'], message['relfn']
+        except (socket.error, EOFError, struct.error, ValueError, TypeError, KeyError):
+            return
+
+        reply = self.server.daemon.handle(srcdir, relfn)
+        send_message(self.connection, pickle.dumps(reply, PICKLE_PROTOCOL))
+
+
+class ParsingDaemonServer(ThreadingUnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path, daemon):
+        self.daemon = daemon
+        self.bound = False
+        ThreadingUnixStreamServer.__init__(self, path, ParsingDaemonRequestHandler)
+
+    def server_bind(self):
+        path = self.server_address
+        if os.path.lexists(path):
+            if not stat.S_ISSOCK(os.lstat(path).st_mode):
+                raise RuntimeError('%s already exists and is not a socket' % path)
+            elif is_listening(path):
+                raise RuntimeError('another daemon is listening on %s' % path)
+            else:
+                os.remove(path)  # stale socket
+
+        # create the socket in a private directory, and move it after changing its mode to 0600;
+        # nobody can connect to it before that
+        tmpdir = tempfile.mkdtemp(prefix='.apiblueprint-', dir=os.path.dirname(os.path.abspath(path)))
+        try:
+            tmppath = os.path.join(tmpdir, 'socket')
+            self.socket.bind(tmppath)
+            os.chmod(tmppath, 0o600)
+            os.rename(tmppath, path)
+            self.server_address = path
+            self.bound = True
+        finally:
+            if os.path.exists(os.path.join(tmpdir, 'socket')):
+                os.remove(os.path.join(tmpdir, 'socket'))
+            os.rmdir(tmpdir)
+
+    def server_close(self):
+        ThreadingUnixStreamServer.server_close(self)
+        if self.bound and os.path.exists(self.server_address):
+            os.remove(self.server_address)
+
+
+def get_parser():
+    parser = argparse.ArgumentParser(prog='apiblueprint-daemon',
+                                     description='Keep parsed API Blueprints in memory for sphinx-build')
+    parser.add_argument('socket', metavar='SOCKET',
+                        help='path to Unix domain socket to listen')
+    parser.add_argument('-n', '--maxsize', type=int, default=256,
+                        help='number of parsed blueprints to keep (default: 256)')
+    return parser
+
+
+def main(argv=sys.argv[1:]):
+    options = get_parser().parse_args(argv)
+    try:
+        server = ParsingDaemonServer(options.socket, ParsingDaemon(options.maxsize))
+    except RuntimeError as exc:
+        sys.stderr.write('apiblueprint-daemon: %s\n' % exc)
+        return 1
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
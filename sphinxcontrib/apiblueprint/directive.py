@@ -2,10 +2,16 @@
 import io
 import os
 import re
-from docutils.core import publish_doctree
-from docutils.parsers.rst import Directive
-from recommonmark.parser import CommonMarkParser
-from sphinxcontrib.apiblueprint.translator import translate
+import bisect
+import threading
+from docutils import nodes
+from docutils.parsers.rst import Directive, directives
+from docutils.utils import new_document
+from sphinx import addnodes
+from sphinxcontrib.apiblueprint.collector import note_blueprint, note_includes
+from sphinxcontrib.apiblueprint.fragments import PLACEHOLDER, fragment_key, is_fragment
+from sphinxcontrib.apiblueprint.utils import group_docnames, split_blueprint
+from sphinxcontrib.apiblueprint.validation import report_invalid_bodies
 
 
 def relfn2path(srcdir, relpath, filename):
@@ -21,34 +27,242 @@ def relfn2path(srcdir, relpath, filename):
 class MarkdownReader(object):
     INCLUDE_STMT = re.compile('([ \t]*)<!--\s+include\(([^)]+)\)\s+-->', re.M)
 
-    def __init__(self, srcdir):
+    def __init__(self, srcdir, max_workers=8, cache_fragments=False):
         self.processed = set()
+        self.includes = {}  # relfn -> set of files included from it
         self.srcdir = srcdir
+        self.sourcemap = []
+        self.cache_fragments = cache_fragments
+        self.fragments = {}
+        self.max_workers = max_workers
+        self.pool = None
+        self.prefetched = {}
+        self.lock = threading.Lock()
 
     def read(self, relfn, abspath, included):
+        try:
+            content, self.sourcemap = self._read(relfn, abspath, included)
+            return content
+        finally:
+            self.shutdown()
+
+    def expand(self, relfn, abspath, content, included):
+        try:
+            parts = self.INCLUDE_STMT.split(content)
+            self.prefetch(relfn, parts)
+            content, self.sourcemap = self._expand(relfn, abspath, parts, included)
+            return content
+        finally:
+            self.shutdown()
+
+    def locate(self, line):
+        """Returns the filename and the line number in it for the line of the last read content"""
+        if not self.sourcemap:
+            return None, line
+        elif line is None:
+            return self.sourcemap[0][1], None
+
+        index = bisect.bisect_right([offset for offset, _, _ in self.sourcemap], line - 1) - 1
+        offset, relfn, lineno = self.sourcemap[max(index, 0)]
+        return relfn, lineno + (line - 1 - offset)
+
+    def prefetch(self, relfn, parts, start=True):
+        """Starts to fetch the files included from the content (split into parts) concurrently
+
+        Files are fetched in a bounded thread pool, and the files included from
+        them are also prefetched as soon as they are fetched.  The fetched
+        contents are spliced in the original order by :meth:`_read`.
+        """
+        if self.max_workers <= 1:
+            return
+
+        for filename in parts[2::3]:
+            relfn_included, abspath_included = relfn2path(self.srcdir, relfn, filename)
+            with self.lock:
+                if abspath_included in self.prefetched:
+                    continue
+                elif self.pool is None:
+                    if not start:
+                        return  # already shut down
+                    from multiprocessing.pool import ThreadPool
+
+                    self.pool = ThreadPool(self.max_workers)
+                self.prefetched[abspath_included] = self.pool.apply_async(self.fetch,
+                                                                          (relfn_included, abspath_included))
+
+    def fetch(self, relfn, abspath):
+        parts = self.load(abspath)
+        self.prefetch(relfn, parts, start=False)
+        return parts
+
+    def load(self, abspath):
+        """Reads a file and splits it by include statements
+
+        The result has same form as ``INCLUDE_STMT.split(content)``.
+        """
+        with io.open(abspath, 'r', encoding='utf-8-sig') as fd:
+            return self.INCLUDE_STMT.split(fd.read())
+
+    def shutdown(self):
+        with self.lock:
+            if self.pool:
+                self.pool.terminate()
+                self.pool = None
+            self.prefetched = {}
+
+    def is_standalone(self, parts, i):
+        """Returns True if the i-th include statement is placed on its own line"""
+        before = parts[i * 3]
+        after = parts[i * 3 + 3]
+        return ((before == '' and i == 0) or before.endswith('\n')) and (after == '' or after.startswith('\n'))
+
+    def _read(self, relfn, abspath, included):
         if abspath in included:
             raise RuntimeError('Infinite include loop has detected. check your API definitions.')
 
-        with io.open(abspath, 'r', encoding='utf-8-sig') as fd:
-            content = fd.read()
-            self.processed.add(relfn)
+        with self.lock:
+            prefetched = self.prefetched.get(abspath)
 
-        parts = self.INCLUDE_STMT.split(content)
+        if prefetched:
+            parts = prefetched.get()  # raises IOError if failed to read
+        else:
+            parts = self.load(abspath)
+            self.prefetch(relfn, parts)
+        self.processed.add(relfn)
+
+        return self._expand(relfn, abspath, parts, included)
+
+    def _expand(self, relfn, abspath, parts, included):
+        # sourcemap is a list of (line offset in the output, filename, line number in the file)
+        sourcemap = [(0, relfn, 1)]
+        parts = parts[:]  # parts might be shared with other include sites
+        offset = parts[0].count('\n')
+        lineno = offset + 1
         for i in range(len(parts) // 3):
             indent = parts[i * 3 + 1]
             filename = parts[i * 3 + 2]
 
             relfn_included, abspath_included = relfn2path(self.srcdir, relfn, filename)
-            replaced = self.read(relfn_included, abspath_included, included + [abspath])
-            parts[i * 3 + 2] = ("\n" + indent).join(replaced.splitlines())
+            self.includes.setdefault(relfn, set()).add(relfn_included)
+            replaced, submap = self._read(relfn_included, abspath_included, included + [abspath])
+            if self.cache_fragments and self.is_standalone(parts, i) and is_fragment(replaced):
+                # replace the fragment by placeholder; it will be parsed only once (see fragments module)
+                key = fragment_key(replaced, indent)
+                self.fragments[key] = replaced
+                replaced, submap = '+ ' + PLACEHOLDER % key, [(0, relfn_included, 1)]
+            lines = replaced.splitlines()
+            parts[i * 3 + 2] = ("\n" + indent).join(lines)
+
+            sourcemap.extend((offset + suboffset, fn, line) for suboffset, fn, line in submap)
+            offset += max(len(lines) - 1, 0)
+            text = parts[i * 3 + 3]
+            if '\n' in text:
+                sourcemap.append((offset + 1, relfn, lineno + 1))
+            offset += text.count('\n')
+            lineno += text.count('\n')
+
+        return "".join(parts), sourcemap
+
+
+def create_pool(jobs):
+    """Creates a process pool to parse chunks; returns None if not needed or not available"""
+    import multiprocessing
+
+    try:
+        cpus = multiprocessing.cpu_count()
+    except NotImplementedError:
+        cpus = 1
+
+    if jobs <= 1 or cpus <= 1:
+        return None
+
+    try:
+        return multiprocessing.Pool(jobs)
+    except (AssertionError, OSError):
+        return None  # e.g. daemonic processes are not allowed to have children
+
+
+class SharedPool(object):
+    """Process pool shared by all directives in a build
+
+    The pool is created on the first use, and closed on build-finished.  It
+    is used only from the process which started the build; in the workers of
+    parallel reading (``sphinx-build -j``), chunks are parsed serially.
+    """
+
+    def __init__(self):
+        self.owner = None
+        self.jobs = 1
+        self.pool = None
+        self.created = False
+
+    def start(self, jobs):
+        self.owner = os.getpid()
+        self.jobs = jobs
+
+    def get(self):
+        if self.owner != os.getpid():
+            return None
+
+        if not self.created:
+            self.pool = create_pool(self.jobs)
+            self.created = True
+        return self.pool
+
+    def close(self):
+        if self.pool is not None and self.owner == os.getpid():
+            self.pool.close()
+            self.pool.join()
+        self.__init__()
 
-        return "".join(parts)
+
+#: The process pool shared in the process
+shared_pool = SharedPool()
+
+
+def on_builder_inited(app):
+    shared_pool.start(app.config.apiblueprint_parallel_jobs)
+
+
+def on_build_finished(app, exception):
+    shared_pool.close()
+
+
+def parse_chunk(args):
+    """Parses a chunk of blueprint in a worker process
+
+    The nodes are detached from the document to be pickled.
+    """
+    from sphinxcontrib.apiblueprint.translator import parse_content
+
+    content, fragments = args
+    doctree, blueprint = parse_content(content, fragments)
+    container = nodes.container()
+    container.extend(node.deepcopy() for node in doctree)
+    return container, blueprint
+
+
+def note_dependencies(env, reader, relfn):
+    """Notes the files read by the reader as dependencies of the current document"""
+    for fn in reader.processed:
+        env.note_dependency(fn)
+    note_includes(env, relfn, reader.includes)
+
+
+def report_errors(document, env, reader, blueprint):
+    """Reports parse errors of the blueprint with their locations"""
+    for error in blueprint.errors:
+        error.source, error.line = reader.locate(error.line)
+        document.reporter.error(error.message, source=os.path.join(env.srcdir, error.source), line=error.line)
 
 
 class ApiBlueprintDirective(Directive):
     has_content = False
     required_arguments = 1
     final_argument_whitespace = True
+    option_spec = {
+        'split': directives.flag,
+    }
 
     def run(self):
         self.env = self.state.document.settings.env
@@ -56,16 +270,136 @@ class ApiBlueprintDirective(Directive):
         relfn, abspath = relfn2path(self.env.srcdir, docpath, self.arguments[0])
 
         try:
-            reader = MarkdownReader(self.env.srcdir)
-            content = reader.read(relfn, abspath, [])
-            for fn in reader.processed:
-                self.env.note_dependency(fn)
-            doctree = publish_doctree(content, parser=CommonMarkParser(),
-                                      settings_overrides={'doctitle_xform': False})
-            translate(self.env, doctree)
-
-            return doctree[:]
+            self.reader = MarkdownReader(self.env.srcdir, cache_fragments=True)
+            socket = self.env.config.apiblueprint_daemon_socket
+            if socket and 'split' not in self.options:
+                from sphinxcontrib.apiblueprint.daemon import request
+
+                parsed = request(socket, self.env.srcdir, relfn)
+                if parsed is not None:
+                    self.reader.processed = parsed['processed']
+                    self.reader.includes = parsed['includes']
+                    self.reader.sourcemap = parsed['sourcemap']
+                    note_dependencies(self.env, self.reader, relfn)
+                    doctree = new_document(relfn, self.state.document.settings)
+                    doctree.extend(parsed['doctree'].children)
+                    return self.represent(doctree, parsed['blueprint'])
+
+            content = self.reader.read(relfn, abspath, [])
+            note_dependencies(self.env, self.reader, relfn)
+
+            if 'split' in self.options:
+                return self.split(content)
+            elif self.env.config.apiblueprint_parallel_jobs > 1:
+                chunks = split_blueprint(content)
+                content = None  # release the whole text; chunks are released one by one
+                return self.translate_chunks(chunks, shared_pool.get())
+            else:
+                return self.translate(content)
         except RuntimeError as exc:
             raise self.error(exc.message)
         except IOError as exc:
             raise self.error('Fail to read API Blueprint: %s' % exc)
+
+    def translate(self, content):
+        # parsing stack is imported on demand to keep import of this extension light
+        from sphinxcontrib.apiblueprint.translator import parse_content
+
+        if not content.strip():
+            return []
+
+        doctree, blueprint = parse_content(content, self.reader.fragments)
+        return self.represent(doctree, blueprint)
+
+    def represent(self, doctree, blueprint):
+        """Translates parsed doctree to common Sphinx doctree"""
+        from sphinxcontrib.apiblueprint.translator import represent
+
+        report_errors(self.state.document, self.env, self.reader, blueprint)
+        report_invalid_bodies(self.state.document, self.env, self.reader, blueprint)
+        note_blueprint(self.env, blueprint)
+        represent(self.env, doctree)
+
+        return doctree[:]
+
+    def translate_chunks(self, chunks, pool=None):
+        """Translates the blueprint one top-level section at a time
+
+        Each chunk is removed from *chunks*, and its intermediate doctree is
+        released after translated.  The IRs of chunks are merged into one.
+        If *pool* is given, the chunks are parsed in the process pool, and
+        translated to Sphinx nodes in the original order.
+        """
+        from sphinxcontrib.apiblueprint.translator import represent
+
+        results = []
+        blueprint = None
+        for doctree, part in self.parse_chunks(chunks, pool):
+            report_errors(self.state.document, self.env, self.reader, part)
+            represent(self.env, doctree)
+            results.extend(doctree[:])
+            doctree = None
+
+            if blueprint is None:
+                blueprint = part
+            else:
+                blueprint.groups.extend(part.groups)
+                blueprint.data_structures.extend(part.data_structures)
+                blueprint.errors.extend(part.errors)
+
+        if blueprint is not None:
+            report_invalid_bodies(self.state.document, self.env, self.reader, blueprint)
+            note_blueprint(self.env, blueprint)
+        return results
+
+    def parse_chunks(self, chunks, pool):
+        """Parses chunks; yields pairs of the parsed doctree and its IR in order"""
+        from sphinxcontrib.apiblueprint.translator import parse_content
+
+        tasks = []
+        offset = 0
+        for chunk in chunks:
+            if chunk.strip():
+                tasks.append(offset)
+            offset += chunk.count('\n')
+        chunks[:] = [chunk for chunk in chunks if chunk.strip()]
+        chunks.reverse()
+
+        if len(chunks) <= 1:
+            pool = None
+        if pool is None:
+            parsed = (parse_content(chunks.pop(), self.reader.fragments) for _ in tasks)
+        else:
+            parsed = pool.imap(parse_chunk, [(chunk, self.reader.fragments) for chunk in reversed(chunks)])
+            del chunks[:]
+
+        for offset, (doctree, blueprint) in zip(tasks, parsed):
+            if pool is not None:
+                container, doctree = doctree, new_document(self.reader.srcdir, self.state.document.settings)
+                doctree.extend(container.children)
+            for error in blueprint.errors:
+                if error.line:
+                    error.line += offset
+            yield doctree, blueprint
+
+    def split(self, content):
+        """Translates the content before the first Resource Group, and
+        makes a toctree to the documents generated for each Resource Group."""
+        chunks = split_blueprint(content)
+        docnames = group_docnames(self.env.docname, self.arguments[0], chunks[1:])
+
+        tocnode = addnodes.toctree()
+        tocnode['parent'] = self.env.docname
+        tocnode['entries'] = [(None, docname) for docname in docnames]
+        tocnode['includefiles'] = docnames
+        tocnode['maxdepth'] = 1
+        tocnode['caption'] = None
+        tocnode['glob'] = False
+        tocnode['hidden'] = False
+        tocnode['includehidden'] = False
+        tocnode['numbered'] = 0
+        tocnode['titlesonly'] = False
+        wrapper = nodes.compound(classes=['toctree-wrapper'])
+        wrapper += tocnode
+
+        return self.translate(chunks[0]) + [wrapper]
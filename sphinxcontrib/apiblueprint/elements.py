@@ -0,0 +1,276 @@
+# -*- coding: utf-8 -*-
+"""Exports parsed blueprints as JSON documents similar to API Elements
+
+See https://apielements.org/ for the format.
+"""
+import os
+import re
+import json
+from sphinxcontrib.apiblueprint import ir
+from sphinxcontrib.apiblueprint.collector import get_blueprints, get_updated_docs
+
+EXPORT_DIR = '_apiblueprint'
+
+
+def category(classname, title, content):
+    return {'element': 'category',
+            'meta': {'classes': [classname], 'title': title},
+            'content': content}
+
+
+def copy(text):
+    return {'element': 'copy', 'content': text}
+
+
+def headers(data):
+    members = []
+    for header in data.headers:
+        key, _, value = header.partition(':')
+        members.append({'element': 'member', 'content': {'key': key.strip(), 'value': value.strip()}})
+
+    return {'element': 'httpHeaders', 'content': members}
+
+
+def href_variables(parameters):
+    members = []
+    for param in parameters:
+        member = {'element': 'member',
+                  'attributes': {'typeAttributes': ['required' if param.required else 'optional']},
+                  'content': {'key': param.name, 'value': param.example}}
+        if param.type:
+            member['meta'] = {'title': param.type}
+        if param.description:
+            member['meta'] = dict(member.get('meta', {}), description=param.description)
+        members.append(member)
+
+    return {'element': 'hrefVariables', 'content': members}
+
+
+def sample(typename, example):
+    """Converts an example of MSON member to the value of the type"""
+    if example is None:
+        return None
+    elif typename == 'number':
+        for convert in (int, float):
+            try:
+                return convert(example)
+            except ValueError:
+                pass
+    elif typename == 'boolean':
+        return example.lower() == 'true'
+
+    return example
+
+
+def value_element(typename, example, members):
+    if not typename:
+        typename = 'object' if members else 'string'
+
+    element = {'element': typename}
+    matched = re.match('^(array|enum)\[(.*)\]$', typename)
+    if matched:
+        element['element'] = matched.group(1)
+        nested = [{'element': name.strip()} for name in matched.group(2).split(',') if name.strip()]
+    else:
+        nested = []
+
+    if element['element'] in ('array', 'enum'):
+        # members of array are values (e.g. ``+ hello (string)``)
+        nested.extend(value_element(member.type, member.name, member.members) for member in members)
+        if nested:
+            element['content'] = nested
+    elif members:
+        element['content'] = [member_element(member) for member in members]
+    elif example is not None:
+        element['content'] = sample(typename, example)
+
+    return element
+
+
+def member_element(member):
+    element = {'element': 'member',
+               'content': {'key': {'element': 'string', 'content': member.name},
+                           'value': value_element(member.type, member.example, member.members)}}
+    if member.required:
+        element['attributes'] = {'typeAttributes': ['required']}
+    if member.description:
+        element['meta'] = {'description': member.description}
+
+    return element
+
+
+def data_structure(typename, members, name=None):
+    content = value_element(typename or 'object', None, members)
+    if name:
+        content['meta'] = {'id': name}
+    return {'element': 'dataStructure', 'content': content}
+
+
+def attributes_element(attributes):
+    """Converts Attributes section (see :func:`ir.parse_attributes`) to dataStructure element"""
+    typename, members = ir.parse_attributes(attributes)
+    if typename is None and not members:
+        return None
+    else:
+        return data_structure(typename, members)
+
+
+def payload(element, data, attributes):
+    content = []
+    if data.description:
+        content.append(copy(data.description))
+    if data.body is not None:
+        content.append({'element': 'asset',
+                        'meta': {'classes': ['messageBody']},
+                        'attributes': {'contentType': data.content_type},
+                        'content': data.body})
+    if data.schema is not None:
+        content.append({'element': 'asset',
+                        'meta': {'classes': ['messageBodySchema']},
+                        'attributes': {'contentType': data.content_type},
+                        'content': data.schema})
+    structure = attributes_element(data.attributes)
+    if structure:
+        content.append(structure)
+
+    if data.headers:
+        attributes['headers'] = headers(data)
+    return {'element': element, 'attributes': attributes, 'content': content}
+
+
+def transition(resource, action):
+    attributes = {}
+    if action.relation:
+        attributes['relation'] = action.relation
+    if action.uri != resource.uri:
+        attributes['href'] = action.uri
+    if action.parameters:
+        attributes['hrefVariables'] = href_variables(action.parameters)
+
+    transactions = []
+    for request in action.requests or [None]:
+        if request is None:
+            http_request = {'element': 'httpRequest', 'attributes': {'method': action.method}, 'content': []}
+        else:
+            attrs = {'method': action.method}
+            if request.identifier:
+                attrs['title'] = request.identifier
+            http_request = payload('httpRequest', request, attrs)
+
+        for response in action.responses:
+            http_response = payload('httpResponse', response, {'statusCode': str(response.status_code)})
+            transactions.append({'element': 'httpTransaction', 'content': [http_request, http_response]})
+
+    content = []
+    if action.description:
+        content.append(copy(action.description))
+    structure = attributes_element(action.attributes)
+    if structure:
+        content.append(structure)
+    content.extend(transactions)
+    return {'element': 'transition',
+            'meta': {'title': action.identifier},
+            'attributes': attributes,
+            'content': content}
+
+
+def resource_element(resource):
+    attributes = {'href': resource.uri}
+    if resource.parameters:
+        attributes['hrefVariables'] = href_variables(resource.parameters)
+
+    content = []
+    if resource.description:
+        content.append(copy(resource.description))
+    structure = attributes_element(resource.attributes)
+    if structure:
+        content.append(structure)
+    if resource.model:
+        model = payload('httpResponse', resource.model, {})
+        model['meta'] = {'classes': ['resourceModel']}
+        content.append(model)
+    content.extend(transition(resource, action) for action in resource.actions)
+    return {'element': 'resource',
+            'meta': {'title': resource.identifier},
+            'attributes': attributes,
+            'content': content}
+
+
+def group_element(group):
+    content = []
+    if group.description:
+        content.append(copy(group.description))
+    content.extend(resource_element(resource) for resource in group.resources)
+    return category('resourceGroup', group.name, content)
+
+
+def data_structures_element(blueprint):
+    structures = [data_structure(structure.type, ir.parse_members((structure.attributes or '').splitlines()),
+                                 structure.name)
+                  for structure in blueprint.data_structures]
+    return category('dataStructures', '', structures)
+
+
+def api_contents(blueprint):
+    if blueprint.description:
+        yield copy(blueprint.description)
+    for group in blueprint.groups:
+        yield group_element(group)
+    if blueprint.data_structures:
+        yield data_structures_element(blueprint)
+
+
+def iterencode(blueprints):
+    """Encodes blueprints to API Elements JSON chunk by chunk
+
+    Each Resource Group is converted just before it is encoded; the whole
+    element tree is never built in memory.
+    """
+    encoder = json.JSONEncoder(sort_keys=True)
+
+    yield '{"element": "parseResult", "content": ['
+    for i, blueprint in enumerate(blueprints):
+        if i > 0:
+            yield ', '
+        yield '{"element": "category", "meta": {"classes": ["api"], "title": %s}, "content": [' % \
+            encoder.encode(blueprint.name)
+
+        for j, element in enumerate(api_contents(blueprint)):
+            if j > 0:
+                yield ', '
+            for chunk in encoder.iterencode(element):
+                yield chunk
+
+        yield ']}'
+    yield ']}'
+
+
+def write(blueprints, filename):
+    dirname = os.path.dirname(filename)
+    if not os.path.exists(dirname):
+        os.makedirs(dirname)
+
+    with open(filename, 'wb') as fd:
+        for chunk in iterencode(blueprints):
+            fd.write(chunk.encode('utf-8'))
+
+
+def on_build_finished(app, exception):
+    if exception or not app.config.apiblueprint_export_json:
+        return
+
+    outdir = os.path.join(app.builder.outdir, EXPORT_DIR)
+    blueprints = get_blueprints(app.builder.env)
+    updated = get_updated_docs(app.builder.env)
+    for docname in blueprints:
+        filename = os.path.join(outdir, docname + '.json')
+        if docname in updated or not os.path.exists(filename):
+            write(blueprints[docname], filename)
+
+    # remove outputs for removed documents
+    for root, _, files in os.walk(outdir):
+        for filename in files:
+            path = os.path.join(root, filename)
+            docname = os.path.relpath(path, outdir)[:-len('.json')].replace(os.sep, '/')
+            if filename.endswith('.json') and docname not in blueprints:
+                os.remove(path)
@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+"""Summary table of all endpoints
+
+``apiblueprint-endpoints`` directive puts a placeholder node, and it is
+replaced by the table on doctree-resolved.  The table is made from the IRs of
+blueprints stored in the environment; no blueprint is read again.
+"""
+from docutils import nodes
+from docutils.parsers.rst import Directive, directives
+from sphinxcontrib.apiblueprint.addnodes import EndpointIndex
+from sphinxcontrib.apiblueprint.collector import get_blueprints, get_updated_docs
+
+SORT_KEYS = {
+    'uri': lambda endpoint: (endpoint[2], endpoint[1]),
+    'method': lambda endpoint: (endpoint[1], endpoint[2]),
+    'identifier': lambda endpoint: (endpoint[3], endpoint[1], endpoint[2]),
+    'document': lambda endpoint: endpoint[0],
+}
+
+
+def get_endpoint_indexes(env):
+    """Returns a set of docnames having apiblueprint-endpoints directives"""
+    if not hasattr(env, 'apiblueprint_endpoint_indexes'):
+        env.apiblueprint_endpoint_indexes = set()
+
+    return env.apiblueprint_endpoint_indexes
+
+
+def iter_endpoints(blueprints, groups=None):
+    """Yields endpoints: ``(docname, method, uri, identifier)``"""
+    for docname in sorted(blueprints):
+        for blueprint in blueprints[docname]:
+            for group in blueprint.groups:
+                if groups is not None and group.name not in groups:
+                    continue
+                for resource in group.resources:
+                    for action in resource.actions:
+                        yield docname, action.method, action.uri, action.identifier or ''
+
+
+class ApiBlueprintEndpointsDirective(Directive):
+    has_content = False
+    option_spec = {
+        'group': directives.unchanged,
+        'sort': lambda arg: directives.choice(arg, ('uri', 'method', 'identifier', 'document')),
+    }
+
+    def run(self):
+        env = self.state.document.settings.env
+        get_endpoint_indexes(env).add(env.docname)
+
+        node = EndpointIndex(sort=self.options.get('sort', 'uri'))
+        if 'group' in self.options:
+            node['groups'] = [name.strip() for name in self.options['group'].split(',')]
+        return [node]
+
+
+def make_table(app, fromdocname, endpoints):
+    from sphinx.util.nodes import make_refnode
+    from sphinxcontrib.httpdomain import http_resource_anchor
+
+    table = nodes.table(classes=['apiblueprint-endpoints'])
+    tgroup = nodes.tgroup(cols=4)
+    table += tgroup
+    tgroup.extend(nodes.colspec(colwidth=width) for width in (10, 40, 25, 25))
+
+    thead = nodes.thead()
+    tgroup += thead
+    thead += nodes.row()
+    for title in ('Method', 'URI', 'Identifier', 'Document'):
+        thead[0] += nodes.entry('', nodes.paragraph(text=title))
+
+    tbody = nodes.tbody()
+    tgroup += tbody
+    titles = app.builder.env.titles
+    for docname, method, uri, identifier in endpoints:
+        anchor = http_resource_anchor(method, uri)
+        reference = make_refnode(app.builder, fromdocname, docname, anchor, nodes.literal(text=uri))
+        title = titles[docname].astext() if docname in titles else docname
+        document = make_refnode(app.builder, fromdocname, docname, '', nodes.inline(text=title))
+
+        row = nodes.row()
+        row += nodes.entry('', nodes.paragraph(text=method))
+        row += nodes.entry('', nodes.paragraph('', '', reference))
+        row += nodes.entry('', nodes.paragraph(text=identifier))
+        row += nodes.entry('', nodes.paragraph('', '', document))
+        tbody += row
+
+    return table
+
+
+def on_doctree_resolved(app, doctree, docname):
+    blueprints = get_blueprints(app.builder.env)
+    for node in doctree.traverse(EndpointIndex):
+        endpoints = sorted(iter_endpoints(blueprints, node.get('groups')), key=SORT_KEYS[node['sort']])
+        if endpoints:
+            node.replace_self(make_table(app, docname, endpoints))
+        else:
+            node.replace_self(nodes.paragraph(text='No endpoints.'))
+
+
+def on_env_purge_doc(app, env, docname):
+    get_endpoint_indexes(env).discard(docname)
+
+
+def on_env_merge_info(app, env, docnames, other):
+    get_endpoint_indexes(env).update(get_endpoint_indexes(other) & set(docnames))
+
+
+def on_env_updated(app, env):
+    """Rewrites the documents having endpoint indexes if any document is read"""
+    if get_updated_docs(env):
+        return sorted(get_endpoint_indexes(env))
+    else:
+        return []
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""Cache of parsed fragments of API Blueprint
+
+An included file consisting only of list sections (e.g. ``+ Response 401``)
+is called a fragment.  On reading, :class:`MarkdownReader` replaces it with a
+placeholder list item, and the translator replaces the placeholder with the
+copy of the parsed fragment.  Thus a fragment included from many places is
+parsed only once.
+"""
+import re
+import hashlib
+from collections import OrderedDict
+from sphinxcontrib.apiblueprint.utils import detect_list_section_type
+
+PLACEHOLDER = 'apiblueprint-fragment:%s'
+PLACEHOLDER_PATTERN = re.compile('^apiblueprint-fragment:([0-9a-f]{40})$')
+LIST_ITEM = re.compile('^[-+*][ \t]+(\S.*)$')
+
+
+def is_fragment(content):
+    """Returns True if the content consists only of list sections"""
+    found = False
+    for line in content.splitlines():
+        if not line.strip() or line[0] in ' \t':
+            continue  # blank line or content of list items
+
+        matched = LIST_ITEM.match(line)
+        if not matched:
+            return False
+
+        title = matched.group(1).strip()
+        if not PLACEHOLDER_PATTERN.match(title) and detect_list_section_type(title) is None:
+            return False
+        found = True
+
+    return found
+
+
+def fragment_key(content, indent):
+    return hashlib.sha1((indent + '\0' + content).encode('utf-8')).hexdigest()
+
+
+def placeholder_key(node):
+    """Returns the key of the fragment if the list item is a placeholder"""
+    if len(node) == 1 and len(node[0]) == 1:
+        matched = PLACEHOLDER_PATTERN.match(node[0].astext().strip())
+        if matched:
+            return matched.group(1)
+
+    return None
+
+
+class FragmentCache(object):
+    """LRU cache of parsed fragments (lists of API Blueprint sections)"""
+
+    def __init__(self, maxsize=4096):
+        self.maxsize = maxsize
+        self.parsed = OrderedDict()
+
+    def clear(self):
+        self.parsed.clear()
+
+    def resolve(self, key, fragments):
+        """Returns a copy of the parsed fragment
+
+        *fragments* is a dict which maps keys to the contents of fragments
+        (see :attr:`MarkdownReader.fragments`).  It is used to parse the
+        fragment on cache miss (and to resolve nested fragments).
+        """
+        if key in self.parsed:
+            nodes, errors = self.parsed.pop(key)
+        else:
+            nodes, errors = self.parse(fragments[key], fragments)
+
+        self.parsed[key] = (nodes, errors)  # move to the end
+        while len(self.parsed) > self.maxsize:
+            self.parsed.popitem(last=False)
+
+        return [node.deepcopy() for node in nodes], errors
+
+    def parse(self, content, fragments):
+        from docutils.core import publish_doctree
+        from recommonmark.parser import CommonMarkParser
+        from sphinxcontrib.apiblueprint.translator import APIBlueprintTranslator
+
+        doctree = publish_doctree(content, parser=CommonMarkParser(),
+                                  settings_overrides={'doctitle_xform': False})
+        translator = APIBlueprintTranslator(None, doctree, fragments)
+        doctree.walkabout(translator)
+        return doctree[:], [error.message for error in translator.errors]
+
+
+#: The fragment cache shared in the process
+cache = FragmentCache()
@@ -0,0 +1,197 @@
+# -*- coding: utf-8 -*-
+"""Cache of rendered HTML of actions
+
+The HTML translator is extended to look up the HTML of each action (``desc``
+node made by :class:`APIBlueprintRepresenter`) by the hash of its subtree and
+the builder.  On a hit, the cached HTML is used and the subtree is not
+visited.  The cache is stored in the doctree directory with the fingerprint
+of the configuration and the translations; it is dropped when they change.
+
+On parallel builds, the workers append new fragments to their own files, and
+they are merged into the cache on build-finished.
+"""
+import os
+import glob
+import pickle
+import hashlib
+from collections import OrderedDict
+from docutils import nodes
+from sphinx.util import logging
+
+logger = logging.getLogger(__name__)
+
+CACHE_FILE = 'apiblueprint-html.pickle'
+WORKER_FILE = 'apiblueprint-html.%s.pickle'
+
+
+def stable_repr(value):
+    """Returns repr() of the value which does not depend on the order of sets and dicts"""
+    if isinstance(value, dict):
+        return '{%s}' % ', '.join(sorted('%s: %s' % (stable_repr(k), stable_repr(v)) for k, v in value.items()))
+    elif isinstance(value, (set, frozenset)):
+        return '{%s}' % ', '.join(sorted(stable_repr(item) for item in value))
+    elif isinstance(value, (list, tuple)):
+        return '[%s]' % ', '.join(stable_repr(item) for item in value)
+    else:
+        return repr(value)
+
+
+def get_fingerprint(app):
+    """Returns the hash of the settings affecting HTML of actions
+
+    It covers the builder, all configuration values which need to rebuild
+    HTML (e.g. ``html_permalinks_icon``, ``language``) and the catalog of
+    translations.
+    """
+    values = ['%s=%s' % (item.name, stable_repr(item.value))
+              for item in app.config if item.rebuild in ('env', 'html')]
+    catalog = getattr(app.translator, '_catalog', {})
+    source = '\0'.join([app.builder.name, stable_repr(catalog)] + sorted(values))
+    return hashlib.sha1(source.encode('utf-8')).hexdigest()
+
+
+class HTMLCache(object):
+    """LRU cache of HTML fragments"""
+
+    def __init__(self, maxsize, fingerprint=None):
+        self.maxsize = maxsize
+        self.fingerprint = fingerprint
+        self.fragments = OrderedDict()
+        self.added = []  # keys stored in this process
+        self.pid = os.getpid()  # the process owning the cache file
+        self.current_pid = self.pid
+        self.hits = 0
+
+    def is_worker(self):
+        """Returns True if running in a worker of parallel build
+
+        The counters inherited from the parent process are reset on the
+        first call in each worker.
+        """
+        if self.current_pid != os.getpid():
+            self.current_pid = os.getpid()
+            self.added = []
+            self.hits = 0
+
+        return self.pid != self.current_pid
+
+    def get(self, key):
+        html = self.fragments.pop(key, None)
+        if html is not None:
+            self.fragments[key] = html  # move to the end
+            self.hits += 1
+
+        return html
+
+    def store(self, key, html):
+        self.fragments.pop(key, None)
+        self.fragments[key] = html
+        self.added.append(key)
+        while len(self.fragments) > self.maxsize:
+            self.fragments.popitem(last=False)
+
+    def load(self, filename):
+        try:
+            with open(filename, 'rb') as fd:
+                fingerprint, fragments = pickle.load(fd)
+            if fingerprint == self.fingerprint:
+                self.fragments = fragments
+        except Exception:
+            pass  # broken or incompatible cache; start with empty one
+
+    def save(self, filename):
+        with open(filename, 'wb') as fd:
+            pickle.dump((self.fingerprint, self.fragments), fd, pickle.HIGHEST_PROTOCOL)
+
+    def flush_added(self, filename):
+        """Appends the fragments stored and the hits in this process (used by the workers of parallel builds)"""
+        if self.added or self.hits:
+            fragments = [(key, self.fragments[key]) for key in self.added if key in self.fragments]
+            with open(filename, 'ab') as fd:
+                pickle.dump((self.hits, fragments), fd, pickle.HIGHEST_PROTOCOL)
+            self.added = []
+            self.hits = 0
+
+    def merge_added(self, filename):
+        """Merges the fragments and the hits appended by :meth:`flush_added`"""
+        try:
+            with open(filename, 'rb') as fd:
+                while True:
+                    hits, fragments = pickle.load(fd)
+                    self.hits += hits
+                    for key, html in fragments:
+                        self.store(key, html)
+        except EOFError:
+            pass
+        except Exception:
+            pass  # broken file; ignore the rest of it
+
+
+class CachedActionTranslatorMixin(object):
+    """Reuses the cached HTML of actions"""
+
+    def cache_key(self, node):
+        source = '\0'.join([getattr(self.builder, 'current_docname', ''), node.pformat()])
+        return hashlib.sha1(source.encode('utf-8')).hexdigest()
+
+    def visit_document(self, node):
+        cache = getattr(self.builder, 'apiblueprint_html_cache', None)
+        if cache is not None:
+            cache.is_worker()  # reset the counters if forked
+        return super(CachedActionTranslatorMixin, self).visit_document(node)
+
+    def visit_desc(self, node):
+        cache = getattr(self.builder, 'apiblueprint_html_cache', None)
+        if cache is None or len(node) < 2 or 'apiblueprint_resource' not in node[1]:
+            return super(CachedActionTranslatorMixin, self).visit_desc(node)
+
+        key = self.cache_key(node)
+        html = cache.get(key)
+        if html is not None:
+            self.body.append(html)
+            raise nodes.SkipNode
+
+        node['apiblueprint_cache'] = (key, len(self.body))
+        return super(CachedActionTranslatorMixin, self).visit_desc(node)
+
+    def depart_desc(self, node):
+        super(CachedActionTranslatorMixin, self).depart_desc(node)
+        if 'apiblueprint_cache' in node:
+            key, start = node.attributes.pop('apiblueprint_cache')
+            self.builder.apiblueprint_html_cache.store(key, ''.join(self.body[start:]))
+
+    def depart_document(self, node):
+        super(CachedActionTranslatorMixin, self).depart_document(node)
+        cache = getattr(self.builder, 'apiblueprint_html_cache', None)
+        if cache is not None and cache.is_worker():
+            # in a worker of parallel build; the cache of this process is thrown away
+            filename = os.path.join(self.builder.doctreedir, WORKER_FILE % os.getpid())
+            cache.flush_added(filename)
+
+
+def on_builder_inited(app):
+    if not app.config.apiblueprint_html_cache or app.builder.format != 'html':
+        return
+
+    cache = HTMLCache(app.config.apiblueprint_html_cache_size, get_fingerprint(app))
+    cache.load(os.path.join(app.doctreedir, CACHE_FILE))
+    app.builder.apiblueprint_html_cache = cache
+
+    translator = app.builder.get_translator_class()
+    if not issubclass(translator, CachedActionTranslatorMixin):
+        cls = type(translator.__name__, (CachedActionTranslatorMixin, translator), {})
+        app.set_translator(app.builder.name, cls, override=True)
+
+
+def on_build_finished(app, exception):
+    cache = getattr(app.builder, 'apiblueprint_html_cache', None)
+    if exception or cache is None:
+        return
+
+    for filename in glob.glob(os.path.join(app.doctreedir, WORKER_FILE % '*')):
+        cache.merge_added(filename)
+        os.remove(filename)
+
+    if cache.hits:
+        logger.info('%d HTML fragment(s) of actions reused.' % cache.hits)
+    cache.save(os.path.join(app.doctreedir, CACHE_FILE))
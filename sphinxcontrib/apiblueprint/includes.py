@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+"""Include graph of documents and query of affected documents
+
+The include graph is collected into the build environment on reading (see
+:func:`collector.note_includes`), and written to ``apiblueprint-includes.json``
+in the output directory when :confval:`apiblueprint_include_graph` is set::
+
+    {"documents": {"index": {"source": "index.rst",
+                             "includes": {"index.rst": ["api.md"],
+                                          "api.md": ["fragment.md"]}}}}
+
+``apiblueprint-affected`` reads the graph and prints the documents affected by
+the given changed files.
+"""
+import io
+import os
+import sys
+import json
+import argparse
+from collections import deque
+from sphinxcontrib.apiblueprint.collector import get_includes
+
+GRAPH_FILE = 'apiblueprint-includes.json'
+
+
+def dump(env):
+    """Returns the include graph of all documents as a JSON serializable dict"""
+    includes = get_includes(env)
+    documents = {}
+    for docname in env.found_docs:
+        graph = includes.get(docname, {})
+        documents[docname] = {'source': str(env.doc2path(docname, base=None)),
+                              'includes': dict((filename, sorted(graph[filename])) for filename in graph)}
+
+    return {'documents': documents}
+
+
+def affected(graph, changed):
+    """Returns docnames affected by the changed files
+
+    The graph is traversed from the changed files to the sources of documents
+    through the reversed edges; each file is visited at most once.
+    """
+    parents = {}  # filename -> files including it
+    owners = {}   # source filename -> docnames
+    for docname, document in graph['documents'].items():
+        owners.setdefault(document['source'], []).append(docname)
+        for filename, included in document['includes'].items():
+            for child in included:
+                parents.setdefault(child, set()).add(filename)
+
+    visited = set(changed)
+    queue = deque(visited)
+    while queue:
+        filename = queue.popleft()
+        for parent in parents.get(filename, ()):
+            if parent not in visited:
+                visited.add(parent)
+                queue.append(parent)
+
+    return sorted(docname for filename in visited for docname in owners.get(filename, ()))
+
+
+def on_build_finished(app, exception):
+    if exception or not app.config.apiblueprint_include_graph:
+        return
+
+    with io.open(os.path.join(app.builder.outdir, GRAPH_FILE), 'w', encoding='utf-8') as fd:
+        fd.write(json.dumps(dump(app.builder.env), sort_keys=True, ensure_ascii=False))
+
+
+def get_parser():
+    parser = argparse.ArgumentParser(prog='apiblueprint-affected',
+                                     description='Print documents affected by changed files')
+    parser.add_argument('graph', metavar='GRAPH',
+                        help='path to %s in the output directory' % GRAPH_FILE)
+    parser.add_argument('files', metavar='FILE', nargs='*',
+                        help='changed files')
+    parser.add_argument('-s', '--srcdir', default='.',
+                        help='source directory of the documents (default: current directory)')
+    return parser
+
+
+def main(argv=sys.argv[1:]):
+    options = get_parser().parse_args(argv)
+    with io.open(options.graph, encoding='utf-8') as fd:
+        graph = json.load(fd)
+
+    changed = [os.path.normpath(os.path.relpath(filename, options.srcdir)) for filename in options.files]
+    for docname in affected(graph, changed):
+        sys.stdout.write(docname + '\n')
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,389 @@
+# -*- coding: utf-8 -*-
+"""Intermediate representation of API Blueprint
+
+The classes in this module are plain, ``__slots__`` based objects; they do not
+depend on docutils or Sphinx.  They can be converted to (and restored from)
+JSON compatible dicts with :meth:`Element.to_dict` and :func:`from_dict`.
+
+The IR is a summary of the parsed blueprint, built from the parsed sections
+in addition to the doctree.  It is what is stored in the environment, cached
+and exported.  It is not used for rendering: descriptions are kept only as
+text, so the doctree is still represented from the parsed sections (with
+their markup), and building the IR does not reduce the memory of reading a
+blueprint.
+"""
+import re
+import json
+import hashlib
+
+ELEMENTS = {}
+
+
+class ElementMeta(type):
+    def __init__(cls, name, bases, attrs):
+        type.__init__(cls, name, bases, attrs)
+        ELEMENTS[name] = cls
+
+
+# use metaclass on both of python2 and python3
+BaseElement = ElementMeta('BaseElement', (object,), {'__slots__': ()})
+
+
+class Element(BaseElement):
+    __slots__ = ()
+
+    # pairs of field name and its default value (lists are copied on init)
+    fields = ()
+
+    def __init__(self, **kwargs):
+        for name, default in self.fields:
+            value = kwargs.pop(name, default)
+            if isinstance(value, list) and value is default:
+                value = []
+            setattr(self, name, value)
+
+        if kwargs:
+            raise TypeError('unknown fields for %s: %s' % (self.__class__.__name__, ', '.join(kwargs)))
+
+    def __getstate__(self):
+        return dict((name, getattr(self, name)) for name, _ in self.fields)
+
+    def __setstate__(self, state):
+        for name, _ in self.fields:
+            setattr(self, name, state.get(name))
+
+    def __eq__(self, other):
+        return type(self) is type(other) and self.__getstate__() == other.__getstate__()
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    # elements are mutable; not hashable even on python2
+    __hash__ = None
+
+    def __repr__(self):
+        return '<%s>' % self.__class__.__name__
+
+    def to_dict(self):
+        data = {'element': self.__class__.__name__}
+        for name, _ in self.fields:
+            data[name] = to_dict(getattr(self, name))
+
+        return data
+
+
+def to_dict(value):
+    if isinstance(value, Element):
+        return value.to_dict()
+    elif isinstance(value, (list, tuple)):
+        return [to_dict(item) for item in value]
+    else:
+        return value
+
+
+def digest(element):
+    """Returns the structural hash of the element; it does not depend on the order of dict keys"""
+    data = json.dumps(to_dict(element), sort_keys=True, separators=(',', ':'))
+    return hashlib.sha1(data.encode('utf-8')).hexdigest()
+
+
+def from_dict(value):
+    """Restores IR from the output of :meth:`Element.to_dict`"""
+    if isinstance(value, dict) and 'element' in value:
+        cls = ELEMENTS[value['element']]
+        kwargs = dict((name, from_dict(value.get(name, default))) for name, default in cls.fields)
+        return cls(**kwargs)
+    elif isinstance(value, list):
+        return [from_dict(item) for item in value]
+    else:
+        return value
+
+
+class Blueprint(Element):
+    __slots__ = ('name', 'description', 'groups', 'data_structures', 'errors')
+    fields = (('name', ''), ('description', ''), ('groups', []), ('data_structures', []), ('errors', []))
+
+    def resources(self):
+        for group in self.groups:
+            for resource in group.resources:
+                yield resource
+
+    def actions(self):
+        for resource in self.resources():
+            for action in resource.actions:
+                yield action
+
+
+class Group(Element):
+    __slots__ = ('name', 'description', 'resources')
+    fields = (('name', ''), ('description', ''), ('resources', []))
+
+
+class Resource(Element):
+    __slots__ = ('identifier', 'uri', 'description', 'parameters', 'attributes', 'model', 'actions')
+    fields = (('identifier', ''), ('uri', ''), ('description', ''), ('parameters', []),
+              ('attributes', None), ('model', None), ('actions', []))
+
+
+class Action(Element):
+    __slots__ = ('identifier', 'method', 'uri', 'description', 'relation', 'parameters', 'attributes',
+                 'requests', 'responses')
+    fields = (('identifier', ''), ('method', ''), ('uri', ''), ('description', ''), ('relation', None),
+              ('parameters', []), ('attributes', None), ('requests', []), ('responses', []))
+
+
+class Payload(Element):
+    __slots__ = ('content_type', 'description', 'headers', 'attributes', 'body', 'schema', 'model_ref')
+    fields = (('content_type', ''), ('description', ''), ('headers', []), ('attributes', None),
+              ('body', None), ('schema', None), ('model_ref', None))
+
+
+class Model(Payload):
+    __slots__ = ()
+
+
+class Request(Payload):
+    __slots__ = ('identifier',)
+    fields = (('identifier', ''),) + Payload.fields
+
+
+class Response(Payload):
+    __slots__ = ('status_code',)
+    fields = (('status_code', 200),) + Payload.fields
+
+
+class Parameter(Element):
+    __slots__ = ('name', 'example', 'type', 'required', 'description')
+    fields = (('name', ''), ('example', None), ('type', None), ('required', True), ('description', ''))
+
+    PATTERN = re.compile('^\s*([^\s:(]+)\s*(?::\s*`?([^`(]*?)`?\s*)?(?:\(([^)]*)\))?\s*(?:-\s*(.*))?$')
+
+    @classmethod
+    def parse(cls, line):
+        """Parses a parameter definition: ``name: `example` (type, required) - description``"""
+        matched = cls.PATTERN.match(line)
+        if matched is None:
+            return cls(name=line.strip())
+
+        name, example, options, description = matched.groups()
+        param = cls(name=name, example=example or None, description=(description or '').strip())
+        for option in (options or '').split(','):
+            option = option.strip()
+            if option == 'optional':
+                param.required = False
+            elif option and option != 'required':
+                param.type = option
+
+        return param
+
+
+class DataStructure(Element):
+    __slots__ = ('name', 'type', 'description', 'attributes')
+    fields = (('name', ''), ('type', ''), ('description', ''), ('attributes', ''))
+
+
+class Member(Element):
+    """A member of MSON attributes (see :func:`parse_attributes`)"""
+    __slots__ = ('name', 'example', 'type', 'required', 'description', 'members')
+    fields = (('name', ''), ('example', None), ('type', None), ('required', False), ('description', ''),
+              ('members', []))
+
+    @classmethod
+    def parse(cls, line):
+        """Parses a member definition: ``name: example (type, required) - description``"""
+        matched = Parameter.PATTERN.match(line)
+        if matched is None:
+            return cls(name=line.strip())
+
+        name, example, options, description = matched.groups()
+        member = cls(name=name, example=example or None, description=(description or '').strip())
+        for option in (options or '').split(','):
+            option = option.strip()
+            if option == 'required':
+                member.required = True
+            elif option and option not in ('optional', 'fixed', 'sample', 'default', 'nullable'):
+                member.type = option
+
+        return member
+
+
+class Annotation(Element):
+    """An error found on parsing blueprint"""
+    __slots__ = ('source', 'line', 'message')
+    fields = (('source', None), ('line', None), ('message', ''))
+
+    def __str__(self):
+        if self.line:
+            return '%s:%s: %s' % (self.source, self.line, self.message)
+        else:
+            return '%s: %s' % (self.source, self.message)
+
+
+MSON_MEMBER = re.compile('^( *)[+-] (.*)$')
+
+
+def parse_members(lines):
+    """Parses indented MSON members (``+ name: example (type)``); returns a list of :class:`Member`"""
+    members = []
+    stack = [(-1, members)]  # pairs of indent and the list of members at the level
+    for line in lines:
+        matched = MSON_MEMBER.match(line)
+        if matched is None:
+            continue
+
+        indent = len(matched.group(1))
+        while indent <= stack[-1][0]:
+            stack.pop()
+        member = Member.parse(matched.group(2))
+        stack[-1][1].append(member)
+        stack.append((indent, member.members))
+
+    return members
+
+
+def parse_attributes(text):
+    """Parses the text of Attributes section kept in the IR; returns a pair of the type and the members
+
+    The first line is the header (e.g. ``Attributes (Message)``), and the
+    following lines are the members indented by their depth.
+    """
+    lines = (text or '').splitlines()
+    typename = None
+    if lines and MSON_MEMBER.match(lines[0]) is None:
+        matched = re.search('\((.*)\)\s*$', lines.pop(0))
+        if matched:
+            typename = matched.group(1).strip()
+
+    return typename, parse_members(lines)
+
+
+def from_doctree(doctree):
+    """Builds IR from API Blueprint based doctree (before representing)"""
+    from docutils import nodes
+    from sphinx import addnodes as sphinxnodes
+    from sphinxcontrib.apiblueprint import addnodes
+    from sphinxcontrib.apiblueprint.utils import detect_section_type, get_children
+
+    def description(node):
+        texts = [subnode.astext() for subnode in node
+                 if not isinstance(subnode, (addnodes.Section, nodes.title))]
+        return "\n\n".join(texts)
+
+    def child(node, cls):
+        children = get_children(node, cls)
+        if children:
+            return children[0]
+        else:
+            return None
+
+    def text(node):
+        if node is None:
+            return None
+        else:
+            return "\n\n".join(subnode.astext() for subnode in node)
+
+    def mson(node, depth=0):
+        """Returns the members in the bullet lists as indented lines"""
+        lines = []
+        for bullet_list in get_children(node, nodes.bullet_list):
+            for item in bullet_list:
+                title = item[0].astext() if item.children and isinstance(item[0], nodes.paragraph) else ''
+                lines.append('    ' * depth + '+ ' + ' '.join(title.split()))
+                lines.extend(mson(item, depth + 1))
+        return lines
+
+    def attributes(node):
+        if node is None:
+            return None
+        else:
+            header = [subnode.astext() for subnode in node if not isinstance(subnode, nodes.bullet_list)]
+            return "\n".join(header + mson(node))
+
+    def parameters(node):
+        params = []
+        if node is not None:
+            for item in node.traverse(nodes.list_item):
+                params.append(Parameter.parse(item.astext().splitlines()[0]))
+        return params
+
+    def payload(cls, node, **kwargs):
+        headers = child(node, addnodes.Headers)
+        return cls(content_type=node.get('content_type', ''),
+                   description=description(node),
+                   headers=headers.headers[:] if headers is not None else [],
+                   attributes=attributes(child(node, addnodes.Attributes)),
+                   body=text(child(node, addnodes.Body)),
+                   schema=text(child(node, addnodes.Schema)),
+                   model_ref=node.get('model_ref'),
+                   **kwargs)
+
+    def action(node):
+        relation = child(node, addnodes.Relation)
+        return Action(identifier=node['identifier'],
+                      method=node['http_method'],
+                      uri=node['uri'],
+                      description=description(node),
+                      relation=relation['identifier'] if relation is not None else None,
+                      parameters=parameters(child(node, addnodes.Parameters)),
+                      attributes=attributes(child(node, addnodes.Attributes)),
+                      requests=[payload(Request, subnode, identifier=subnode['identifier'])
+                                for subnode in get_children(node, addnodes.Request)],
+                      responses=[payload(Response, subnode, status_code=subnode['status_code'])
+                                 for subnode in get_children(node, addnodes.Response)])
+
+    def resource(node):
+        if isinstance(node, addnodes.ResourceAction):
+            return Resource(uri=node['uri'], actions=[action(node)])
+
+        model = child(node, addnodes.Model)
+        if model is not None:
+            header = model[0].astext()
+            matched = re.search('\((.*)\)\s*$', header)
+            model = payload(Model, model)
+            model.content_type = matched.group(1).strip() if matched else ''
+            model.description = model.description[len(header):].lstrip('\n')  # drop the header
+
+        return Resource(identifier=node['identifier'],
+                        uri=node['uri'],
+                        description=description(node),
+                        parameters=parameters(child(node, addnodes.Parameters)),
+                        attributes=attributes(child(node, addnodes.Attributes)),
+                        model=model,
+                        actions=[action(subnode) for subnode in get_children(node, addnodes.Action)])
+
+    def data_structures(node):
+        structures = []
+        for desc in node.traverse(sphinxnodes.desc):
+            matched = re.search('^(.*?)\s*\((.*)\)$', desc[0].astext())
+            structures.append(DataStructure(name=desc[0]['fullname'],
+                                            type=matched.group(2) if matched else '',
+                                            description=text(subnode for subnode in desc[1]
+                                                             if not isinstance(subnode, nodes.bullet_list)),
+                                            attributes="\n".join(mson(desc[1]))))
+        return structures
+
+    blueprint = Blueprint()
+
+    def walk(node, group):
+        for subnode in node:
+            if isinstance(subnode, addnodes.ResourceGroup):
+                newgroup = Group(name=subnode['identifier'], description=description(subnode))
+                blueprint.groups.append(newgroup)
+                walk(subnode, newgroup)
+            elif isinstance(subnode, addnodes.Resource):
+                if group is None:
+                    group = Group()
+                    blueprint.groups.append(group)
+                group.resources.append(resource(subnode))
+            elif isinstance(subnode, addnodes.DataStructures):
+                blueprint.data_structures.extend(data_structures(subnode))
+            elif isinstance(subnode, addnodes.Section):
+                pass
+            elif isinstance(subnode, nodes.section) and detect_section_type('header', subnode) is None:
+                if not blueprint.name:
+                    blueprint.name = subnode[0].astext()
+                    blueprint.description = description(subnode)
+                walk(subnode, group)
+
+    walk(doctree, None)
+    return blueprint
@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+import os
+from sphinx.builders import Builder
+from sphinx.util import logging
+from sphinxcontrib.apiblueprint.collector import get_blueprints, get_updated_docs
+
+logger = logging.getLogger(__name__)
+
+
+class ApiBlueprintLintBuilder(Builder):
+    """Parses and validates all blueprints without writing any output
+
+    Errors found on reading are reported as usual.  The errors of documents
+    not read in this build (not changed) are reported again from the
+    environment, so the summary always covers all blueprints.
+    """
+    name = 'apiblueprint-lint'
+    format = ''
+    epilog = 'API Blueprint validation finished.'
+    allow_parallel = True
+
+    def init(self):
+        self.error_count = 0
+
+    def get_outdated_docs(self):
+        return []
+
+    def get_target_uri(self, docname, typ=None):
+        return ''
+
+    def prepare_writing(self, docnames):
+        pass
+
+    def write(self, *args, **kwargs):
+        pass  # skip resolving and writing doctrees
+
+    def write_doc(self, docname, doctree):
+        pass
+
+    def finish(self):
+        updated = get_updated_docs(self.env)
+        blueprints = get_blueprints(self.env)
+
+        self.error_count = 0
+        for docname in sorted(blueprints):
+            for blueprint in blueprints[docname]:
+                for error in blueprint.errors:
+                    self.error_count += 1
+                    if docname not in updated:
+                        location = '%s:%s' % (os.path.join(self.srcdir, error.source), error.line)
+                        logger.error(error.message, location=location)
+
+        if self.error_count:
+            logger.info('%d error(s) found in API Blueprints.' % self.error_count)
+        else:
+            logger.info('no errors found in API Blueprints.')
+
+
+def on_build_finished(app, exception):
+    """Makes the build fail if errors are found by the lint builder"""
+    if isinstance(app.builder, ApiBlueprintLintBuilder) and app.builder.error_count:
+        app.statuscode = 1
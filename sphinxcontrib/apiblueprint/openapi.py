@@ -0,0 +1,353 @@
+# -*- coding: utf-8 -*-
+"""Builder to export blueprints as an OpenAPI 3 document
+
+Each document is converted to a sorted chunk of lines (``<kind>\\t<key>\\t
+<method>\\t<JSON>``) cached in the doctree directory.  Only the chunks of
+documents read in the current build are regenerated; then the chunks are
+merged and streamed to ``openapi.json`` one path at a time.
+
+Models referred from the other documents are inlined into the chunk, so the
+hashes of the referred Models are stored next to the chunk
+(``<docname>.json``).  The chunk is also regenerated if any of them is changed.
+"""
+import io
+import os
+import re
+import json
+import heapq
+from itertools import groupby
+from sphinx.builders import Builder
+from sphinx.util import logging
+from sphinxcontrib.apiblueprint import ir
+from sphinxcontrib.apiblueprint.collector import get_blueprints, get_updated_docs
+from sphinxcontrib.apiblueprint.elements import sample
+
+logger = logging.getLogger(__name__)
+
+OPENAPI_VERSION = '3.0.3'
+CACHE_DIR = 'apiblueprint-openapi'
+TYPES = ('string', 'number', 'integer', 'boolean', 'array', 'object')
+PATH_PARAMETER = re.compile('\{([^?&#+/.;}][^}]*)\}')
+QUERY_PARAMETERS = re.compile('\{[?&][^}]*\}')
+NESTED_TYPE = re.compile('^(array|enum)\[(.*)\]$')
+
+
+def schema_of(typename):
+    if not typename or typename in TYPES:
+        return {'type': typename or 'string'}
+    elif typename == 'enum':
+        return {'type': 'string'}
+    else:
+        return {'$ref': '#/components/schemas/%s' % typename}
+
+
+def schema_of_members(typename, members):
+    """Converts MSON members (see :func:`ir.parse_attributes`) to a schema of the type"""
+    if not typename:
+        typename = 'object' if members else 'string'
+
+    matched = NESTED_TYPE.match(typename)
+    if matched:
+        typename = matched.group(1)
+        nested = [name.strip() for name in matched.group(2).split(',') if name.strip()]
+    else:
+        nested = []
+
+    if typename == 'array':
+        schema = {'type': 'array'}
+        if nested:
+            schema['items'] = schema_of(nested[0])
+        elif members:
+            schema['items'] = schema_of_members(members[0].type, members[0].members)
+        examples = [sample(member.type, member.name) for member in members if not member.members]
+        if examples:
+            schema['example'] = examples
+        return schema
+    elif typename == 'enum':
+        valuetype = nested[0] if nested else 'string'
+        schema = schema_of(valuetype)
+        if members:
+            schema['enum'] = [sample(member.type or valuetype, member.name) for member in members]
+        return schema
+    elif not members:
+        return schema_of(typename)
+
+    schema = {'type': 'object', 'properties': {}}
+    required = []
+    for member in members:
+        schema['properties'][member.name] = schema_of_member(member)
+        if member.required:
+            required.append(member.name)
+    if required:
+        schema['required'] = required
+
+    if typename == 'object':
+        return schema
+    else:
+        # members added to the named type (or the base type)
+        return {'allOf': [schema_of(typename), schema]}
+
+
+def schema_of_member(member):
+    schema = schema_of_members(member.type, member.members)
+    if '$ref' in schema and member.description:
+        schema = {'allOf': [schema]}  # siblings of $ref are ignored
+    if member.description:
+        schema['description'] = member.description
+    if member.example is not None and '$ref' not in schema:
+        schema['example'] = sample(member.type, member.example)
+
+    return schema
+
+
+def schema_of_attributes(attributes):
+    typename, members = ir.parse_attributes(attributes)
+    return schema_of_members(typename or 'object', members)
+
+
+def parameters(resource, action):
+    path_params = PATH_PARAMETER.findall(action.uri)
+    params = dict((param.name, param) for param in resource.parameters)
+    params.update((param.name, param) for param in action.parameters)
+
+    results = []
+    for name in sorted(params):
+        param = params[name]
+        location = 'path' if name in path_params else 'query'
+        result = {'name': name,
+                  'in': location,
+                  'required': True if location == 'path' else param.required,
+                  'schema': schema_of(param.type)}
+        if param.description:
+            result['description'] = param.description
+        if param.example is not None:
+            result['example'] = param.example
+        results.append(result)
+
+    return results
+
+
+def media_type(payload):
+    content = {}
+    if payload.body is not None:
+        content['example'] = payload.body
+    if payload.schema is not None:
+        try:
+            content['schema'] = json.loads(payload.schema)
+        except ValueError:
+            pass  # not a JSON Schema
+    if 'schema' not in content and payload.attributes:
+        content['schema'] = schema_of_attributes(payload.attributes)
+
+    return {payload.content_type or 'text/plain': content}
+
+
+def headers(payload):
+    results = {}
+    for header in payload.headers:
+        name, _, value = header.partition(':')
+        if name.strip().lower() != 'content-type':
+            results[name.strip()] = {'schema': {'type': 'string'}, 'example': value.strip()}
+
+    return results
+
+
+def response_object(response, models):
+    payload = models.get(response.model_ref, response)
+    result = {'description': response.description or payload.description or ''}
+    if headers(response):
+        result['headers'] = headers(response)
+    if payload.body is not None or payload.schema is not None or payload.attributes:
+        result['content'] = media_type(payload)
+
+    return result
+
+
+def operation(resource, action, models):
+    result = {'responses': {}}
+    if action.identifier:
+        result['summary'] = action.identifier
+    if action.description:
+        result['description'] = action.description
+    if action.parameters or resource.parameters:
+        result['parameters'] = parameters(resource, action)
+
+    content = {}
+    for request in action.requests:
+        payload = models.get(request.model_ref, request)
+        if payload.body is not None or payload.schema is not None or payload.attributes:
+            for content_type, media in media_type(payload).items():
+                content.setdefault(content_type, media)
+    if content:
+        result['requestBody'] = {'content': content}
+
+    for response in action.responses:
+        result['responses'].setdefault(str(response.status_code), response_object(response, models))
+
+    return result
+
+
+def iterlines(blueprints, models):
+    """Converts blueprints of a document to lines of the chunk"""
+    for blueprint in blueprints:
+        for resource in blueprint.resources():
+            for action in resource.actions:
+                path = QUERY_PARAMETERS.sub('', action.uri)
+                data = json.dumps(operation(resource, action, models), sort_keys=True)
+                yield u'paths\t%s\t%s\t%s\n' % (path, action.method.lower(), data)
+
+        for structure in blueprint.data_structures:
+            schema = schema_of_members(structure.type or 'object',
+                                       ir.parse_members((structure.attributes or '').splitlines()))
+            if structure.description:
+                schema['description'] = structure.description
+            yield u'schemas\t%s\t\t%s\n' % (structure.name, json.dumps(schema, sort_keys=True))
+
+
+def get_models(blueprints):
+    """Returns a dict which maps identifiers of resources to their Models"""
+    models = {}
+    for docname in blueprints:
+        for blueprint in blueprints[docname]:
+            for resource in blueprint.resources():
+                if resource.model is not None and resource.identifier:
+                    models[resource.identifier] = resource.model
+
+    return models
+
+
+def get_model_hashes(blueprints, models):
+    """Returns a dict which maps Models referred from the blueprints to their hashes (None if not found)"""
+    from sphinxcontrib.apiblueprint.ir import digest
+
+    hashes = {}
+    for blueprint in blueprints:
+        for action in blueprint.actions():
+            for payload in action.requests + action.responses:
+                if payload.model_ref:
+                    model = models.get(payload.model_ref)
+                    hashes[payload.model_ref] = digest(model) if model is not None else None
+
+    return hashes
+
+
+def iterencode(info, chunks):
+    """Merges sorted chunks and encodes them to OpenAPI document chunk by chunk"""
+    yield '{"openapi": %s, "info": %s' % (json.dumps(OPENAPI_VERSION), json.dumps(info, sort_keys=True))
+
+    current = None
+    entries = (line.rstrip('\n').split('\t', 3) for line in heapq.merge(*chunks))
+    for (kind, key), items in groupby(entries, lambda entry: (entry[0], entry[1])):
+        if kind != current:
+            if current is None and kind == 'paths':
+                yield ', "paths": {'
+            elif current is None:
+                yield ', "paths": {}, "components": {"schemas": {'
+            else:
+                yield '}, "components": {"schemas": {'
+            current = kind
+        else:
+            yield ', '
+
+        if kind == 'paths':
+            methods = set()
+            yield '%s: {' % json.dumps(key)
+            for _, _, method, data in items:
+                if method not in methods:  # the first definition wins
+                    if methods:
+                        yield ', '
+                    yield '%s: %s' % (json.dumps(method), data)
+                    methods.add(method)
+            yield '}'
+        else:
+            yield '%s: %s' % (json.dumps(key), next(items)[3])
+
+    if current is None:
+        yield ', "paths": {}}'
+    elif current == 'paths':
+        yield '}}'
+    else:
+        yield '}}}'
+
+
+class ApiBlueprintOpenAPIBuilder(Builder):
+    """Exports all blueprints as an OpenAPI 3 document (``openapi.json``)"""
+    name = 'apiblueprint-openapi'
+    format = ''
+    epilog = 'The OpenAPI document is in %(outdir)s.'
+    allow_parallel = True
+
+    def init(self):
+        self.cachedir = os.path.join(self.doctreedir, CACHE_DIR)
+
+    def get_outdated_docs(self):
+        return []
+
+    def get_target_uri(self, docname, typ=None):
+        return ''
+
+    def prepare_writing(self, docnames):
+        pass
+
+    def write(self, *args, **kwargs):
+        pass  # skip resolving and writing doctrees
+
+    def write_doc(self, docname, doctree):
+        pass
+
+    def get_chunk_path(self, docname):
+        return os.path.join(self.cachedir, docname + '.txt')
+
+    def get_models_path(self, docname):
+        return os.path.join(self.cachedir, docname + '.json')
+
+    def is_outdated(self, docname, blueprints, models):
+        """Returns True if the chunk is not generated or any of the referred Models is changed"""
+        try:
+            with io.open(self.get_models_path(docname), encoding='utf-8') as fd:
+                hashes = json.load(fd)
+        except (IOError, ValueError):
+            return True
+
+        return (not os.path.exists(self.get_chunk_path(docname)) or
+                hashes != get_model_hashes(blueprints, models))
+
+    def write_chunk(self, docname, blueprints, models):
+        path = self.get_chunk_path(docname)
+        if not os.path.exists(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+
+        with io.open(path, 'w', encoding='utf-8') as fd:
+            fd.writelines(sorted(iterlines(blueprints, models)))
+        with io.open(self.get_models_path(docname), 'w', encoding='utf-8') as fd:
+            fd.write(json.dumps(get_model_hashes(blueprints, models), sort_keys=True))
+
+    def finish(self):
+        blueprints = get_blueprints(self.env)
+        updated = get_updated_docs(self.env)
+        models = get_models(blueprints)
+
+        count = 0
+        for docname in sorted(blueprints):
+            if docname in updated or self.is_outdated(docname, blueprints[docname], models):
+                self.write_chunk(docname, blueprints[docname], models)
+                count += 1
+        logger.info('%d of %d document(s) converted to OpenAPI.' % (count, len(blueprints)))
+
+        # remove chunks of removed documents
+        for root, _, files in os.walk(self.cachedir):
+            for filename in files:
+                path = os.path.join(root, filename)
+                docname = os.path.splitext(os.path.relpath(path, self.cachedir))[0].replace(os.sep, '/')
+                if docname not in blueprints:
+                    os.remove(path)
+
+        info = {'title': self.config.project, 'version': self.config.version or '1.0.0'}
+        chunks = [io.open(self.get_chunk_path(docname), encoding='utf-8') for docname in sorted(blueprints)]
+        try:
+            with open(os.path.join(self.outdir, 'openapi.json'), 'wb') as fd:
+                for chunk in iterencode(info, chunks):
+                    fd.write(chunk.encode('utf-8'))
+        finally:
+            for chunk in chunks:
+                chunk.close()
@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+from docutils import parsers
+from sphinxcontrib.apiblueprint.collector import note_blueprint
+from sphinxcontrib.apiblueprint.directive import MarkdownReader, note_dependencies, report_errors
+from sphinxcontrib.apiblueprint.split import MARKER
+from sphinxcontrib.apiblueprint.validation import report_invalid_bodies
+
+
+class ApiBlueprintParser(parsers.Parser):
+    """Source parser to read API Blueprint files (.apib) as Sphinx documents"""
+    supported = ('apiblueprint',)
+
+    def parse(self, inputstring, document):
+        from recommonmark.parser import CommonMarkParser
+        from sphinxcontrib.apiblueprint.translator import parse, represent
+
+        env = document.settings.env
+        relfn = env.doc2path(env.docname, base=None)
+        if inputstring.startswith(MARKER):
+            inputstring = '\n' + inputstring[len(MARKER):]  # keep line numbers
+        abspath = env.doc2path(env.docname)
+
+        try:
+            reader = MarkdownReader(env.srcdir, cache_fragments=True)
+            content = reader.expand(relfn, abspath, inputstring, [])
+            note_dependencies(env, reader, relfn)
+        except RuntimeError as exc:
+            document += document.reporter.error(str(exc))
+            return
+        except IOError as exc:
+            document += document.reporter.error('Fail to read API Blueprint: %s' % exc)
+            return
+
+        CommonMarkParser().parse(content, document)
+        blueprint = parse(env, document, reader.fragments)
+        report_errors(document, env, reader, blueprint)
+        report_invalid_bodies(document, env, reader, blueprint)
+        note_blueprint(env, blueprint)
+        represent(env, document)
@@ -0,0 +1,356 @@
+# -*- coding: utf-8 -*-
+"""Live preview server for API Blueprint files
+
+The rendered pages are kept in memory with the set of files read for each
+blueprint.  A watcher thread polls these files, re-renders only the
+blueprints including the changed files, and pushes the pages to the browsers
+through Server-Sent Events.  The blueprints are read and rendered by Sphinx
+(see :class:`SphinxRenderer`), so the pages look like the built documents.
+"""
+import io
+import os
+import re
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import threading
+from sphinxcontrib.apiblueprint import ir
+from sphinxcontrib.apiblueprint.addnodes import ParseError
+
+try:
+    from html import escape
+except ImportError:
+    from cgi import escape
+
+try:
+    from urllib.parse import quote, unquote
+    from socketserver import ThreadingMixIn
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+except ImportError:
+    from urllib import quote, unquote
+    from SocketServer import ThreadingMixIn
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+
+PAGE_TEMPLATE = u"""<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>%(title)s</title>
+<style>
+body { font-family: sans-serif; margin: 2em; }
+pre { background: #f4f4f4; padding: .5em; }
+.errors { color: #c00; }
+dt.sig { border-left: 3px solid #888; padding-left: 1em; margin-top: 1em; font-weight: bold; }
+</style>
+</head>
+<body>
+<div id="content">%(content)s</div>
+<script>
+var source = new EventSource(%(events)s);
+source.onmessage = function(event) {
+    document.getElementById('content').innerHTML = event.data;
+};
+</script>
+</body>
+</html>
+"""
+
+
+class WarningStream(object):
+    """Keeps the error messages emitted by Sphinx"""
+    ANSI_ESCAPE = re.compile('\x1b\\[[0-9;]*m')
+
+    def __init__(self):
+        self.errors = []
+
+    def write(self, text):
+        text = self.ANSI_ESCAPE.sub('', text)
+        for line in text.splitlines():
+            if 'ERROR: ' in line:
+                self.errors.append(line.split('ERROR: ', 1)[1])
+
+    def flush(self):
+        pass
+
+
+class SphinxRenderer(object):
+    """Reads and renders blueprints with a private Sphinx application
+
+    Each blueprint is read by an ``apiblueprint`` directive in a document of
+    the temporary source directory, so it is read, parsed and rendered only
+    once with the same translator and HTML writer as in Sphinx builds.  The
+    body of the page is taken on html-page-context, and the files read and
+    the errors are taken from the environment.
+    """
+
+    def __init__(self, srcdir):
+        from sphinx.application import Sphinx
+
+        self.srcdir = os.path.realpath(srcdir)
+        self.tmpdir = os.path.realpath(tempfile.mkdtemp(prefix='apiblueprint-preview-'))
+        self.docnames = {}     # relfn -> docname
+        self.outdated = set()  # docnames to be re-read
+        self.bodies = {}       # docname -> HTML of the body
+        self.warnings = WarningStream()
+        with io.open(os.path.join(self.tmpdir, 'index.rst'), 'w', encoding='utf-8') as fd:
+            fd.write(u'Preview\n=======\n')
+
+        self.app = Sphinx(self.tmpdir, None, os.path.join(self.tmpdir, '_build'),
+                          os.path.join(self.tmpdir, '_doctrees'), 'html',
+                          confoverrides={'extensions': ['sphinxcontrib.apiblueprint'], 'master_doc': 'index'},
+                          status=None, warning=self.warnings, freshenv=True)
+        self.app.connect('env-get-outdated', self.on_env_get_outdated)
+        self.app.connect('html-page-context', self.on_html_page_context)
+
+    def on_env_get_outdated(self, app, env, added, changed, removed):
+        # the blueprints are outside of the source directory; re-read them always
+        return sorted(self.outdated)
+
+    def on_html_page_context(self, app, pagename, templatename, context, doctree):
+        if pagename in self.outdated:
+            self.bodies[pagename] = context.get('body', u'')
+
+    def get_docname(self, relfn):
+        """Returns the docname of the document reading the blueprint (created on the first call)"""
+        if relfn not in self.docnames:
+            docname = self.docnames[relfn] = 'blueprint-%d' % len(self.docnames)
+            target = os.path.relpath(os.path.join(self.srcdir, relfn), self.tmpdir)
+            with io.open(os.path.join(self.tmpdir, docname + '.rst'), 'w', encoding='utf-8') as fd:
+                fd.write(u'.. apiblueprint:: %s\n' % target.replace(os.sep, '/'))
+
+        return self.docnames[relfn]
+
+    def to_relfn(self, filename):
+        """Converts the filename relative to the temporary directory to the one relative to srcdir"""
+        return os.path.relpath(os.path.normpath(os.path.join(self.tmpdir, filename)), self.srcdir)
+
+    def render(self, relfn):
+        """Reads and renders the blueprint
+
+        Returns a tuple of the HTML, the set of the files read (or None if
+        failed to read) and the list of errors.
+        """
+        from sphinx.errors import SphinxError
+        from sphinxcontrib.apiblueprint.collector import get_blueprints
+
+        docname = self.get_docname(relfn)
+        self.outdated = set([docname])
+        self.warnings.errors = []
+        try:
+            self.app.build(False, [os.path.join(self.tmpdir, docname + '.rst')])
+        except SphinxError as exc:
+            raise RuntimeError('Fail to render: %s' % exc)
+        finally:
+            self.outdated = set()
+
+        env = self.app.env
+        html = self.bodies.pop(docname, u'')
+        if docname not in get_blueprints(env):
+            return html, None, ['%s: %s' % (relfn, error) for error in self.warnings.errors]
+
+        errors = []
+        for blueprint in get_blueprints(env)[docname]:
+            for error in blueprint.errors:
+                errors.append(ir.Annotation(source=self.to_relfn(error.source), line=error.line,
+                                            message=error.message))
+        dependencies = set(self.to_relfn(str(filename)) for filename in env.dependencies.get(docname, ()))
+        return html, dependencies, errors
+
+    def close(self):
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+
+def render_errors(errors):
+    if errors:
+        items = u''.join(u'<li>%s</li>' % escape(str(error)) for error in errors)
+        return u'<ul class="errors">%s</ul>' % items
+    else:
+        return u''
+
+
+class Preview(object):
+    """Keeps the compiled blueprints and re-compiles them on changes"""
+
+    def __init__(self, srcdir, files):
+        self.srcdir = srcdir
+        self.pages = {}         # relfn -> (version, HTML)
+        self.dependencies = {}  # relfn -> files read for the blueprint
+        self.stats = {}         # relfn -> signature of the file
+        self.version = 0
+        self.condition = threading.Condition()
+        self.renderer = SphinxRenderer(srcdir)
+        for relfn in files:
+            self.compile(relfn)
+
+    def compile(self, relfn):
+        try:
+            html, dependencies, errors = self.renderer.render(relfn)
+            html = render_errors(errors) + html
+        except (ParseError, AssertionError, RuntimeError, IOError, ValueError) as exc:
+            dependencies = None
+            html = render_errors(['%s: %s' % (relfn, exc)])
+
+        if dependencies is None:
+            dependencies = self.dependencies.get(relfn, set([relfn]))
+
+        self.version += 1
+        self.pages[relfn] = (self.version, html)
+        self.dependencies[relfn] = set(dependencies)
+        for filename in dependencies:
+            self.stats.setdefault(filename, self.stat(filename))
+
+    def stat(self, relfn):
+        try:
+            st = os.stat(os.path.join(self.srcdir, relfn))
+            return (st.st_mtime, st.st_size)
+        except OSError:
+            return None
+
+    def update(self):
+        """Re-compiles the blueprints affected by changed files; returns their names"""
+        changed = set()
+        for filename, stat in list(self.stats.items()):
+            newstat = self.stat(filename)
+            if newstat != stat:
+                self.stats[filename] = newstat
+                changed.add(filename)
+
+        affected = sorted(relfn for relfn, dependencies in self.dependencies.items()
+                          if dependencies & changed)
+        if affected:
+            with self.condition:
+                for relfn in affected:
+                    self.compile(relfn)
+                self.condition.notify_all()
+
+        return affected
+
+    def wait(self, relfn, version, timeout=None):
+        """Waits until the page is updated; returns the new version and HTML"""
+        with self.condition:
+            if self.pages[relfn][0] <= version:
+                self.condition.wait(timeout)
+            return self.pages[relfn]
+
+    def close(self):
+        self.renderer.close()
+
+    def watch(self, interval):
+        while True:
+            self.update()
+            time.sleep(interval)
+
+
+def events_url(relfn):
+    """Returns the URL of the event stream as a JavaScript string literal"""
+    return json.dumps('/_events/' + quote(relfn.encode('utf-8')))
+
+
+class PreviewRequestHandler(BaseHTTPRequestHandler):
+    preview = None
+
+    def do_GET(self):
+        path = unquote(self.path.split('?')[0]).lstrip('/')
+        if path.startswith('_events/'):
+            self.send_events(path[len('_events/'):])
+        elif path in self.preview.pages:
+            self.send_page(path)
+        elif path == '':
+            self.send_index()
+        else:
+            self.send_error(404)
+
+    def send_html(self, html):
+        content = html.encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def send_index(self):
+        items = [u'<li><a href="/%s">%s</a></li>' % (escape(quote(relfn)), escape(relfn))
+                 for relfn in sorted(self.preview.pages)]
+        self.send_html(PAGE_TEMPLATE % {'title': 'API Blueprints', 'events': events_url(''),
+                                        'content': u'<ul>%s</ul>' % u''.join(items)})
+
+    def send_page(self, relfn):
+        html = self.preview.pages[relfn][1]
+        self.send_html(PAGE_TEMPLATE % {'title': escape(relfn), 'events': events_url(relfn), 'content': html})
+
+    def send_events(self, relfn):
+        if relfn not in self.preview.pages:
+            self.send_error(404)
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self.end_headers()
+
+        version = self.preview.pages[relfn][0]
+        try:
+            while True:
+                newversion, html = self.preview.wait(relfn, version, timeout=15)
+                if newversion == version:
+                    self.wfile.write(b': keep-alive\n\n')
+                else:
+                    version = newversion
+                    data = ''.join('data: %s\n' % line for line in html.splitlines())
+                    self.wfile.write((data + '\n').encode('utf-8'))
+                self.wfile.flush()
+        except (IOError, OSError):
+            pass  # disconnected
+
+    def log_message(self, format, *args):
+        pass
+
+
+class PreviewServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+def get_parser():
+    parser = argparse.ArgumentParser(prog='apiblueprint-preview',
+                                     description='Preview API Blueprint files with live reloading')
+    parser.add_argument('files', metavar='FILE', nargs='+',
+                        help='API Blueprint files to preview')
+    parser.add_argument('-s', '--srcdir', default='.',
+                        help='base directory to resolve absolute includes (default: current directory)')
+    parser.add_argument('-H', '--host', default='127.0.0.1',
+                        help='host to listen (default: 127.0.0.1)')
+    parser.add_argument('-p', '--port', type=int, default=8000,
+                        help='port to listen (default: 8000)')
+    parser.add_argument('-i', '--interval', type=float, default=0.2,
+                        help='interval to check changes in seconds (default: 0.2)')
+    return parser
+
+
+def main(argv=sys.argv[1:]):
+    options = get_parser().parse_args(argv)
+    files = [os.path.relpath(filename, options.srcdir) for filename in options.files]
+    preview = Preview(options.srcdir, files)
+
+    watcher = threading.Thread(target=preview.watch, args=(options.interval,))
+    watcher.daemon = True
+    watcher.start()
+
+    handler = type('Handler', (PreviewRequestHandler,), {'preview': preview})
+    server = PreviewServer((options.host, options.port), handler)
+    sys.stdout.write('Serving previews on http://%s:%d/\n' % (options.host, options.port))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        preview.close()
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+"""Prebuilt search index of endpoints for HTML builders
+
+When :confval:`apiblueprint_search_index` is set, the actions of each
+document are converted to index entries (method, URI template, identifier,
+group and link) and cached in the doctree directory.  Only the entries of
+documents read in the current build are regenerated, and the index
+(``_static/apiblueprint-search.json``) is rewritten only if any of them is
+changed.  The links depend on the builder, so the cache is dropped when it is
+used by another builder or output directory.
+
+``apiblueprint-search`` directive puts a search box which filters the index
+in the browser.  The script (``_static/apiblueprint-search.js``) is added
+once to the pages having search boxes, and sets up all of them.
+"""
+import io
+import os
+import json
+import pickle
+from docutils import nodes
+from docutils.parsers.rst import Directive
+from sphinx.util.osutil import relative_uri
+from sphinxcontrib.apiblueprint.addnodes import SearchBox
+from sphinxcontrib.apiblueprint.collector import get_blueprints, get_updated_docs
+
+CACHE_FILE = 'apiblueprint-search.pickle'
+INDEX_FILE = 'apiblueprint-search.json'
+SCRIPT_FILE = 'apiblueprint-search.js'
+
+SCRIPT = u"""(function() {
+    function setup(box) {
+        var input = box.getElementsByTagName('input')[0];
+        var results = box.getElementsByTagName('ul')[0];
+        var root = box.getAttribute('data-root');
+        var entries = [];
+
+        var request = new XMLHttpRequest();
+        request.onload = function() {
+            var index = JSON.parse(request.responseText);
+            for (var i = 0; i < index.entries.length; i++) {
+                var entry = index.entries[i];
+                entries.push({entry: entry, text: entry.slice(0, 4).join(' ').toLowerCase()});
+            }
+            input.disabled = false;
+        };
+        request.open('GET', box.getAttribute('data-index'));
+        request.send();
+
+        input.oninput = function() {
+            var words = input.value.toLowerCase().split(/\\s+/).filter(function(word) { return word; });
+            results.innerHTML = '';
+            if (!words.length) {
+                return;
+            }
+            var found = 0;
+            for (var i = 0; i < entries.length && found < 50; i++) {
+                var matched = words.every(function(word) { return entries[i].text.indexOf(word) >= 0; });
+                if (matched) {
+                    var entry = entries[i].entry;
+                    var link = document.createElement('a');
+                    link.href = root + entry[4];
+                    link.textContent = entry[0] + ' ' + entry[1] + (entry[2] ? ' (' + entry[2] + ')' : '');
+                    var item = document.createElement('li');
+                    item.appendChild(link);
+                    results.appendChild(item);
+                    found++;
+                }
+            }
+        };
+    }
+
+    document.addEventListener('DOMContentLoaded', function() {
+        var boxes = document.querySelectorAll('.apiblueprint-search');
+        for (var i = 0; i < boxes.length; i++) {
+            setup(boxes[i]);
+        }
+    });
+})();
+"""
+
+
+def get_cache_key(builder):
+    """Returns the key of the cache; the builder, its scheme of target URIs and the output directory"""
+    return (builder.name, builder.get_target_uri('path/to/doc'), os.path.abspath(str(builder.outdir)))
+
+
+def make_entries(builder, docname, blueprints):
+    """Converts blueprints of a document to index entries: ``[method, uri, identifier, group, link]``"""
+    from sphinxcontrib.httpdomain import http_resource_anchor
+
+    uri = builder.get_target_uri(docname)
+    entries = []
+    for blueprint in blueprints:
+        for group in blueprint.groups:
+            for resource in group.resources:
+                for action in resource.actions:
+                    link = '%s#%s' % (uri, http_resource_anchor(action.method, action.uri))
+                    entries.append([action.method, action.uri, action.identifier or '', group.name or '', link])
+
+    return entries
+
+
+class ApiBlueprintSearchDirective(Directive):
+    has_content = False
+
+    def run(self):
+        return [SearchBox()]
+
+
+def visit_search_box_html(self, node):
+    current = self.builder.get_target_uri(self.builder.current_docname)
+    self.body.append('<div class="apiblueprint-search" data-root="%s" data-index="%s">'
+                     '<input type="search" placeholder="Search endpoints" disabled="disabled" />'
+                     '<ul class="apiblueprint-search-results"></ul></div>\n' %
+                     (relative_uri(current, ''), relative_uri(current, '_static/' + INDEX_FILE)))
+    raise nodes.SkipNode
+
+
+def depart_search_box_html(self, node):
+    pass
+
+
+def on_doctree_resolved(app, doctree, docname):
+    if app.builder.format != 'html':
+        for node in list(doctree.traverse(SearchBox)):
+            node.parent.remove(node)
+
+
+def on_html_page_context(app, pagename, templatename, context, doctree):
+    """Adds the script to the page only if it has search boxes"""
+    if doctree is not None and list(doctree.traverse(SearchBox)):
+        app.add_js_file(SCRIPT_FILE)
+
+
+def on_build_finished(app, exception):
+    if exception or not app.config.apiblueprint_search_index or app.builder.format != 'html':
+        return
+
+    blueprints = get_blueprints(app.builder.env)
+    updated = get_updated_docs(app.builder.env)
+    cachepath = os.path.join(app.doctreedir, CACHE_FILE)
+    key = get_cache_key(app.builder)
+    try:
+        with open(cachepath, 'rb') as fd:
+            cachekey, cache = pickle.load(fd)  # docname -> entries
+        if cachekey != key:
+            cache = {}  # built by another builder; the links are different
+    except Exception:
+        cache = {}  # broken or incompatible cache; start with empty one
+
+    changed = False
+    for docname in list(cache):
+        if docname not in blueprints:
+            del cache[docname]  # removed document
+            changed = True
+    for docname in blueprints:
+        if docname in updated or docname not in cache:
+            entries = make_entries(app.builder, docname, blueprints[docname])
+            if cache.get(docname) != entries:
+                cache[docname] = entries
+                changed = True
+
+    staticdir = os.path.join(app.builder.outdir, '_static')
+    indexpath = os.path.join(staticdir, INDEX_FILE)
+    if changed or not os.path.exists(indexpath):
+        if not os.path.exists(staticdir):
+            os.makedirs(staticdir)
+        index = {'entries': [entry for docname in sorted(cache) for entry in cache[docname]]}
+        with io.open(indexpath, 'w', encoding='utf-8') as fd:
+            fd.write(json.dumps(index, ensure_ascii=False, separators=(',', ':')))
+        with open(cachepath, 'wb') as fd:
+            pickle.dump((key, cache), fd, pickle.HIGHEST_PROTOCOL)
+
+    # always compared with the current script; an old one is replaced after upgrade
+    scriptpath = os.path.join(staticdir, SCRIPT_FILE)
+    try:
+        with io.open(scriptpath, 'r', encoding='utf-8') as fd:
+            outdated = fd.read() != SCRIPT
+    except IOError:
+        outdated = True
+    if outdated:
+        with io.open(scriptpath, 'w', encoding='utf-8') as fd:
+            fd.write(SCRIPT)
@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+import io
+import os
+import re
+import json
+from sphinx.util import logging
+from sphinxcontrib.apiblueprint.directive import MarkdownReader, relfn2path
+from sphinxcontrib.apiblueprint.utils import group_docnames, split_blueprint
+
+DIRECTIVE_PATTERNS = [
+    # reST: .. apiblueprint:: path
+    re.compile('^([ \t]*)\.\.\s+apiblueprint::\s*(?P<filename>\S.*?)\s*\n(?P<options>(?:\\1[ \t]+:.*\n)*)', re.M),
+    # MyST: ```{apiblueprint} path
+    re.compile('^([ \t]*)(?:`{3,}|~{3,})\{apiblueprint\}[ \t]*(?P<filename>\S.*?)[ \t]*\n'
+               '(?P<options>(?:\\1:.*\n)*)', re.M),
+]
+
+# list of the documents generated in the last build (in the doctree directory)
+RECORD_FILE = 'apiblueprint-split.json'
+
+#: The first line of generated documents
+MARKER = u'<!-- generated from :split: blueprint by sphinxcontrib-apiblueprint; do not edit -->\n'
+
+logger = logging.getLogger(__name__)
+
+
+def find_split_directives(app, docnames):
+    """Finds apiblueprint directives having :split: option from the source documents"""
+    env = app.builder.env
+    for docname in sorted(docnames):
+        filename = str(env.doc2path(docname))
+        if filename.endswith('.apib'):
+            continue
+
+        with io.open(filename, 'r', encoding='utf-8-sig') as fd:
+            content = fd.read()
+
+        for pattern in DIRECTIVE_PATTERNS:
+            for matched in pattern.finditer(content):
+                if re.search('^\s*:split:', matched.group('options'), re.M):
+                    yield docname, matched.group('filename')
+
+
+def get_outdated_docs(env):
+    """Returns the documents added or changed since the last build (including changes of blueprints)"""
+    added, changed, _ = env.get_outdated_files(False)
+    return set(added) | set(changed)
+
+
+def load_record(app):
+    """Loads the record of the last build: ``{docname: {filename: [generated files]}}``"""
+    try:
+        with io.open(os.path.join(app.doctreedir, RECORD_FILE), encoding='utf-8') as fd:
+            record = json.load(fd)
+        if all(isinstance(directives, dict) for directives in record.values()):
+            return record
+    except (IOError, ValueError, AttributeError):
+        pass
+
+    return {}
+
+
+def save_record(app, record):
+    with io.open(os.path.join(app.doctreedir, RECORD_FILE), 'w', encoding='utf-8') as fd:
+        fd.write(json.dumps(record, sort_keys=True, ensure_ascii=False))
+
+
+def iter_files(record):
+    for directives in record.values():
+        for names in directives.values():
+            for name in names:
+                yield name
+
+
+def is_generated(path, content=None):
+    """Returns True if the file is generated by this extension (or has the same content to be generated)"""
+    with io.open(path, 'r', encoding='utf-8') as fd:
+        text = fd.read()
+    return text.startswith(MARKER) or text == content
+
+
+def write_document(path, content):
+    content = MARKER + content
+    if os.path.exists(path):
+        if not is_generated(path, content[len(MARKER):]):
+            logger.warning('%s is not generated by :split: option; not overwritten', path)
+            return
+        with io.open(path, 'r', encoding='utf-8') as fd:
+            if fd.read() == content:
+                return  # not changed
+    elif not os.path.exists(os.path.dirname(path)):
+        os.makedirs(os.path.dirname(path))
+
+    with io.open(path, 'w', encoding='utf-8') as fd:
+        fd.write(content)
+
+
+def remove_stale_documents(app, previous, record):
+    """Removes the documents generated in the last build but not in this build"""
+    generated = set(iter_files(record))
+    for name in sorted(set(iter_files(previous)) - generated):
+        path = os.path.join(app.builder.env.srcdir, name)
+        if not os.path.exists(path):
+            continue
+        elif not is_generated(path):
+            logger.warning('%s is not generated by :split: option; not removed', path)
+            continue
+
+        os.remove(path)
+        try:
+            os.rmdir(os.path.dirname(path))  # remove the directory if empty
+        except OSError:
+            pass
+
+
+def generate_group_documents(app):
+    """Generates .apib documents for each Resource Group of split blueprints
+
+    Only the documents changed since the last build are scanned; the others
+    keep the files generated in the last build.  The generated files are
+    recorded in the doctree directory and start with :data:`MARKER`.  The
+    files no longer generated (e.g. a Resource Group is removed or renamed)
+    are removed from the source directory.  Files without the marker are
+    never overwritten nor removed.
+    """
+    env = app.builder.env
+    srcdir = str(env.srcdir)
+    previous = load_record(app)
+    outdated = get_outdated_docs(env)
+
+    record = {}
+    for docname, directives in previous.items():
+        if docname in env.found_docs and docname not in outdated:
+            if all(os.path.exists(os.path.join(srcdir, name)) for names in directives.values() for name in names):
+                record[docname] = directives
+            else:
+                outdated.add(docname)  # generated files are removed by hand; generate them again
+
+    for docname, filename in find_split_directives(app, outdated):
+        previous_files = previous.get(docname, {}).get(filename, [])
+        files = record.setdefault(docname, {}).setdefault(filename, [])
+        docpath = str(env.doc2path(docname, base=None))
+        relfn, abspath = relfn2path(srcdir, docpath, filename)
+        try:
+            content = MarkdownReader(srcdir).read(relfn, abspath, [])
+        except (RuntimeError, IOError):
+            files.extend(previous_files)  # keep them; errors will be reported by the directive
+            continue
+
+        chunks = split_blueprint(content)[1:]
+        for name, chunk in zip(group_docnames(docname, filename, chunks), chunks):
+            files.append(name + '.apib')
+            write_document(os.path.join(srcdir, name + '.apib'), chunk)
+
+    remove_stale_documents(app, previous, record)
+    if record or previous:
+        save_record(app, record)
@@ -0,0 +1,352 @@
+# -*- coding: utf-8 -*-
+"""Stub server serving the example responses of blueprints
+
+The blueprints are compiled once, and the first response of each action is
+encoded to the raw HTTP response in advance.  Requests are dispatched with a
+precompiled route table (see :class:`RouteTable`).  The server is a plain
+:class:`asyncio.Protocol` supporting keep-alive and pipelining (Python 3
+only).  HEAD requests are answered with the headers of GET responses.
+Chunked request bodies are not supported, and request headers and bodies
+are limited in size (see :data:`MAX_HEADER_SIZE` and :data:`MAX_BODY_SIZE`).
+"""
+import io
+import os
+import re
+import sys
+import json
+import argparse
+from sphinxcontrib.apiblueprint import ir
+
+try:
+    from http.client import responses as REASONS
+except ImportError:
+    from httplib import responses as REASONS
+
+URI_PARAMETER = re.compile('\{([^}]*)\}')
+PATH_PARAMETER = re.compile(b'^\{[^?&#+/.;}][^}]*\}$')
+REQUEST_END = b'\r\n\r\n'
+CONTENT_LENGTH = re.compile(b'\r\ncontent-length:[ \t]*(\d+)', re.I)
+TRANSFER_ENCODING = re.compile(b'\r\ntransfer-encoding:', re.I)
+MAX_HEADER_SIZE = 65536
+MAX_BODY_SIZE = 10 * 1024 * 1024
+
+
+def encode_response(status_code, content_type=None, headers=(), body=None, close=False):
+    """Encodes the response to bytes of HTTP/1.1 message"""
+    body = (body or '').encode('utf-8')
+    lines = ['HTTP/1.1 %d %s' % (status_code, REASONS.get(status_code, 'Unknown'))]
+    if content_type:
+        lines.append('Content-Type: %s' % content_type)
+    for header in headers:
+        name = header.partition(':')[0].strip().lower()
+        if name not in ('content-type', 'content-length', 'connection'):
+            lines.append(header.strip())
+    lines.append('Content-Length: %d' % len(body))
+    if close:
+        lines.append('Connection: close')
+    return ('\r\n'.join(lines) + '\r\n\r\n').encode('utf-8') + body
+
+
+def merge_headers(base, headers):
+    """Returns *base* headers overridden by *headers* (compared by their names)"""
+    names = set(header.partition(':')[0].strip().lower() for header in headers)
+    return [header for header in base if header.partition(':')[0].strip().lower() not in names] + list(headers)
+
+
+def select_response(action):
+    """Returns the example response of the action; the first 2xx one is preferred"""
+    for response in action.responses:
+        if 200 <= int(response.status_code) < 300:
+            return response
+
+    return action.responses[0] if action.responses else None
+
+
+def compile_template(uri):
+    """Compiles the URI template to a regular expression matching the path"""
+    pattern = []
+    position = 0
+    for matched in URI_PARAMETER.finditer(uri):
+        pattern.append(re.escape(uri[position:matched.start()]))
+        operator = matched.group(1)[:1]
+        if operator == '+':  # reserved expansion; matches across "/"
+            pattern.append('[^?#]+')
+        elif operator not in '?&#':  # query and fragment are not matched
+            pattern.append('[^/?#]+')
+        position = matched.end()
+    pattern.append(re.escape(uri[position:]))
+    return re.compile(''.join(pattern) + '$')
+
+
+def get_specificity(path):
+    """Returns the sort key of the URI template; a larger one is more specific
+
+    Templates having more literal characters are more specific (e.g.
+    ``/items/{id}.json`` than ``/items/{id}``), and reserved expansions
+    (``{+path}``) are less specific than simple ones.
+    """
+    parameters = URI_PARAMETER.findall(path)
+    return (len(URI_PARAMETER.sub('', path)), -sum(1 for name in parameters if name[:1] == '+'))
+
+
+class RouteNode(object):
+    """A node of the route tree; children are keyed by path segments"""
+    __slots__ = ('children', 'parameter', 'response', 'specificity')
+
+    def __init__(self):
+        self.children = {}
+        self.parameter = None  # child for a segment of URI parameter
+        self.response = None
+        self.specificity = None
+
+
+class RouteTable(object):
+    """Dispatches requests to the pre-encoded responses
+
+    URIs without parameters are looked up from a dict.  URI templates whose
+    parameters fill whole path segments (e.g. ``/items/{id}``) are stored in
+    a tree of segments per method, so the lookup time depends only on the
+    depth of the path.  Other templates (e.g. ``/items/{id}.json`` and
+    ``/files/{+path}``) are matched by regular expressions.
+
+    When a path matches several templates, the most specific one wins (see
+    :func:`get_specificity`): the tree prefers literal segments to parameters,
+    and the regular expressions more specific than the match in the tree are
+    tried before it.
+    """
+
+    NOT_FOUND = encode_response(404, 'text/plain', body='Not Found')
+    HEADER_TOO_LARGE = encode_response(431, 'text/plain', body='Request Header Fields Too Large', close=True)
+    BODY_TOO_LARGE = encode_response(413, 'text/plain', body='Payload Too Large', close=True)
+    NOT_IMPLEMENTED = encode_response(501, 'text/plain', body='Not Implemented', close=True)
+    BAD_REQUEST = encode_response(400, 'text/plain', body='Bad Request', close=True)
+
+    def __init__(self):
+        self.static = {}     # (method, path) -> response bytes
+        self.trees = {}      # method -> RouteNode
+        self.templates = {}  # method -> list of (specificity, regexp, response bytes); most specific first
+
+    def add(self, method, uri, response):
+        method = method.encode('ascii')
+        path = uri.split('{?')[0].split('{&')[0]
+        if not URI_PARAMETER.search(path):
+            self.static.setdefault((method, path.encode('utf-8')), response)
+            return
+
+        specificity = get_specificity(path)
+        segments = path.encode('utf-8').split(b'/')
+        if any(b'{' in segment and not PATH_PARAMETER.match(segment) for segment in segments):
+            templates = self.templates.setdefault(method, [])
+            templates.append((specificity, compile_template(uri), response))
+            templates.sort(key=lambda template: template[0], reverse=True)  # stable; the first added wins
+            return
+
+        node = self.trees.setdefault(method, RouteNode())
+        for segment in segments:
+            if PATH_PARAMETER.match(segment):
+                if node.parameter is None:
+                    node.parameter = RouteNode()
+                node = node.parameter
+            else:
+                node = node.children.setdefault(segment, RouteNode())
+        if node.response is None:
+            node.response = response
+            node.specificity = specificity
+
+    def add_blueprint(self, blueprint, models=None):
+        models = models or {}
+        for action in blueprint.actions():
+            response = select_response(action)
+            if response is None:
+                continue
+
+            payload = models.get(response.model_ref, response)
+            headers = response.headers
+            if payload is not response:
+                headers = merge_headers(payload.headers, headers)
+            self.add(action.method, action.uri,
+                     encode_response(int(response.status_code), response.content_type or payload.content_type,
+                                     headers, payload.body))
+
+    def lookup(self, method, target):
+        """Returns the response for the request; HEAD falls back to GET and gets no body"""
+        response = self.match(method, target)
+        if response is None and method == b'HEAD':
+            response = self.match(b'GET', target)
+        if response is None:
+            response = self.NOT_FOUND
+
+        if method == b'HEAD':
+            return response[:response.index(REQUEST_END) + len(REQUEST_END)]
+        else:
+            return response
+
+    def match(self, method, target):
+        """Returns the response of the route matching the request, or None if not found"""
+        path = target.split(b'?', 1)[0]
+        response = self.static.get((method, path))
+        if response is not None:
+            return response
+
+        matched = None
+        tree = self.trees.get(method)
+        if tree is not None:
+            matched = self.lookup_tree(tree, path.split(b'/'), 0)
+
+        templates = self.templates.get(method)
+        if templates:
+            path = path.decode('utf-8', 'replace')
+            for specificity, pattern, response in templates:
+                if matched is not None and specificity <= matched.specificity:
+                    break  # the match in the tree is more specific
+                if pattern.match(path):
+                    return response
+
+        if matched is not None:
+            return matched.response
+
+        return None
+
+    def lookup_tree(self, node, segments, index):
+        """Returns the node matching the path; literal segments are preferred to parameters"""
+        if index == len(segments):
+            return node if node.response is not None else None
+
+        child = node.children.get(segments[index])
+        if child is not None:
+            matched = self.lookup_tree(child, segments, index + 1)
+            if matched is not None:
+                return matched
+
+        if node.parameter is not None and segments[index]:
+            return self.lookup_tree(node.parameter, segments, index + 1)
+
+        return None
+
+
+def load_blueprint(srcdir, relfn):
+    """Loads a blueprint file, or a JSON file compiled by ``apiblueprint-compile``"""
+    if relfn.endswith('.json'):
+        with io.open(os.path.join(srcdir, relfn), encoding='utf-8') as fd:
+            return ir.from_dict(json.load(fd)['blueprint'])
+    else:
+        from sphinxcontrib.apiblueprint.compiler import compile_file
+
+        return compile_file(srcdir, relfn)[0]
+
+
+def build_routes(blueprints):
+    models = {}
+    for blueprint in blueprints:
+        for resource in blueprint.resources():
+            if resource.model is not None and resource.identifier:
+                models[resource.identifier] = resource.model
+
+    routes = RouteTable()
+    for blueprint in blueprints:
+        routes.add_blueprint(blueprint, models)
+    return routes
+
+
+def create_protocol(routes):
+    import asyncio
+
+    class StubProtocol(asyncio.Protocol):
+        def connection_made(self, transport):
+            self.transport = transport
+            self.buffer = b''
+
+        def data_received(self, data):
+            buffer = self.buffer + data
+            responses = []
+            while True:
+                end = buffer.find(REQUEST_END)
+                if (end < 0 and len(buffer) > MAX_HEADER_SIZE) or end > MAX_HEADER_SIZE:
+                    return self.reject(responses, routes.HEADER_TOO_LARGE)
+                elif end < 0:
+                    break
+
+                head = buffer[:end]
+                request_line = head.split(b'\r\n', 1)[0].split(b' ')
+                if len(request_line) != 3:
+                    return self.reject(responses, routes.BAD_REQUEST)
+                elif TRANSFER_ENCODING.search(head):
+                    # chunked bodies are not supported; the next request could not be found
+                    return self.reject(responses, routes.NOT_IMPLEMENTED)
+
+                length = CONTENT_LENGTH.search(head)
+                length = int(length.group(1)) if length else 0
+                if length > MAX_BODY_SIZE:
+                    return self.reject(responses, routes.BODY_TOO_LARGE)
+
+                size = end + len(REQUEST_END) + length
+                if len(buffer) < size:
+                    break  # wait for the rest of the body
+
+                responses.append(routes.lookup(request_line[0], request_line[1]))
+                buffer = buffer[size:]
+
+            self.buffer = buffer
+            if responses:
+                self.transport.write(b''.join(responses))
+
+        def reject(self, responses, error):
+            """Sends the responses of the preceding requests and the error; then closes the connection"""
+            self.buffer = b''
+            self.transport.write(b''.join(responses) + error)
+            self.transport.close()
+
+    return StubProtocol
+
+
+def serve(routes, host, port, ready=None):
+    """Runs the stub server until interrupted; *ready* is called with the bound port"""
+    import asyncio
+
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    server = loop.run_until_complete(loop.create_server(create_protocol(routes), host, port))
+    if ready is not None:
+        ready(server.sockets[0].getsockname()[1])
+    try:
+        loop.run_forever()
+    finally:
+        server.close()
+        loop.run_until_complete(server.wait_closed())
+        loop.close()
+
+
+def get_parser():
+    parser = argparse.ArgumentParser(prog='apiblueprint-stub',
+                                     description='Serve example responses of API Blueprints')
+    parser.add_argument('files', metavar='FILE', nargs='+',
+                        help='API Blueprint files (or JSON files compiled by apiblueprint-compile)')
+    parser.add_argument('-s', '--srcdir', default='.',
+                        help='base directory to resolve absolute includes (default: current directory)')
+    parser.add_argument('-H', '--host', default='127.0.0.1',
+                        help='host to listen (default: 127.0.0.1)')
+    parser.add_argument('-p', '--port', type=int, default=8000,
+                        help='port to listen (default: 8000)')
+    return parser
+
+
+def main(argv=sys.argv[1:]):
+    options = get_parser().parse_args(argv)
+    blueprints = [load_blueprint(options.srcdir, os.path.relpath(filename, options.srcdir))
+                  for filename in options.files]
+    routes = build_routes(blueprints)
+
+    def ready(port):
+        sys.stdout.write('Serving stubs on http://%s:%d/\n' % (options.host, port))
+        sys.stdout.flush()
+
+    try:
+        serve(routes, options.host, options.port, ready)
+    except KeyboardInterrupt:
+        pass
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
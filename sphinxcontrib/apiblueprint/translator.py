@@ -1,8 +1,13 @@
 # -*- coding: utf-8 -*-
 from docutils import nodes
 from sphinx import addnodes
+from sphinxcontrib.apiblueprint import fragments, ir
+from sphinxcontrib.apiblueprint.addnodes import (
+    Action, Body, CompactPayload, Headers, ParseError, ResourceAction, Schema
+)
+from sphinxcontrib.apiblueprint.fragments import placeholder_key
 from sphinxcontrib.apiblueprint.utils import (
-    detect_section_type, replace_nodeclass, transpose_subnodes, split_title_and_content
+    detect_section_type, model_id, replace_nodeclass, transpose_subnodes, split_title_and_content
 )
 from sphinxcontrib.httpdomain import http_resource_anchor
 
@@ -24,6 +29,18 @@ class BaseNodeVisitor(nodes.NodeVisitor):
 
 class APIBlueprintTranslator(BaseNodeVisitor):
     """Translate naked doctree from recommonmark to API Blueprintbased doctree"""
+    def __init__(self, env, document, fragments=None):
+        self.errors = []
+        self.fragments = fragments
+        BaseNodeVisitor.__init__(self, env, document)
+
+    def parse_node(self, section_type, node):
+        try:
+            return section_type.parse_node(node)
+        except (AssertionError, ParseError) as exc:
+            self.errors.append(ir.Annotation(line=node.line, message=str(exc)))
+            return None
+
     def visit_document(self, node):
         if isinstance(node[0], nodes.title):
             # insert section node if doc has only ONE section
@@ -32,19 +49,42 @@ class APIBlueprintTranslator(BaseNodeVisitor):
             transpose_subnodes(node, section)
             node += section
 
+    def depart_document(self, node):
+        for action in list(node.traverse(Action)):
+            if action.get('uri') is None:
+                message = 'Action section should have URI template or be in a Resource section'
+                self.errors.append(ir.Annotation(line=action.line, message=message))
+                action.parent.remove(action)
+
     def depart_section(self, node):
         section_type = detect_section_type("header", node)
         if section_type:
-            newnode = section_type.parse_node(node)
-            node.replace_self(newnode)
+            newnode = self.parse_node(section_type, node)
+            if newnode:
+                node.replace_self(newnode)
 
     def depart_bullet_list(self, node):
         parent = node.parent
         for item in reversed(node):
+            key = placeholder_key(item) if self.fragments else None
+            if key:
+                newnodes, errors = fragments.cache.resolve(key, self.fragments)
+                for message in errors:
+                    self.errors.append(ir.Annotation(line=item.line, message=message))
+                node.remove(item)
+
+                index = parent.index(node)
+                for newnode in reversed(newnodes):
+                    parent.insert(index + 1, newnode)
+                continue
+
             section_type = detect_section_type("list", item)
             if section_type:
                 split_title_and_content(item)
-                newnode = section_type.parse_node(item)
+                newnode = self.parse_node(section_type, item)
+                if newnode is None:
+                    continue
+
                 node.remove(item)
 
                 index = parent.index(node)
@@ -73,6 +113,8 @@ class APIBlueprintRepresenter(BaseNodeVisitor):
     def depart_Model(self, node):
         model = replace_nodeclass(node, nodes.section)
         model['ids'].append(nodes.make_id(model[0].astext()))
+        if model.get('identifier'):
+            model['ids'].append(model_id(model['identifier']))
 
     def depart_Schema(self, node):
         title = nodes.paragraph(text='Schema:')
@@ -97,7 +139,12 @@ class APIBlueprintRepresenter(BaseNodeVisitor):
         else:
             sig += addnodes.desc_name(text="%s %s" % (http_method, uri))
 
-        content = addnodes.desc_content()
+        # links to the related actions are added on doctree-resolved
+        content = addnodes.desc_content(apiblueprint_relation=node.get('relation'))
+        if isinstance(node, ResourceAction):
+            content['apiblueprint_resource'] = node['uri']
+        else:
+            content['apiblueprint_resource'] = node.parent.get('uri', uri)
         transpose_subnodes(node, content)
 
         node.replace_self(desc)
@@ -107,12 +154,17 @@ class APIBlueprintRepresenter(BaseNodeVisitor):
     def depart_ResourceAction(self, node):
         self.depart_Action(node)
 
+    def depart_Relation(self, node):
+        node.parent['relation'] = node['identifier']
+        node.parent.remove(node)
+
     def depart_Request(self, node):
         title = nodes.paragraph()
         title += nodes.strong(text='Request')
         if node['identifier']:
             title += nodes.Text(' ' + node['identifier'])
         node.insert(0, title)
+        self.insert_model_reference(node)
 
         replace_nodeclass(node, nodes.container)
 
@@ -122,9 +174,24 @@ class APIBlueprintRepresenter(BaseNodeVisitor):
         title += nodes.Text(' ')
         title += nodes.literal(text=node['status_code'])
         node.insert(0, title)
+        self.insert_model_reference(node)
 
         replace_nodeclass(node, nodes.container)
 
+    def insert_model_reference(self, node):
+        """Inserts a reference to the Resource Model; resolved on missing-reference event"""
+        if node.get('model_ref'):
+            node.insert(1, self.model_reference(node))
+
+    def model_reference(self, node):
+        paragraph = nodes.paragraph(text='Model: ')
+        xref = addnodes.pending_xref(refdomain='', reftype='apiblueprint-model',
+                                     reftarget=node['model_ref'], refexplicit=True,
+                                     refdoc=self.env.docname)
+        xref += nodes.inline(text=node['model_ref'])
+        paragraph += xref
+        return paragraph
+
     def depart_Parameters(self, node):
         title = nodes.paragraph(text='Parameters:')
         node.insert(0, title)
@@ -157,9 +224,74 @@ class APIBlueprintRepresenter(BaseNodeVisitor):
         replace_nodeclass(node, nodes.container)
 
 
-def translate(env, doctree):
-    translator = APIBlueprintTranslator(env, doctree)
+class CompactAPIBlueprintRepresenter(APIBlueprintRepresenter):
+    """Translate API Bluerprint based doctree to Sphinx doctree having compact payloads"""
+
+    def depart_Headers(self, node):
+        pass  # merged to the payload
+
+    def depart_Body(self, node):
+        pass  # merged to the payload
+
+    def depart_Schema(self, node):
+        pass  # merged to the payload
+
+    def depart_Request(self, node):
+        self.replace_payload(node, 'Request', node['identifier'], literal=False)
+
+    def depart_Response(self, node):
+        self.replace_payload(node, 'Response', str(node['status_code']), literal=True)
+
+    def replace_payload(self, node, kind, title, literal):
+        payload = CompactPayload(kind=kind, title=title, literal=literal)
+        if node.get('model_ref'):
+            payload += self.model_reference(node)
+
+        for subnode in node.children[:]:
+            if isinstance(subnode, Headers):
+                payload['headers'] = "\n".join(sorted(subnode.headers))
+            elif isinstance(subnode, (Body, Schema)):
+                name = 'body' if isinstance(subnode, Body) else 'schema'
+                payload[name] = "\n\n".join(child.astext() for child in subnode)
+            else:
+                payload += subnode
+
+        node.replace_self(payload)
+
+
+def parse(env, doctree, fragments=None):
+    """Translate naked doctree to API Blueprint based doctree, and returns its IR
+
+    *fragments* is a dict of fragments replaced by placeholders on reading
+    (see :attr:`MarkdownReader.fragments`).
+    """
+    translator = APIBlueprintTranslator(env, doctree, fragments)
     doctree.walkabout(translator)
-    representer = APIBlueprintRepresenter(env, doctree)
+    blueprint = ir.from_doctree(doctree)
+    blueprint.errors = translator.errors
+    return blueprint
+
+
+def parse_content(content, fragments=None):
+    """Parses API Blueprint text; returns the parsed doctree and its IR"""
+    from docutils.core import publish_doctree
+    from recommonmark.parser import CommonMarkParser
+
+    doctree = publish_doctree(content, parser=CommonMarkParser(),
+                              settings_overrides={'doctitle_xform': False})
+    blueprint = parse(None, doctree, fragments)
+    return doctree, blueprint
+
+
+def represent(env, doctree):
+    if env is not None and env.config.apiblueprint_compact:
+        representer = CompactAPIBlueprintRepresenter(env, doctree)
+    else:
+        representer = APIBlueprintRepresenter(env, doctree)
     doctree.walkabout(representer)
     return doctree
+
+
+def translate(env, doctree):
+    parse(env, doctree)
+    return represent(env, doctree)
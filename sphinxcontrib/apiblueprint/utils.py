@@ -1,13 +1,24 @@
 # -*- coding: utf-8 -*-
+import os
 import re
+import posixpath
 from docutils import nodes
 
 # HTTP methods (from RFC7231)
 HTTP_METHODS = ["GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "CONNECT", "OPTIONS", "TRACE"]
 
+# Reference to a named Resource Model (e.g. "[Blog Posts][]")
+MODEL_REFERENCE = re.compile('^\[([^\]]+)\]\[\]$')
+
 # URI Template
 URI_TEMPLATE = re.compile('^/\S+$')
 
+# Headings which start top-level sections (Resource Group and Data Structures)
+TOPLEVEL_SECTION = re.compile('^#[ \t]+(Group[ \t]+\S.*|Data Structures[ \t]*)$')
+
+# Fenced code block
+FENCE = re.compile('^[ \t]{0,3}(```|~~~)')
+
 
 def get_children(node, cls):
     return [subnode for subnode in node if isinstance(subnode, cls)]
@@ -113,3 +124,45 @@ def split_title_and_content(node):
         title = node[0].pop(0)
         node[0].pop(0)  # Remove return char
         node.insert(0, nodes.title(text=title))
+
+
+def split_blueprint(content):
+    """Split API Blueprint into top-level sections (Resource Groups and Data Structures)
+
+    The first item of the result is a content before the first top-level section
+    (metadata, API name and overview).  It might be an empty string.
+    """
+    chunks = [[]]
+    fence = None
+    for line in content.splitlines(True):
+        if fence:
+            if line.strip().startswith(fence):
+                fence = None
+        elif FENCE.match(line):
+            fence = FENCE.match(line).group(1)
+        elif TOPLEVEL_SECTION.match(line):
+            chunks.append([])
+
+        chunks[-1].append(line)
+
+    return ["".join(chunk) for chunk in chunks]
+
+
+def model_id(identifier):
+    """Returns the node id of the Model section of the resource"""
+    return nodes.make_id('model-' + identifier)
+
+
+def group_docnames(docname, filename, chunks):
+    """Returns docnames of the documents generated for each top-level section"""
+    basedir = posixpath.join(posixpath.dirname(docname),
+                             os.path.splitext(os.path.basename(filename))[0])
+    docnames = []
+    for chunk in chunks:
+        title = chunk.splitlines()[0].lstrip('#').strip()
+        name = posixpath.join(basedir, nodes.make_id(title))
+        if name in docnames:
+            name = '%s-%d' % (name, len(docnames))
+        docnames.append(name)
+
+    return docnames
@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+"""Validation of example bodies against their JSON Schemas
+
+When :confval:`apiblueprint_validate_bodies` is set, each payload having
+both Body and Schema is validated on reading with `jsonschema`_ (optional
+dependency).  Compiled validators are cached by the hash of the schema, so a
+schema shared by many payloads is compiled only once in each process.
+
+.. _jsonschema: https://pypi.org/project/jsonschema/
+"""
+import os
+import json
+import hashlib
+from collections import OrderedDict
+from sphinx.util import logging
+
+logger = logging.getLogger(__name__)
+
+
+class ValidatorCache(object):
+    """LRU cache of compiled validators keyed by the hash of schemas"""
+
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self.validators = OrderedDict()
+        self.compiled = 0
+
+    def get(self, schema):
+        """Returns a pair of the validator and the error message for the schema
+
+        Either of them is None; the message is returned if the schema is broken.
+        """
+        key = hashlib.sha1(schema.encode('utf-8')).hexdigest()
+        if key in self.validators:
+            result = self.validators.pop(key)
+        else:
+            result = self.compile(schema)
+            self.compiled += 1
+
+        self.validators[key] = result  # move to the end
+        while len(self.validators) > self.maxsize:
+            self.validators.popitem(last=False)
+
+        return result
+
+    def compile(self, schema):
+        from jsonschema import SchemaError
+        from jsonschema.validators import validator_for
+
+        try:
+            schema = json.loads(schema)
+            cls = validator_for(schema)
+            cls.check_schema(schema)
+            return cls(schema), None
+        except ValueError as exc:
+            return None, 'Schema is not a valid JSON: %s' % exc
+        except SchemaError as exc:
+            return None, 'Schema is not a valid JSON Schema: %s' % exc.message
+
+
+#: The validator cache shared in the process
+cache = ValidatorCache()
+
+
+def is_json(content_type):
+    return not content_type or 'json' in content_type
+
+
+def validate_payload(payload):
+    """Validates the body of the payload against its schema; returns an error message or None"""
+    if payload.body is None or payload.schema is None or not is_json(payload.content_type):
+        return None
+
+    from jsonschema.exceptions import best_match
+
+    validator, message = cache.get(payload.schema)
+    if validator is None:
+        return message
+
+    try:
+        body = json.loads(payload.body)
+    except ValueError as exc:
+        return 'Body is not a valid JSON: %s' % exc
+
+    error = best_match(validator.iter_errors(body))
+    if error is None:
+        return None
+    elif error.path:
+        path = '/'.join(str(item) for item in error.path)
+        return 'Body does not match the Schema: %s (at %s)' % (error.message, path)
+    else:
+        return 'Body does not match the Schema: %s' % error.message
+
+
+def validate_blueprint(blueprint):
+    """Validates all payloads in the blueprint; returns a list of error messages"""
+    errors = []
+    for resource in blueprint.resources():
+        if resource.model is not None:
+            message = validate_payload(resource.model)
+            if message:
+                errors.append('%s: Model: %s' % (resource.identifier or resource.uri, message))
+
+        for action in resource.actions:
+            payloads = [('Request %s' % request.identifier, request) for request in action.requests]
+            payloads += [('Response %s' % response.status_code, response) for response in action.responses]
+            for title, payload in payloads:
+                if payload.model_ref:
+                    continue  # validated as the Model
+                message = validate_payload(payload)
+                if message:
+                    errors.append('%s %s: %s: %s' % (action.method, action.uri, title.strip(), message))
+
+    return errors
+
+
+def report_invalid_bodies(document, env, reader, blueprint):
+    """Reports payloads whose body does not match the schema (if enabled)"""
+    if not env.config.apiblueprint_validate_bodies:
+        return
+
+    try:
+        import jsonschema  # NOQA
+    except ImportError:
+        logger.warning('jsonschema is required to validate bodies (apiblueprint_validate_bodies); skipped')
+        return
+
+    source = os.path.join(env.srcdir, reader.locate(None)[0] or env.doc2path(env.docname, base=None))
+    for message in validate_blueprint(blueprint):
+        document.reporter.warning(message, source=source)
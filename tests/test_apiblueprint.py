@@ -1,10 +1,16 @@
 # -*- coding: utf-8 -*-
+import os
+import json
+import shutil
 import unittest
+from io import StringIO
 from time import time
 from docutils import nodes
 from functools import wraps
 from textwrap import dedent
 from sphinx import addnodes
+from sphinx_testing import TestApp, with_tmpdir
+from sphinxcontrib.apiblueprint.addnodes import CompactPayload
 
 
 # export docstring to markdown file automatically
@@ -317,9 +323,17 @@ class TestCase(unittest.TestCase):
         self.assertEqual(model[0].astext(), 'Model (text/plain)')
         self.assertEqual(model[1][1].astext(), 'Hello World!')
 
+        self.assertIn('model-blog-posts', model['ids'])
+        self.assertEqual(app.env.apiblueprint_models, {'Blog Posts': ('index', 'model-blog-posts')})
+
         retrieve = blueprint[2]
         self.assertEqual(retrieve[0].astext(), 'GET /posts (Retrieve blog posts)')
-        self.assertEqual(retrieve[1][0][1][1].astext(), '[Blog Posts][]')
+        self.assertEqual(retrieve[1][0][1].astext(), 'Model: Blog Posts')
+        self.assertIsInstance(retrieve[1][0][1][1], addnodes.pending_xref)
+        self.assertEqual(len(retrieve[1][0]), 2)
+
+        html = (app.outdir / 'index.html').read_text()
+        self.assertIn('href="#model-blog-posts"', html)
 
     @with_app(srcdir='tests/template', copy_srcdir_to_tmpdir=True)
     def test_action(self, app, status, warnings):
@@ -355,6 +369,44 @@ class TestCase(unittest.TestCase):
         self.assertEqual(post[1][1][0].astext(), 'Response 200')
         self.assertEqual(post[1][1][2][1].astext(), 'OK')
 
+    @with_app(srcdir='tests/template', copy_srcdir_to_tmpdir=True)
+    def test_relation(self, app, status, warnings):
+        """
+        # Task [/tasks/{id}]
+
+        ## Retrieve a task [GET]
+        + Relation: self
+        + Response 200
+
+        ## Update a task [PATCH]
+        + Relation: update
+        + Response 204
+
+        ## Delete a task [DELETE]
+        + Relation: delete
+        + Response 204
+        """
+        app.build()
+        print(status.getvalue(), warnings.getvalue())
+
+        self.assertEqual(app.env.apiblueprint_relations,
+                         {'/tasks/{id}': {'self': ('index', 'get--tasks-id', 'GET', '/tasks/{id}'),
+                                          'update': ('index', 'patch--tasks-id', 'PATCH', '/tasks/{id}'),
+                                          'delete': ('index', 'delete--tasks-id', 'DELETE', '/tasks/{id}')}})
+
+        resource = app.builder.env.get_and_resolve_doctree('index', app.builder)[0][1]
+        retrieve = resource[1][1]
+        self.assertEqual(retrieve[0].astext(), 'Response 200')
+        self.assertEqual(retrieve[1].astext(), 'Related: delete, update')
+        self.assertEqual(retrieve[1][1]['refid'], 'delete--tasks-id')
+        self.assertEqual(retrieve[1][3]['refid'], 'patch--tasks-id')
+
+        delete = resource[3][1]
+        self.assertEqual(delete[1].astext(), 'Related: self, update')
+
+        html = (app.outdir / 'index.html').read_text()
+        self.assertIn('href="#patch--tasks-id"', html)
+
     @with_app(srcdir='tests/template', copy_srcdir_to_tmpdir=True)
     def test_action_having_uri(self, app, status, warnings):
         """
@@ -469,3 +521,783 @@ class TestCase(unittest.TestCase):
         post = blueprint[2]
         self.assertEqual(post[0].astext(), 'Post (object)')
         self.assertEqual(post[1].astext(), 'blog_id (integer)\n\ntitle (string)\n\nmessage (string)')
+
+    @with_app(srcdir='tests/template', copy_srcdir_to_tmpdir=True)
+    def test_apib_source_file(self, app, status, warnings):
+        # prepare
+        (app.srcdir / 'petstore.apib').write_text(
+            "# Pet Store API\n"
+            "<!-- include(pets.md) -->\n"
+        )
+        (app.srcdir / 'pets.md').write_text(
+            "# GET /pets\n"
+            "+ Response 200 (text/plain)\n"
+            "\n"
+            "        Hello World!\n"
+        )
+
+        app.build()
+        print(status.getvalue(), warnings.getvalue())
+
+        blueprint = app.env.get_doctree('petstore')
+        self.assertEqual(blueprint[0][0].astext(), 'Pet Store API')
+
+        desc = blueprint[1]
+        self.assertIsInstance(desc, addnodes.desc)
+        self.assertEqual(desc[0].astext(), 'GET /pets')
+        self.assertEqual(desc[1][0][2][1].astext(), 'Hello World!')
+        self.assertEqual(app.env.domaindata['http']['get']['/pets'][0], 'petstore')
+        self.assertTrue(any(str(fn).endswith('pets.md') for fn in app.env.dependencies['petstore']))
+
+    @with_app(srcdir='tests/template', copy_srcdir_to_tmpdir=True)
+    def test_split(self, app, status, warnings):
+        """
+        # Example API
+        # Group Blog Posts
+        ## GET /posts
+        + Response 200 (text/plain)
+
+                Hello World!
+
+        # Group Comments
+        ## GET /comments
+        + Response 200 (text/plain)
+
+                Hello World!
+        """
+        (app.srcdir / 'index.rst').write_text(
+            "Example API\n"
+            "===========\n"
+            "\n"
+            ".. apiblueprint:: api.md\n"
+            "   :split:\n"
+        )
+
+        # builder-inited has already been emitted; generate documents again
+        from sphinxcontrib.apiblueprint.split import generate_group_documents
+        generate_group_documents(app)
+
+        app.build()
+        print(status.getvalue(), warnings.getvalue())
+
+        doctree = app.env.get_doctree('index')
+        toctree = doctree.traverse(addnodes.toctree)[0]
+        self.assertEqual(toctree['includefiles'], ['api/group-blog-posts', 'api/group-comments'])
+
+        posts = app.env.get_doctree('api/group-blog-posts')
+        self.assertEqual(posts[0][0].astext(), 'Blog Posts')
+        self.assertEqual(posts[0][1][0].astext(), 'GET /posts')
+        self.assertEqual(app.env.domaindata['http']['get']['/posts'][0], 'api/group-blog-posts')
+        self.assertEqual(app.env.domaindata['http']['get']['/comments'][0], 'api/group-comments')
+        self.assertNotIn("isn't included in any toctree", warnings.getvalue())
+
+    @with_tmpdir
+    def test_split_removes_stale_documents(self, tmpdir):
+        srcdir = tmpdir / 'src'
+        shutil.copytree('tests/template', srcdir)
+        os.remove(srcdir / 'index.rst')
+        (srcdir / 'index.txt').write_text(
+            "Example API\n"
+            "===========\n"
+            "\n"
+            ".. apiblueprint:: api.md\n"
+            "   :split:\n"
+        )
+
+        def build(content=None):
+            if content is not None:
+                (srcdir / 'api.md').write_text(content)
+            app = TestApp(srcdir=srcdir, outdir=tmpdir / 'html', doctreedir=tmpdir / 'doctrees', status=StringIO(),
+                          confoverrides={'source_suffix': {'.txt': 'restructuredtext'}})
+            try:
+                app.build()
+                return app.env.get_doctree('index').traverse(addnodes.toctree)[0]['includefiles']
+            finally:
+                app.cleanup()
+
+        # :split: in a document of other suffix than .rst
+        includefiles = build("# Example API\n"
+                             "# Group Blog Posts\n"
+                             "## GET /posts\n"
+                             "+ Response 204\n"
+                             "\n"
+                             "# Group Comments\n"
+                             "## GET /comments\n"
+                             "+ Response 204\n")
+        self.assertEqual(includefiles, ['api/group-blog-posts', 'api/group-comments'])
+        self.assertTrue(os.path.exists(srcdir / 'api' / 'group-comments.apib'))
+
+        # the document of removed group is also removed
+        includefiles = build("# Example API\n"
+                             "# Group Blog Posts\n"
+                             "## GET /posts\n"
+                             "+ Response 204\n")
+        self.assertEqual(includefiles, ['api/group-blog-posts'])
+        self.assertTrue(os.path.exists(srcdir / 'api' / 'group-blog-posts.apib'))
+        self.assertFalse(os.path.exists(srcdir / 'api' / 'group-comments.apib'))
+
+        # no documents are changed; the generated documents are kept
+        includefiles = build()
+        self.assertEqual(includefiles, ['api/group-blog-posts'])
+        self.assertTrue(os.path.exists(srcdir / 'api' / 'group-blog-posts.apib'))
+
+    @with_tmpdir
+    def test_split_keeps_user_documents(self, tmpdir):
+        srcdir = tmpdir / 'src'
+        shutil.copytree('tests/template', srcdir)
+        (srcdir / 'index.rst').write_text(
+            "Example API\n"
+            "===========\n"
+            "\n"
+            ".. apiblueprint:: api.md\n"
+            "   :split:\n"
+        )
+        (srcdir / 'api').makedirs()
+        (srcdir / 'api' / 'group-comments.apib').write_text("# Group Comments\nwritten by user\n")
+
+        def build(content):
+            (srcdir / 'api.md').write_text(content)
+            warnings = StringIO()
+            app = TestApp(srcdir=srcdir, outdir=tmpdir / 'html', doctreedir=tmpdir / 'doctrees',
+                          status=StringIO(), warning=warnings)
+            try:
+                app.build()
+                return warnings.getvalue()
+            finally:
+                app.cleanup()
+
+        # not overwritten
+        warnings = build("# Example API\n"
+                         "# Group Blog Posts\n"
+                         "## GET /posts\n"
+                         "+ Response 204\n"
+                         "\n"
+                         "# Group Comments\n"
+                         "## GET /comments\n"
+                         "+ Response 204\n")
+        self.assertIn('group-comments.apib is not generated by :split: option; not overwritten', warnings)
+        with open(srcdir / 'api' / 'group-comments.apib') as fd:
+            self.assertEqual(fd.read(), "# Group Comments\nwritten by user\n")
+        with open(srcdir / 'api' / 'group-blog-posts.apib') as fd:
+            self.assertTrue(fd.read().startswith('<!-- generated from :split: blueprint'))
+
+        # not removed even if recorded
+        (srcdir / 'api' / 'group-blog-posts.apib').write_text("# Group Blog Posts\nwritten by user\n")
+        warnings = build("# Example API\n")
+        self.assertIn('group-blog-posts.apib is not generated by :split: option; not removed', warnings)
+        self.assertTrue(os.path.exists(srcdir / 'api' / 'group-blog-posts.apib'))
+        self.assertTrue(os.path.exists(srcdir / 'api' / 'group-comments.apib'))
+
+    @with_app(srcdir='tests/template', copy_srcdir_to_tmpdir=True,
+              confoverrides={'apiblueprint_parallel_jobs': 2})
+    def test_parallel_jobs(self, app, status, warnings):
+        """
+        # Example API
+
+        # Group Blog Posts
+        ## GET /posts
+        + Response 200 (text/plain)
+
+                Hello World!
+
+        # Group Comments
+        ## GET /comments
+        + Response OK
+
+        # Group Users
+        ## GET /users
+        + Response 204
+        """
+        app.build()
+        print(status.getvalue(), warnings.getvalue())
+        self.assertIn('api.md:12: ERROR: Unknown response type: Response OK', warnings.getvalue())
+
+        content = app.env.get_doctree('index')[0]
+        self.assertEqual([node[0].astext() for node in content[1:]],
+                         ['Example API', 'Blog Posts', 'Comments', 'Users'])
+        self.assertEqual(content[2][1][0].astext(), 'GET /posts')
+        self.assertEqual(content[4][1][0].astext(), 'GET /users')
+        self.assertEqual(app.env.domaindata['http']['get']['/posts'][0], 'index')
+        self.assertEqual(app.env.domaindata['http']['get']['/users'][0], 'index')
+
+        blueprint, = app.env.apiblueprint_blueprints['index']
+        self.assertEqual([group.name for group in blueprint.groups], ['Blog Posts', 'Comments', 'Users'])
+
+        # the pool is closed on build-finished
+        from sphinxcontrib.apiblueprint.directive import shared_pool
+        self.assertIsNone(shared_pool.pool)
+        self.assertFalse(shared_pool.created)
+
+    @with_app(srcdir='tests/template', copy_srcdir_to_tmpdir=True,
+              confoverrides={'apiblueprint_export_json': True})
+    def test_export_json(self, app, status, warnings):
+        """
+        # Example API
+        # Group Messages
+        ## GET /message
+        + Response 200 (text/plain)
+
+                Hello World!
+        """
+        app.build()
+        print(status.getvalue(), warnings.getvalue())
+
+        filename = app.outdir / '_apiblueprint' / 'index.json'
+        with open(str(filename)) as fd:
+            data = json.load(fd)
+
+        api = data['content'][0]
+        self.assertEqual(api['meta'], {'classes': ['api'], 'title': 'Example API'})
+
+        group = api['content'][0]
+        self.assertEqual(group['meta'], {'classes': ['resourceGroup'], 'title': 'Messages'})
+
+        resource = group['content'][0]
+        self.assertEqual(resource['attributes']['href'], '/message')
+
+        request, response = resource['content'][0]['content'][0]['content']
+        self.assertEqual(request['attributes']['method'], 'GET')
+        self.assertEqual(response['attributes']['statusCode'], '200')
+        self.assertEqual(response['content'][0]['content'], 'Hello World!')
+
+        # not re-emitted if not changed
+        mtime = os.stat(str(filename)).st_mtime
+        os.utime(str(filename), (mtime - 10, mtime - 10))
+        app.build()
+        self.assertEqual(os.stat(str(filename)).st_mtime, mtime - 10)
+
+    @with_app(srcdir='tests/template', copy_srcdir_to_tmpdir=True,
+              confoverrides={'apiblueprint_export_json': True})
+    def test_export_json_attributes(self, app, status, warnings):
+        """
+        # Example API
+        # Group Messages
+        ## Message [/messages/{id}]
+        + Attributes (Message)
+
+        + Model (application/json)
+            + Headers
+
+                    X-Request-Id: 1234
+
+            + Body
+
+                    {"id": 1}
+
+        ### Create [POST]
+        + Request (application/json)
+            + Attributes
+                + id: 1 (number, required) - ID of the message
+                + author (object)
+                    + name: alice (string)
+                + tags (array[string])
+
+        + Response 201
+        """
+        app.build()
+        print(status.getvalue(), warnings.getvalue())
+
+        with open(str(app.outdir / '_apiblueprint' / 'index.json')) as fd:
+            data = json.load(fd)
+
+        structure, model, transition = data['content'][0]['content'][0]['content'][0]['content']
+        self.assertEqual(structure, {'element': 'dataStructure', 'content': {'element': 'Message'}})
+        self.assertEqual(model['meta'], {'classes': ['resourceModel']})
+        self.assertEqual(model['attributes']['headers']['content'][0]['content'],
+                         {'key': 'X-Request-Id', 'value': '1234'})
+        self.assertEqual(model['content'][0]['content'], '{"id": 1}')
+
+        request = transition['content'][0]['content'][0]
+        members = request['content'][0]['content']['content']
+        self.assertEqual(members[0], {'element': 'member',
+                                      'attributes': {'typeAttributes': ['required']},
+                                      'meta': {'description': 'ID of the message'},
+                                      'content': {'key': {'element': 'string', 'content': 'id'},
+                                                  'value': {'element': 'number', 'content': 1}}})
+        self.assertEqual(members[1]['content']['value'],
+                         {'element': 'object',
+                          'content': [{'element': 'member',
+                                       'content': {'key': {'element': 'string', 'content': 'name'},
+                                                   'value': {'element': 'string', 'content': 'alice'}}}]})
+        self.assertEqual(members[2]['content']['value'], {'element': 'array', 'content': [{'element': 'string'}]})
+
+    @with_app(srcdir='tests/template', copy_srcdir_to_tmpdir=True, buildername='apiblueprint-openapi')
+    def test_openapi_builder(self, app, status, warnings):
+        """
+        # Posts [/posts/{id}{?fields}]
+        + Parameters
+            + id: `1` (number) - ID of the post
+            + fields (string, optional)
+
+        + Model (application/json)
+            + Body
+
+                    {"message": "Hello World!"}
+
+        ## Retrieve a post [GET]
+        + Response 200
+
+            [Posts][]
+
+        ## Delete a post [DELETE]
+        + Response 204
+            + Headers
+
+                    X-Request-Id: 1234
+
+        # Data Structures
+        ## Post (object)
+        + id: 1 (number, required)
+        + message (string) - body of the post
+        + tags (array[string])
+        + author (object)
+            + name: alice (string)
+        """
+        app.build()
+        print(status.getvalue(), warnings.getvalue())
+
+        with open(os.path.join(app.outdir, 'openapi.json')) as fd:
+            data = json.load(fd)
+        self.assertEqual(data['openapi'], '3.0.3')
+        self.assertEqual(list(data['paths']), ['/posts/{id}'])
+
+        retrieve = data['paths']['/posts/{id}']['get']
+        self.assertEqual(retrieve['summary'], 'Retrieve a post')
+        self.assertEqual(retrieve['parameters'],
+                         [{'name': 'fields', 'in': 'query', 'required': False, 'schema': {'type': 'string'}},
+                          {'name': 'id', 'in': 'path', 'required': True, 'schema': {'type': 'number'},
+                           'description': 'ID of the post', 'example': '1'}])
+        self.assertEqual(retrieve['responses']['200']['content'],
+                         {'application/json': {'example': '{"message": "Hello World!"}'}})
+
+        delete = data['paths']['/posts/{id}']['delete']
+        self.assertEqual(delete['responses']['204']['headers'],
+                         {'X-Request-Id': {'schema': {'type': 'string'}, 'example': '1234'}})
+        self.assertEqual(data['components']['schemas']['Post'],
+                         {'type': 'object',
+                          'required': ['id'],
+                          'properties': {
+                              'id': {'type': 'number', 'example': 1},
+                              'message': {'type': 'string', 'description': 'body of the post'},
+                              'tags': {'type': 'array', 'items': {'type': 'string'}},
+                              'author': {'type': 'object',
+                                         'properties': {'name': {'type': 'string', 'example': 'alice'}}}}})
+
+        # chunks of unchanged documents are not regenerated
+        status.truncate(0)
+        app.build()
+        self.assertIn('0 of 1 document(s) converted to OpenAPI.', status.getvalue())
+
+    @with_app(srcdir='tests/template', copy_srcdir_to_tmpdir=True, buildername='apiblueprint-openapi')
+    def test_openapi_builder_with_model_in_other_document(self, app, status, warnings):
+        """
+        # Message [/message]
+        + Model (text/plain)
+            + Body
+
+                    Hello World!
+
+        ## Retrieve [GET]
+        + Response 200
+
+            [Message][]
+        """
+        (app.srcdir / 'other.rst').write_text('.. apiblueprint:: other.md\n')
+        (app.srcdir / 'other.md').write_text("# DELETE /message\n"
+                                             "+ Response 200\n"
+                                             "\n"
+                                             "    [Message][]\n")
+        app.build()
+        print(status.getvalue(), warnings.getvalue())
+
+        # change the Model; the chunk of other document refers it is also regenerated
+        (app.srcdir / 'api.md').write_text((app.srcdir / 'api.md').read_text().replace('World', 'Sphinx'))
+        status.truncate(0)
+        app.build()
+        self.assertIn('2 of 2 document(s) converted to OpenAPI.', status.getvalue())
+
+        with open(os.path.join(app.outdir, 'openapi.json')) as fd:
+            data = json.load(fd)
+        delete = data['paths']['/message']['delete']
+        self.assertEqual(delete['responses']['200']['content'], {'text/plain': {'example': 'Hello Sphinx!'}})
+
+    @with_app(srcdir='tests/template', copy_srcdir_to_tmpdir=True)
+    def test_validation_errors(self, app, status, warnings):
+        # prepare
+        (app.srcdir / 'api.md').write_text(
+            "# GET /message\n"
+            "+ Response OK\n"
+            "\n"
+            "# POST /message\n"
+            "<!-- include(post.md) -->\n"
+        )
+        (app.srcdir / 'post.md').write_text(
+            "+ Request (text/plain)\n"
+            "+ Parameters\n"
+            "+ Parameters\n"
+        )
+
+        app.build()
+        print(status.getvalue(), warnings.getvalue())
+        self.assertIn('api.md:2: ERROR: Unknown response type: Response OK', warnings.getvalue())
+        self.assertIn('api.md:4: ERROR: ResourceAction section should have at most one Parameters section',
+                      warnings.getvalue())
+
+    @with_app(srcdir='tests/template', copy_srcdir_to_tmpdir=True)
+    def test_included_fragment(self, app, status, warnings):
+        from sphinxcontrib.apiblueprint import fragments
+        fragments.cache.clear()
+
+        # prepare
+        (app.srcdir / 'api.md').write_text(
+            "# GET /message\n"
+            "+ Response 200 (text/plain)\n"
+            "<!-- include(unauthorized.md) -->\n"
+            "\n"
+            "# DELETE /message\n"
+            "<!-- include(unauthorized.md) -->\n"
+            "+ Response 204\n"
+        )
+        (app.srcdir / 'unauthorized.md').write_text(
+            "+ Response 401 (text/plain)\n"
+            "    + Headers\n"
+            "\n"
+            "            WWW-Authenticate: Basic\n"
+        )
+
+        app.build()
+        print(status.getvalue(), warnings.getvalue())
+        self.assertEqual(len(fragments.cache.parsed), 1)
+
+        doctree = app.env.get_doctree('index')
+        get, delete = doctree[0][1], doctree[0][2]
+        self.assertEqual(get[0].astext(), 'GET /message')
+        self.assertEqual(get[1][0][0].astext(), 'Response 200')
+        self.assertEqual(get[1][1][0].astext(), 'Response 401')
+        self.assertEqual(get[1][1][1][1].astext(), ('Content-Type: text/plain\n'
+                                                    'WWW-Authenticate: Basic'))
+        self.assertEqual(delete[0].astext(), 'DELETE /message')
+        self.assertEqual(delete[1][0].astext(), get[1][1].astext())
+        self.assertEqual(delete[1][1][0].astext(), 'Response 204')
+
+    @with_app(srcdir='tests/template', copy_srcdir_to_tmpdir=True,
+              confoverrides={'apiblueprint_html_cache': True})
+    def test_html_cache(self, app, status, warnings):
+        """
+        # GET /message
+        + Response 200 (text/plain)
+
+                Hello World!
+
+        # DELETE /message
+        + Response 204
+        """
+        app.build()
+        print(status.getvalue(), warnings.getvalue())
+        self.assertNotIn('HTML fragment(s) of actions reused.', status.getvalue())
+        self.assertTrue((app.doctreedir / 'apiblueprint-html.pickle').exists())
+        html = (app.outdir / 'index.html').read_text()
+
+        # rebuild with the cache
+        status.seek(0)
+        status.truncate(0)
+        app.builder.apiblueprint_html_cache.hits = 0
+        app.build(force_all=True)
+        self.assertIn('2 HTML fragment(s) of actions reused.', status.getvalue())
+        self.assertEqual((app.outdir / 'index.html').read_text(), html)
+
+    @with_tmpdir
+    def test_html_cache_is_dropped_on_config_changed(self, tmpdir):
+        srcdir = tmpdir / 'src'
+        shutil.copytree('tests/template', srcdir)
+        (srcdir / 'api.md').write_text("# GET /message\n+ Response 204\n")
+
+        def build(**confoverrides):
+            status = StringIO()
+            confoverrides['apiblueprint_html_cache'] = True
+            app = TestApp(srcdir=srcdir, outdir=tmpdir / 'html', doctreedir=tmpdir / 'doctrees',
+                          status=status, confoverrides=confoverrides)
+            try:
+                app.build(force_all=True)
+                return status.getvalue(), (app.outdir / 'index.html').read_text()
+            finally:
+                app.cleanup()
+
+        build()
+        status, _ = build()
+        self.assertIn('1 HTML fragment(s) of actions reused.', status)
+
+        status, html = build(html_permalinks_icon='#permalink#')
+        self.assertNotIn('HTML fragment(s) of actions reused.', status)
+        self.assertIn('#permalink#', html)
+
+    @with_app(srcdir='tests/template', copy_srcdir_to_tmpdir=True)
+    def test_html_cache_disabled(self, app, status, warnings):
+        """
+        # GET /message
+        + Response 204
+        """
+        app.build()
+        print(status.getvalue(), warnings.getvalue())
+        self.assertNotIn('HTML fragment(s) of actions reused.', status.getvalue())
+        self.assertFalse((app.doctreedir / 'apiblueprint-html.pickle').exists())
+
+    @with_app(srcdir='tests/template', copy_srcdir_to_tmpdir=True,
+              confoverrides={'apiblueprint_compact': True})
+    def test_compact(self, app, status, warnings):
+        """
+        # GET /message
+        + Request Plain (text/plain)
+
+            Plain text
+
+            + Body
+
+                    Hello
+
+        + Response 200 (text/plain)
+            + Headers
+
+                    X-Request-Id: 1
+
+            + Body
+
+                    Hello World!
+        """
+        app.build()
+        print(status.getvalue(), warnings.getvalue())
+        doctree = app.env.get_doctree('index')
+        payloads = list(doctree.traverse(CompactPayload))
+        self.assertEqual(len(payloads), 2)
+        self.assertEqual(payloads[0]['kind'], 'Request')
+        self.assertEqual(payloads[0]['title'], 'Plain')
+        self.assertEqual(payloads[0]['headers'], 'Content-Type: text/plain')
+        self.assertEqual(payloads[0]['body'], 'Hello')
+        self.assertEqual(payloads[0].astext(), 'Plain text')
+        self.assertEqual(payloads[1]['kind'], 'Response')
+        self.assertEqual(payloads[1]['title'], '200')
+        self.assertEqual(payloads[1]['headers'], 'Content-Type: text/plain\nX-Request-Id: 1')
+        self.assertEqual(payloads[1]['body'], 'Hello World!')
+        self.assertNotIn('schema', payloads[1])
+
+        html = (app.outdir / 'index.html').read_text()
+        self.assertIn('<div class="apiblueprint-payload">', html)
+        self.assertIn('<pre>Hello World!</pre>', html)
+
+    @with_app(srcdir='tests/template', copy_srcdir_to_tmpdir=True, buildername='latex',
+              confoverrides={'apiblueprint_compact': True})
+    def test_compact_on_latex_builder(self, app, status, warnings):
+        """
+        # GET /message
+        + Response 200 (text/plain)
+
+                \\end{verbatim} {Hello}
+        """
+        app.build()
+        print(status.getvalue(), warnings.getvalue())
+        texfile = [filename for filename in os.listdir(str(app.outdir)) if filename.endswith('.tex')][0]
+        with open(os.path.join(str(app.outdir), texfile)) as fd:
+            tex = fd.read()
+        self.assertIn('\\begin{sphinxVerbatim}', tex)
+        self.assertIn('\\PYGZbs{}', tex)  # escaped by the highlighter
+        self.assertNotIn('\\end{verbatim}', tex)
+
+    @with_app(srcdir='tests/template', copy_srcdir_to_tmpdir=True, buildername='text',
+              confoverrides={'apiblueprint_compact': True})
+    def test_compact_on_text_builder(self, app, status, warnings):
+        """
+        # GET /message
+        + Response 200 (text/plain)
+
+                Hello World!
+        """
+        app.build()
+        print(status.getvalue(), warnings.getvalue())
+        text = (app.outdir / 'index.txt').read_text()
+        self.assertIn('**Response** "200"', text)
+        self.assertIn('Hello World!', text)
+
+    @with_app(srcdir='tests/template', copy_srcdir_to_tmpdir=True)
+    def test_endpoints(self, app, status, warnings):
+        """
+        # Group Messages
+        ## Message [/message]
+        ### Show [GET]
+        + Response 200
+
+        ### Delete [DELETE]
+        + Response 204
+
+        # Group Users
+        ## GET /users
+        + Response 200
+        """
+        (app.srcdir / 'endpoints.rst').write_text(
+            "Endpoints\n"
+            "=========\n"
+            "\n"
+            ".. apiblueprint-endpoints::\n"
+            "\n"
+            ".. apiblueprint-endpoints::\n"
+            "   :group: Messages\n"
+            "   :sort: method\n"
+        )
+        app.build()
+        print(status.getvalue(), warnings.getvalue())
+
+        doctree = app.env.get_and_resolve_doctree('endpoints', app.builder)
+        tables = list(doctree.traverse(nodes.table))
+        self.assertEqual(len(tables), 2)
+        rows = [[entry.astext() for entry in row] for row in tables[0].traverse(nodes.row)]
+        self.assertEqual(rows, [['Method', 'URI', 'Identifier', 'Document'],
+                                ['DELETE', '/message', 'Delete', 'Example API'],
+                                ['GET', '/message', 'Show', 'Example API'],
+                                ['GET', '/users', '', 'Example API']])
+        rows = [[entry.astext() for entry in row] for row in tables[1].traverse(nodes.row)]
+        self.assertEqual(rows, [['Method', 'URI', 'Identifier', 'Document'],
+                                ['DELETE', '/message', 'Delete', 'Example API'],
+                                ['GET', '/message', 'Show', 'Example API']])
+
+        html = (app.outdir / 'endpoints.html').read_text()
+        self.assertIn('href="index.html#delete--message"', html)
+
+        # rewritten when a blueprint is changed
+        (app.srcdir / 'api.md').write_text("# GET /messages\n+ Response 200\n")
+        app.build()
+        html = (app.outdir / 'endpoints.html').read_text()
+        self.assertNotIn('href="index.html#delete--message"', html)
+
+    @with_app(srcdir='tests/template', copy_srcdir_to_tmpdir=True,
+              confoverrides={'apiblueprint_search_index': True})
+    def test_search_index(self, app, status, warnings):
+        """
+        # Group Messages
+        ## Message [/message]
+        ### Show [GET]
+        + Response 200
+        """
+        (app.srcdir / 'endpoints.rst').write_text("Search\n======\n\n.. apiblueprint-search::\n\n"
+                                                  ".. apiblueprint-search::\n")
+        app.build()
+        print(status.getvalue(), warnings.getvalue())
+        index = app.outdir / '_static' / 'apiblueprint-search.json'
+        self.assertEqual(json.loads(index.read_text()),
+                         {'entries': [['GET', '/message', 'Show', 'Messages', 'index.html#get--message']]})
+        self.assertTrue((app.outdir / '_static' / 'apiblueprint-search.js').exists())
+        html = (app.outdir / 'endpoints.html').read_text()
+        self.assertIn('<div class="apiblueprint-search" data-root="', html)
+        self.assertIn('data-index="_static/apiblueprint-search.json">', html)
+        self.assertEqual(html.count('<div class="apiblueprint-search"'), 2)
+        script = '<script src="_static/apiblueprint-search.js'
+        self.assertEqual(html.count(script), 1)  # loaded once per page
+        self.assertNotIn(script, (app.outdir / 'index.html').read_text())
+
+        # not rewritten if no actions are changed
+        os.utime(str(index), (0, 0))
+        (app.srcdir / 'endpoints.rst').write_text("Search\n======\n\nendpoints\n\n.. apiblueprint-search::\n")
+        app.build()
+        self.assertEqual(os.stat(str(index)).st_mtime, 0)
+
+        # rewritten if actions are changed
+        (app.srcdir / 'api.md').write_text("# DELETE /message\n+ Response 204\n")
+        app.build()
+        self.assertEqual(json.loads(index.read_text()),
+                         {'entries': [['DELETE', '/message', '', '', 'index.html#delete--message']]})
+
+    @with_tmpdir
+    def test_search_index_with_other_builder(self, tmpdir):
+        srcdir = tmpdir / 'src'
+        shutil.copytree('tests/template', srcdir)
+        (srcdir / 'api.md').write_text("# GET /message\n+ Response 204\n")
+        (srcdir / 'other.rst').write_text("Other\n=====\n\n.. apiblueprint-search::\n")
+
+        def build(buildername):
+            app = TestApp(srcdir=srcdir, buildername=buildername, outdir=tmpdir / buildername,
+                          doctreedir=tmpdir / 'doctrees', status=StringIO(),
+                          confoverrides={'apiblueprint_search_index': True})
+            try:
+                app.build()
+                with open(str(app.outdir / '_static' / 'apiblueprint-search.json')) as fd:
+                    return json.load(fd)['entries'][0][4]
+            finally:
+                app.cleanup()
+
+        self.assertEqual(build('html'), 'index.html#get--message')
+
+        # an old script is replaced
+        script = tmpdir / 'html' / '_static' / 'apiblueprint-search.js'
+        script.write_text('/* old script */')
+
+        # the entries cached by html builder are not used
+        self.assertEqual(build('dirhtml'), '#get--message')
+        self.assertEqual(build('html'), 'index.html#get--message')
+        with open(str(script)) as fd:
+            self.assertNotIn('old script', fd.read())
+
+    @with_app(srcdir='tests/template', copy_srcdir_to_tmpdir=True)
+    def test_broken_resource_having_actions(self, app, status, warnings):
+        """
+        # Message [/message/{id}]
+        + Parameters
+            + id (number) - ID of the message
+
+        + Parameters
+            + id (number) - ID of the message
+
+        ## Show [GET]
+        + Response 200
+
+        ## Delete [DELETE /message/{id}/delete]
+        + Response 204
+
+        # Broken
+        ## Update [PUT]
+        + Response 204
+        """
+        app.build()
+        print(status.getvalue(), warnings.getvalue())
+        self.assertIn('Resource section should have at most one Parameters section', warnings.getvalue())
+        self.assertIn('Action section should have URI template or be in a Resource section', warnings.getvalue())
+
+        # actions take the URI from the heading of the broken resource
+        doctree = app.env.get_doctree('index')
+        signatures = [node.astext() for node in doctree.traverse(addnodes.desc_signature)]
+        self.assertEqual(signatures, ['GET /message/{id} (Show)', 'DELETE /message/{id}/delete (Delete)'])
+
+    @with_app(srcdir='tests/template', copy_srcdir_to_tmpdir=True, buildername='apiblueprint-lint')
+    def test_lint_builder_with_broken_resource(self, app, status, warnings):
+        """
+        # Message [/message]
+        + Parameters
+            + id (number) - ID of the message
+
+        + Parameters
+            + id (number) - ID of the message
+
+        ## Show [GET]
+        + Response OK
+        """
+        app.build()
+        print(status.getvalue(), warnings.getvalue())
+        self.assertIn('Unknown response type: Response OK', warnings.getvalue())
+        self.assertIn('Resource section should have at most one Parameters section', warnings.getvalue())
+        self.assertEqual(app.statuscode, 1)
+
+    @with_app(srcdir='tests/template', copy_srcdir_to_tmpdir=True, buildername='apiblueprint-lint')
+    def test_lint_builder(self, app, status, warnings):
+        """
+        # GET /message
+        + Response OK
+        """
+        app.build()
+        print(status.getvalue(), warnings.getvalue())
+        self.assertIn('api.md:3: ERROR: Unknown response type: Response OK', warnings.getvalue())
+        self.assertIn('2 error(s) found in API Blueprints.', status.getvalue())
+        self.assertEqual(app.statuscode, 1)
+        self.assertFalse((app.outdir / 'index.html').exists())
+
+        # errors of documents not changed are also reported
+        status.truncate(0)
+        warnings.truncate(0)
+        app.build()
+        self.assertIn('api.md:3: ERROR: Unknown response type: Response OK', warnings.getvalue())
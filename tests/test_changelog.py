@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+import json
+import unittest
+from sphinx_testing import with_app
+from sphinxcontrib.apiblueprint.changelog import MANIFEST_FILE, diff, format_changelog
+
+
+class TestCase(unittest.TestCase):
+    @with_app(srcdir='tests/template', copy_srcdir_to_tmpdir=True,
+              confoverrides={'apiblueprint_manifest': True})
+    def test_manifest(self, app, status, warnings):
+        (app.srcdir / 'api.md').write_text(
+            "# GET /message\n"
+            "+ Response 200 (text/plain)\n"
+            "\n"
+            "        Hello World!\n"
+            "\n"
+            "+ Response 404\n"
+            "\n"
+            "# DELETE /message\n"
+            "+ Response 204\n"
+            "\n"
+            "# PUT /message\n"
+            "+ Response 204\n"
+        )
+        app.build()
+        print(status.getvalue(), warnings.getvalue())
+        old = json.loads((app.outdir / MANIFEST_FILE).read_text())
+        self.assertEqual(sorted(old['endpoints']), ['DELETE /message', 'GET /message', 'PUT /message'])
+        self.assertEqual(old['endpoints']['GET /message']['document'], 'index')
+        self.assertEqual(sorted(old['endpoints']['GET /message']['responses']), ['200', '404'])
+
+        (app.srcdir / 'api.md').write_text(
+            "# GET /message\n"
+            "+ Response 200 (text/plain)\n"
+            "\n"
+            "        Hello Sphinx!\n"
+            "\n"
+            "+ Response 404\n"
+            "\n"
+            "# DELETE /message\n"
+            "+ Response 204\n"
+            "\n"
+            "# POST /message\n"
+            "+ Response 201\n"
+        )
+        app.build()
+        new = json.loads((app.outdir / MANIFEST_FILE).read_text())
+        self.assertEqual(new['endpoints']['DELETE /message'], old['endpoints']['DELETE /message'])
+        self.assertEqual(new['endpoints']['GET /message']['responses']['404'],
+                         old['endpoints']['GET /message']['responses']['404'])
+
+        added, removed, changed = diff(old, new)
+        self.assertEqual(added, ['POST /message'])
+        self.assertEqual(removed, ['PUT /message'])
+        self.assertEqual(changed, [('GET /message', ['Response 200 changed'])])
+
+    def test_diff(self):
+        def endpoint(hash, requests={}, responses={}):
+            return {'document': 'index', 'hash': hash, 'requests': requests, 'responses': responses}
+
+        old = {'endpoints': {'GET /a': endpoint('1', responses={'200': 'x', '200#2': 'y'}),
+                             'GET /b': endpoint('2', requests={'': 'z'}),
+                             'GET /c': endpoint('3')}}
+        new = {'endpoints': {'GET /a': endpoint('4', responses={'200': 'x', '404': 'w'}),
+                             'GET /b': endpoint('5', requests={'': 'z'}),
+                             'GET /c': endpoint('3')}}
+        added, removed, changed = diff(old, new)
+        self.assertEqual(added, [])
+        self.assertEqual(removed, [])
+        self.assertEqual(changed, [('GET /a', ['Response 200#2 removed', 'Response 404 added']),
+                                   ('GET /b', ['action changed'])])
+        self.assertEqual(format_changelog('API Changes', added, removed, changed),
+                         "API Changes\n"
+                         "===========\n"
+                         "\n"
+                         "Changed\n"
+                         "-------\n"
+                         "\n"
+                         "* ``GET /a``: Response 200#2 removed, Response 404 added\n"
+                         "* ``GET /b``: action changed\n")
+        self.assertEqual(format_changelog('API Changes', [], [], []),
+                         "API Changes\n===========\n\nNo changes.\n")
@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+import json
+import unittest
+from sphinx_testing import with_tmpdir
+from sphinxcontrib.apiblueprint.compiler import main
+from sphinxcontrib.apiblueprint.ir import from_dict
+
+
+class TestCase(unittest.TestCase):
+    @with_tmpdir
+    def test_compile(self, tmpdir):
+        (tmpdir / 'api.md').write_text(
+            "# GET /message\n"
+            "+ Response 200 (text/plain)\n"
+            "\n"
+            "        <!-- include(message.txt) -->\n"
+        )
+        (tmpdir / 'message.txt').write_text("Hello World!\n")
+
+        ret = main([str(tmpdir / 'api.md'), '-s', str(tmpdir), '-o', str(tmpdir / 'out'), '-j', '1'])
+        self.assertEqual(ret, 0)
+
+        with open(str(tmpdir / 'out' / 'api.md.json')) as fd:
+            data = json.load(fd)
+        self.assertEqual(data['dependencies'], ['api.md', 'message.txt'])
+
+        blueprint = from_dict(data['blueprint'])
+        action = blueprint.groups[0].resources[0].actions[0]
+        self.assertEqual(action.method, 'GET')
+        self.assertEqual(action.uri, '/message')
+        self.assertEqual(action.responses[0].body, 'Hello World!')
+
+    @with_tmpdir
+    def test_parse_error(self, tmpdir):
+        (tmpdir / 'valid.md').write_text(
+            "# GET /message\n"
+            "+ Response 200\n"
+        )
+        (tmpdir / 'invalid.md').write_text(
+            "# GET /message\n"
+            "+ Response OK\n"
+        )
+
+        ret = main([str(tmpdir / 'valid.md'), str(tmpdir / 'invalid.md'), '-s', str(tmpdir), '-j', '2'])
+        self.assertEqual(ret, 1)
+
+    @with_tmpdir
+    def test_outside_of_srcdir(self, tmpdir):
+        (tmpdir / 'src').makedirs()
+        (tmpdir / 'api.md').write_text(
+            "# GET /message\n"
+            "+ Response 200\n"
+        )
+
+        ret = main([str(tmpdir / 'api.md'), '-s', str(tmpdir / 'src'), '-o', str(tmpdir / 'out'), '-j', '1'])
+        self.assertEqual(ret, 1)
+        self.assertFalse((tmpdir / 'api.md.json').exists())
+        self.assertFalse((tmpdir / 'out').exists())
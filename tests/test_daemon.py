@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+import os
+import stat
+import pickle
+import socket
+import tempfile
+import threading
+import unittest
+from docutils import nodes
+from sphinx import addnodes
+from sphinx_testing import with_app, with_tmpdir
+from sphinxcontrib.apiblueprint.daemon import (
+    ParsingDaemon, ParsingDaemonServer, is_private, is_trusted_peer, recv_exactly, request, send_message
+)
+
+SOCKET = os.path.join(tempfile.gettempdir(), 'apiblueprint-test-%d.sock' % os.getpid())
+
+
+class DaemonThread(object):
+    def __enter__(self):
+        self.daemon = ParsingDaemon()
+        self.server = ParsingDaemonServer(SOCKET, self.daemon)
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.start()
+        return self.daemon
+
+    def __exit__(self, *exc_info):
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+
+
+class TestCase(unittest.TestCase):
+    @with_tmpdir
+    def test_request(self, tmpdir):
+        (tmpdir / 'api.md').write_text(
+            "# GET /message\n"
+            "+ Response 200 (text/plain)\n"
+            "\n"
+            "        <!-- include(message.txt) -->\n"
+        )
+        (tmpdir / 'message.txt').write_text("Hello World!\n")
+
+        with DaemonThread() as daemon:
+            parsed = request(SOCKET, str(tmpdir), 'api.md')
+            self.assertEqual(parsed['processed'], set(['api.md', 'message.txt']))
+            self.assertEqual(parsed['blueprint'].errors, [])
+            self.assertEqual(parsed['blueprint'].groups[0].resources[0].actions[0].responses[0].body,
+                             'Hello World!')
+            self.assertEqual(parsed['doctree'][0]['http_method'], 'GET')
+
+            # cached by content
+            request(SOCKET, str(tmpdir), 'api.md')
+            self.assertEqual(len(daemon.cache), 1)
+
+            (tmpdir / 'message.txt').write_text("Hello Daemon!\n")
+            parsed = request(SOCKET, str(tmpdir), 'api.md')
+            self.assertEqual(parsed['blueprint'].groups[0].resources[0].actions[0].responses[0].body,
+                             'Hello Daemon!')
+            self.assertEqual(len(daemon.cache), 2)
+
+            # errors on reading are raised
+            with self.assertRaises(IOError):
+                request(SOCKET, str(tmpdir), 'unknown.md')
+
+        # daemon is not available
+        self.assertIsNone(request(SOCKET, str(tmpdir), 'api.md'))
+
+    @with_app(srcdir='tests/template', copy_srcdir_to_tmpdir=True,
+              confoverrides={'apiblueprint_daemon_socket': SOCKET})
+    def test_directive(self, app, status, warnings):
+        (app.srcdir / 'api.md').write_text(
+            "# GET /message\n"
+            "+ Response 200 (text/plain)\n"
+            "\n"
+            "        Hello World!\n"
+        )
+
+        with DaemonThread() as daemon:
+            app.build()
+            print(status.getvalue(), warnings.getvalue())
+            self.assertEqual(len(daemon.cache), 1)
+
+        desc = app.env.get_doctree('index')[0][1]
+        self.assertIsInstance(desc, addnodes.desc)
+        self.assertEqual(desc[0].astext(), 'GET /message')
+        self.assertEqual(desc[1][0][0].astext(), 'Response 200')
+        self.assertIsInstance(desc[1][0][2][1], nodes.literal_block)
+        self.assertEqual(desc[1][0][2][1].astext(), 'Hello World!')
+
+    def test_socket_mode(self):
+        umask = os.umask(0o022)
+        try:
+            with DaemonThread():
+                self.assertEqual(stat.S_IMODE(os.stat(SOCKET).st_mode), 0o600)
+                self.assertEqual(os.umask(0o022), 0o022)  # not changed
+        finally:
+            os.umask(umask)
+
+        # the private directory to create the socket is removed
+        dirname = os.path.dirname(SOCKET)
+        self.assertFalse([name for name in os.listdir(dirname) if name.startswith('.apiblueprint-')])
+
+    def test_peer(self):
+        with DaemonThread():
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                sock.connect(SOCKET)
+                self.assertTrue(is_trusted_peer(sock, SOCKET))
+
+                # requests are not unpickled
+                send_message(sock, pickle.dumps(('srcdir', 'api.md')))
+                with self.assertRaises(EOFError):
+                    recv_exactly(sock, 1)
+            finally:
+                sock.close()
+
+    @with_tmpdir
+    def test_is_private(self, tmpdir):
+        os.chmod(str(tmpdir), 0o700)
+        path = str(tmpdir / 'socket')
+        with open(path, 'w'):
+            pass
+        os.chmod(path, 0o600)
+        self.assertTrue(is_private(path))
+
+        os.chmod(path, 0o666)
+        self.assertFalse(is_private(path))
+
+        os.chmod(path, 0o600)
+        os.chmod(str(tmpdir), 0o777)
+        self.assertFalse(is_private(path))
+
+    def test_stale_socket(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.bind(SOCKET)
+        sock.close()  # nothing is listening
+        try:
+            with DaemonThread():
+                self.assertTrue(stat.S_ISSOCK(os.stat(SOCKET).st_mode))
+        finally:
+            if os.path.exists(SOCKET):
+                os.remove(SOCKET)
+
+    def test_socket_in_use(self):
+        with DaemonThread():
+            with self.assertRaises(RuntimeError):
+                ParsingDaemonServer(SOCKET, ParsingDaemon())
+
+            # still served
+            self.assertTrue(os.path.exists(SOCKET))
+
+    @with_tmpdir
+    def test_not_a_socket(self, tmpdir):
+        path = tmpdir / 'regular-file'
+        path.write_text('important data')
+        with self.assertRaises(RuntimeError):
+            ParsingDaemonServer(str(path), ParsingDaemon())
+        with open(path) as fd:
+            self.assertEqual(fd.read(), 'important data')
@@ -1,7 +1,10 @@
 # -*- coding: utf-8 -*-
+import codecs
+import subprocess
+import sys
 import unittest
 from sphinx_testing import with_tmpdir
-from sphinxcontrib.apiblueprint.directive import MarkdownReader
+from sphinxcontrib.apiblueprint.directive import MarkdownReader, SharedPool
 
 
 class TestCase(unittest.TestCase):
@@ -67,3 +70,99 @@ class TestCase(unittest.TestCase):
         with self.assertRaises(IOError):
             reader = MarkdownReader(tmpdir)
             reader.read('api.md', tmpdir / 'api.md', [])
+
+    @with_tmpdir
+    def test_parsing_stack_is_not_imported_on_setup(self, tmpdir):
+        script = ("import sys\n"
+                  "import sphinxcontrib.apiblueprint\n"
+                  "print('recommonmark' in sys.modules)\n"
+                  "print('sphinxcontrib.apiblueprint.translator' in sys.modules)\n"
+                  "print('sphinxcontrib.httpdomain' in sys.modules)\n"
+                  "print('sphinxcontrib.apiblueprint.changelog' in sys.modules)\n")
+        output = subprocess.check_output([sys.executable, '-c', script], cwd=str(tmpdir))
+        self.assertEqual(output.decode('utf-8').split(), ['False', 'False', 'False', 'False'])
+
+    @with_tmpdir
+    def test_MarkdownReader_locate(self, tmpdir):
+        # prepare
+        (tmpdir / 'api.md').write_text(
+            "Line1\n"
+            "<!-- include(subdoc1.md) -->\n"
+            "Line3\n"
+            "    <!-- include(subdoc2.md) -->\n"
+            "Line5\n"
+        )
+        (tmpdir / 'subdoc1.md').write_text(
+            "Sub1-1\n"
+            "Sub1-2\n"
+        )
+        (tmpdir / 'subdoc2.md').write_text(
+            "Sub2-1\n"
+        )
+
+        reader = MarkdownReader(tmpdir)
+        content = reader.read('api.md', tmpdir / 'api.md', [])
+        self.assertEqual(content, "Line1\nSub1-1\nSub1-2\nLine3\n    Sub2-1\nLine5\n")
+        self.assertEqual(reader.locate(1), ('api.md', 1))
+        self.assertEqual(reader.locate(2), ('subdoc1.md', 1))
+        self.assertEqual(reader.locate(3), ('subdoc1.md', 2))
+        self.assertEqual(reader.locate(4), ('api.md', 3))
+        self.assertEqual(reader.locate(5), ('subdoc2.md', 1))
+        self.assertEqual(reader.locate(6), ('api.md', 5))
+
+    @with_tmpdir
+    def test_MarkdownReader_prefetch(self, tmpdir):
+        # prepare: wide and deep include tree
+        (tmpdir / 'api.md').write_text(
+            "".join("<!-- include(sub%d.md) -->\n" % i for i in range(20))
+        )
+        for i in range(20):
+            (tmpdir / ('sub%d.md' % i)).write_text(
+                "Sub%d\n"
+                "    <!-- include(common.md) -->\n" % i
+            )
+        (tmpdir / 'common.md').write_text("Common\nLines\n")
+
+        reader = MarkdownReader(tmpdir, max_workers=1)
+        expected = reader.read('api.md', tmpdir / 'api.md', [])
+
+        reader = MarkdownReader(tmpdir, max_workers=4)
+        content = reader.read('api.md', tmpdir / 'api.md', [])
+        self.assertEqual(content, expected)
+        self.assertEqual(content.count("Common\n    Lines"), 20)
+        self.assertEqual(len(reader.processed), 22)
+        self.assertEqual(reader.locate(2), ('common.md', 1))
+
+    @with_tmpdir
+    def test_MarkdownReader_bom_and_newlines(self, tmpdir):
+        # prepare
+        with open(str(tmpdir / 'api.md'), 'wb') as fd:
+            fd.write(codecs.BOM_UTF8 +
+                     u"Markdown document ☃\r\n"
+                     u"  <!-- include(subdoc.md) -->\r\n"
+                     u"Line3\r\n".encode('utf-8'))
+        (tmpdir / 'subdoc.md').write_text(
+            "This is sub document\n"
+            "Line2\n"
+        )
+
+        reader = MarkdownReader(tmpdir)
+        content = reader.read('api.md', tmpdir / 'api.md', [])
+        self.assertEqual(content, (u"Markdown document ☃\n"
+                                   u"  This is sub document\n  Line2\n"
+                                   u"Line3\n"))
+        self.assertEqual(reader.processed, set(('api.md', 'subdoc.md')))
+
+    def test_SharedPool(self):
+        pool = SharedPool()
+        self.assertIsNone(pool.get())  # not started
+
+        pool.start(2)
+        first = pool.get()
+        self.assertIs(pool.get(), first)  # reused in the build
+        pool.close()
+        self.assertIsNone(pool.pool)
+
+        pool.start(1)
+        self.assertIsNone(pool.get())  # serial
+        pool.close()
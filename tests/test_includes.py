@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+import json
+import unittest
+from sphinx_testing import with_app
+from sphinxcontrib.apiblueprint.includes import GRAPH_FILE, affected
+
+
+class TestCase(unittest.TestCase):
+    @with_app(srcdir='tests/template', copy_srcdir_to_tmpdir=True,
+              confoverrides={'apiblueprint_include_graph': True})
+    def test_include_graph(self, app, status, warnings):
+        (app.srcdir / 'api.md').write_text(
+            "# GET /message\n"
+            "<!-- include(responses.md) -->\n"
+        )
+        (app.srcdir / 'responses.md').write_text(
+            "+ Response 200 (text/plain)\n"
+            "\n"
+            "        <!-- include(message.txt) -->\n"
+        )
+        (app.srcdir / 'message.txt').write_text("Hello World!\n")
+        (app.srcdir / 'other.rst').write_text("Other\n=====\n")
+
+        app.build()
+        print(status.getvalue(), warnings.getvalue())
+        graph = json.loads((app.outdir / GRAPH_FILE).read_text())
+        self.assertEqual(graph['documents']['index'],
+                         {'source': 'index.rst',
+                          'includes': {'index.rst': ['api.md'],
+                                       'api.md': ['responses.md'],
+                                       'responses.md': ['message.txt']}})
+        self.assertEqual(graph['documents']['other'], {'source': 'other.rst', 'includes': {}})
+
+        self.assertEqual(affected(graph, ['message.txt']), ['index'])
+        self.assertEqual(affected(graph, ['other.rst']), ['other'])
+        self.assertEqual(affected(graph, ['message.txt', 'other.rst']), ['index', 'other'])
+        self.assertEqual(affected(graph, ['unknown.md']), [])
+
+    def test_affected(self):
+        graph = {'documents': {'a': {'source': 'a.rst', 'includes': {'a.rst': ['a.md'],
+                                                                     'a.md': ['common.md']}},
+                               'b': {'source': 'b.apib', 'includes': {'b.apib': ['common.md']}},
+                               'c': {'source': 'c.apib', 'includes': {}}}}
+        self.assertEqual(affected(graph, ['common.md']), ['a', 'b'])
+        self.assertEqual(affected(graph, ['a.md']), ['a'])
+        self.assertEqual(affected(graph, ['c.apib']), ['c'])
@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+import pickle
+import unittest
+from textwrap import dedent
+from sphinx_testing import with_tmpdir
+from sphinxcontrib.apiblueprint import ir
+from sphinxcontrib.apiblueprint.compiler import compile_file
+
+
+class TestCase(unittest.TestCase):
+    @with_tmpdir
+    def test_from_doctree(self, tmpdir):
+        (tmpdir / 'api.md').write_text(dedent("""
+            # Example API
+            Description of API
+
+            # Group Blog Posts
+            ## Posts [/posts/{id}]
+            + Parameters
+                + id: `1` (number, required) - ID of the post
+
+            + Model (text/plain)
+                + Body
+
+                        Hello World!
+
+            ### Retrieve a Post [GET]
+            + Relation: self
+            + Response 200 (application/json)
+                + Headers
+
+                        X-Request-Id: 1234
+
+                + Body
+
+                        {"message": "Hello World!"}
+
+            ### Update a Post [PUT]
+            + Request (text/plain)
+
+                    Hello World!
+
+            + Response 204
+
+            # Data Structures
+            ## Post (object)
+            + message (string)
+        """))
+
+        blueprint, _ = compile_file(str(tmpdir), 'api.md')
+        self.assertEqual(blueprint.name, 'Example API')
+        self.assertEqual(blueprint.description, 'Description of API')
+
+        group = blueprint.groups[0]
+        self.assertEqual(group.name, 'Blog Posts')
+
+        resource = group.resources[0]
+        self.assertEqual(resource.identifier, 'Posts')
+        self.assertEqual(resource.uri, '/posts/{id}')
+        self.assertEqual(resource.parameters,
+                         [ir.Parameter(name='id', example='1', type='number', description='ID of the post')])
+        self.assertEqual(resource.model.content_type, 'text/plain')
+        self.assertEqual(resource.model.body, 'Hello World!')
+
+        retrieve, update = resource.actions
+        self.assertEqual(retrieve.identifier, 'Retrieve a Post')
+        self.assertEqual(retrieve.method, 'GET')
+        self.assertEqual(retrieve.uri, '/posts/{id}')
+        self.assertEqual(retrieve.relation, 'self')
+        self.assertEqual(retrieve.responses[0].status_code, 200)
+        self.assertEqual(retrieve.responses[0].headers, ['Content-Type: application/json', 'X-Request-Id: 1234'])
+        self.assertEqual(retrieve.responses[0].body, '{"message": "Hello World!"}')
+
+        self.assertEqual(update.requests[0].content_type, 'text/plain')
+        self.assertEqual(update.requests[0].body, 'Hello World!')
+        self.assertEqual(update.responses[0].status_code, 204)
+        self.assertEqual(update.responses[0].body, None)
+
+        self.assertEqual(blueprint.data_structures[0].name, 'Post')
+        self.assertEqual(blueprint.data_structures[0].type, 'object')
+        self.assertEqual(blueprint.data_structures[0].attributes, '+ message (string)')
+
+        # serialization
+        self.assertEqual(ir.from_dict(blueprint.to_dict()), blueprint)
+        self.assertEqual(pickle.loads(pickle.dumps(blueprint, 2)), blueprint)
+
+    def test_parameter(self):
+        param = ir.Parameter.parse('id: `1` (number, optional) - ID of the post')
+        self.assertEqual(param.name, 'id')
+        self.assertEqual(param.example, '1')
+        self.assertEqual(param.type, 'number')
+        self.assertEqual(param.required, False)
+        self.assertEqual(param.description, 'ID of the post')
+
+        param = ir.Parameter.parse('message (string)')
+        self.assertEqual(param.name, 'message')
+        self.assertEqual(param.example, None)
+        self.assertEqual(param.type, 'string')
+        self.assertEqual(param.required, True)
+
+    def test_parse_attributes(self):
+        typename, members = ir.parse_attributes('Attributes (Message)')
+        self.assertEqual(typename, 'Message')
+        self.assertEqual(members, [])
+
+        typename, members = ir.parse_attributes("Attributes\n"
+                                                "+ id: 1 (number, required) - ID\n"
+                                                "+ author (object)\n"
+                                                "    + name: alice (string, optional)\n"
+                                                "+ text (string)")
+        self.assertEqual(typename, None)
+        self.assertEqual(members,
+                         [ir.Member(name='id', example='1', type='number', required=True, description='ID'),
+                          ir.Member(name='author', type='object',
+                                    members=[ir.Member(name='name', example='alice', type='string')]),
+                          ir.Member(name='text', type='string')])
+
+    def test_slots(self):
+        action = ir.Action(method='GET', uri='/posts')
+        self.assertFalse(hasattr(action, '__dict__'))
+        with self.assertRaises(TypeError):
+            ir.Action(unknown='value')
+
+    def test_unhashable(self):
+        with self.assertRaises(TypeError):
+            hash(ir.Action(method='GET', uri='/posts'))
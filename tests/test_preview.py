@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+import os
+import unittest
+from sphinx_testing import with_tmpdir
+from sphinxcontrib.apiblueprint.preview import Preview, events_url
+
+
+class TestCase(unittest.TestCase):
+    @with_tmpdir
+    def test_update(self, tmpdir):
+        (tmpdir / 'api.md').write_text(
+            "# Example API\n"
+            "Description with *emphasis*.\n"
+            "\n"
+            "# GET /message\n"
+            "+ Response 200 (text/plain)\n"
+            "\n"
+            "        <!-- include(message.txt) -->\n"
+        )
+        (tmpdir / 'other.md').write_text(
+            "# GET /other\n"
+            "+ Response 204\n"
+        )
+        (tmpdir / 'message.txt').write_text("Hello World!\n")
+
+        preview = Preview(str(tmpdir), ['api.md', 'other.md'])
+        self.addCleanup(preview.close)
+        self.assertIn('GET', preview.pages['api.md'][1])
+        self.assertIn('id="get--message"', preview.pages['api.md'][1])
+        self.assertIn('Description with <em>emphasis</em>.', preview.pages['api.md'][1])
+        self.assertIn('Hello World!', preview.pages['api.md'][1])
+        self.assertEqual(preview.update(), [])
+
+        # change included file
+        version = preview.pages['api.md'][0]
+        (tmpdir / 'message.txt').write_text("Hello Preview!\n")
+        os.utime(str(tmpdir / 'message.txt'), (0, 0))
+        self.assertEqual(preview.update(), ['api.md'])
+        self.assertIn('Hello Preview!', preview.pages['api.md'][1])
+        self.assertEqual(preview.wait('api.md', version, timeout=0), preview.pages['api.md'])
+
+        # parse errors are shown in the page
+        (tmpdir / 'other.md').write_text(
+            "# GET /other\n"
+            "+ Response OK\n"
+        )
+        os.utime(str(tmpdir / 'other.md'), (0, 0))
+        self.assertEqual(preview.update(), ['other.md'])
+        self.assertIn('other.md:2: Unknown response type: Response OK', preview.pages['other.md'][1])
+
+        # errors on reading are shown in the page
+        (tmpdir / 'other.md').write_text("<!-- include(unknown.md) -->\n")
+        os.utime(str(tmpdir / 'other.md'), (1, 1))
+        self.assertEqual(preview.update(), ['other.md'])
+        self.assertIn('Fail to read API Blueprint', preview.pages['other.md'][1])
+
+    def test_events_url(self):
+        self.assertEqual(events_url(u"it's <b>.md"), '"/_events/it%27s%20%3Cb%3E.md"')
@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+import socket
+import threading
+import unittest
+from sphinx_testing import with_tmpdir
+from sphinxcontrib.apiblueprint.stub import MAX_HEADER_SIZE, RouteTable, build_routes, load_blueprint, serve
+
+
+class TestCase(unittest.TestCase):
+    def prepare(self, tmpdir):
+        (tmpdir / 'api.md').write_text(
+            "# Message [/messages/{id}{?format}]\n"
+            "+ Model (application/json)\n"
+            "    + Headers\n"
+            "\n"
+            "            X-Model: 1\n"
+            "\n"
+            "    + Body\n"
+            "\n"
+            "            {\"id\": 1}\n"
+            "\n"
+            "## Show [GET]\n"
+            "+ Response 200\n"
+            "\n"
+            "    [Message][]\n"
+            "\n"
+            "## Delete [DELETE]\n"
+            "+ Response 404 (text/plain)\n"
+            "\n"
+            "        Not Found\n"
+            "\n"
+            "+ Response 204\n"
+            "\n"
+            "# GET /messages{?page}\n"
+            "+ Response 200 (text/plain)\n"
+            "    + Headers\n"
+            "\n"
+            "            X-Total-Count: 1\n"
+            "\n"
+            "    + Body\n"
+            "\n"
+            "            Hello World!\n"
+            "\n"
+            "# GET /files/{name}.txt\n"
+            "+ Response 200 (text/plain)\n"
+            "\n"
+            "        file\n"
+        )
+        return build_routes([load_blueprint(str(tmpdir), 'api.md')])
+
+    @with_tmpdir
+    def test_routes(self, tmpdir):
+        routes = self.prepare(tmpdir)
+        self.assertEqual(routes.lookup(b'GET', b'/messages?page=2'),
+                         b'HTTP/1.1 200 OK\r\n'
+                         b'Content-Type: text/plain\r\n'
+                         b'X-Total-Count: 1\r\n'
+                         b'Content-Length: 12\r\n'
+                         b'\r\n'
+                         b'Hello World!')
+        self.assertEqual(routes.lookup(b'GET', b'/messages/1'),
+                         b'HTTP/1.1 200 OK\r\n'
+                         b'Content-Type: application/json\r\n'
+                         b'X-Model: 1\r\n'
+                         b'Content-Length: 9\r\n'
+                         b'\r\n'
+                         b'{"id": 1}')
+        self.assertTrue(routes.lookup(b'DELETE', b'/messages/1').startswith(b'HTTP/1.1 204 No Content\r\n'))
+        self.assertTrue(routes.lookup(b'GET', b'/files/hello.txt').endswith(b'\r\n\r\nfile'))
+        self.assertIs(routes.lookup(b'GET', b'/files/hello.json'), routes.NOT_FOUND)
+        self.assertIs(routes.lookup(b'GET', b'/messages/'), routes.NOT_FOUND)
+        self.assertIs(routes.lookup(b'GET', b'/messages/1/comments'), routes.NOT_FOUND)
+        self.assertIs(routes.lookup(b'POST', b'/messages'), routes.NOT_FOUND)
+
+        # HEAD is answered with the headers of GET
+        self.assertEqual(routes.lookup(b'HEAD', b'/messages?page=2'),
+                         b'HTTP/1.1 200 OK\r\n'
+                         b'Content-Type: text/plain\r\n'
+                         b'X-Total-Count: 1\r\n'
+                         b'Content-Length: 12\r\n'
+                         b'\r\n')
+        self.assertTrue(routes.lookup(b'HEAD', b'/unknown').endswith(b'Content-Length: 9\r\n\r\n'))
+
+    def test_routes_specificity(self):
+        routes = RouteTable()
+        routes.add('GET', '/items/{id}', b'item')
+        routes.add('GET', '/items/{id}.json', b'json')
+        routes.add('GET', '/items/new', b'new')
+        routes.add('GET', '/files/{+path}', b'file')
+        routes.add('GET', '/files/{name}', b'name')
+        routes.add('GET', '/files/{+path}/raw', b'raw')
+
+        self.assertEqual(routes.lookup(b'GET', b'/items/1'), b'item')
+        self.assertEqual(routes.lookup(b'GET', b'/items/1.json'), b'json')
+        self.assertEqual(routes.lookup(b'GET', b'/items/new'), b'new')
+        self.assertEqual(routes.lookup(b'GET', b'/files/a'), b'name')
+        self.assertEqual(routes.lookup(b'GET', b'/files/a/b/c.txt'), b'file')
+        self.assertEqual(routes.lookup(b'GET', b'/files/a/b/raw'), b'raw')
+        self.assertIs(routes.lookup(b'GET', b'/files/'), routes.NOT_FOUND)
+
+    @with_tmpdir
+    def test_serve(self, tmpdir):
+        routes = self.prepare(tmpdir)
+        ready = threading.Event()
+        state = {}
+
+        def on_ready(port):
+            import asyncio
+            state['loop'] = asyncio.get_event_loop()
+            state['port'] = port
+            ready.set()
+
+        thread = threading.Thread(target=serve, args=(routes, '127.0.0.1', 0, on_ready))
+        thread.start()
+        try:
+            ready.wait(10)
+            client = socket.create_connection(('127.0.0.1', state['port']))
+            try:
+                # pipelined requests (the first one has a body)
+                client.sendall(b'POST /messages HTTP/1.1\r\nHost: localhost\r\nContent-Length: 5\r\n\r\nHello'
+                               b'GET /messages HTTP/1.1\r\nHost: localhost\r\n\r\n')
+                expected = routes.NOT_FOUND + routes.lookup(b'GET', b'/messages')
+                received = b''
+                while len(received) < len(expected):
+                    received += client.recv(65536)
+                self.assertEqual(received, expected)
+            finally:
+                client.close()
+        finally:
+            state['loop'].call_soon_threadsafe(state['loop'].stop)
+            thread.join()
+
+    @with_tmpdir
+    def test_serve_rejects(self, tmpdir):
+        routes = self.prepare(tmpdir)
+        ready = threading.Event()
+        state = {}
+
+        def on_ready(port):
+            import asyncio
+            state['loop'] = asyncio.get_event_loop()
+            state['port'] = port
+            ready.set()
+
+        def request(data):
+            client = socket.create_connection(('127.0.0.1', state['port']))
+            try:
+                client.sendall(data)
+                received = b''
+                while True:
+                    chunk = client.recv(65536)
+                    if not chunk:
+                        return received  # closed by the server
+                    received += chunk
+            finally:
+                client.close()
+
+        thread = threading.Thread(target=serve, args=(routes, '127.0.0.1', 0, on_ready))
+        thread.start()
+        try:
+            ready.wait(10)
+            received = request(b'GET /messages HTTP/1.1\r\n\r\n'
+                               b'POST /messages HTTP/1.1\r\nTransfer-Encoding: chunked\r\n\r\n5\r\nHello\r\n')
+            self.assertEqual(received, routes.lookup(b'GET', b'/messages') + routes.NOT_IMPLEMENTED)
+
+            received = request(b'POST /messages HTTP/1.1\r\nContent-Length: 1000000000\r\n\r\n')
+            self.assertEqual(received, routes.BODY_TOO_LARGE)
+
+            received = request(b'GET /messages HTTP/1.1\r\nX-Large: ' + b'x' * MAX_HEADER_SIZE)
+            self.assertEqual(received, routes.HEADER_TOO_LARGE)
+        finally:
+            state['loop'].call_soon_threadsafe(state['loop'].stop)
+            thread.join()
@@ -1,7 +1,7 @@
 import unittest
 from docutils import nodes
 from sphinxcontrib.apiblueprint import addnodes
-from sphinxcontrib.apiblueprint.utils import detect_section_type
+from sphinxcontrib.apiblueprint.utils import detect_section_type, group_docnames, split_blueprint
 
 
 class TestCase(unittest.TestCase):
@@ -87,3 +87,29 @@ class TestCase(unittest.TestCase):
         for method in http_methods:
             self.assertEqual(addnodes.Action, detect_section_type("header", node2title(method)))
             self.assertEqual(None, detect_section_type("list", node2title(method)))
+
+    def test_split_blueprint(self):
+        content = ("FORMAT: 1A\n"
+                   "# Example API\n"
+                   "# Group Blog Posts\n"
+                   "## GET /posts\n"
+                   "```\n"
+                   "# Group Not a heading\n"
+                   "```\n"
+                   "# Group Comments\n"
+                   "## GET /comments\n"
+                   "# Data Structures\n"
+                   "## Post (object)\n")
+        self.assertEqual(split_blueprint(content),
+                         ["FORMAT: 1A\n# Example API\n",
+                          "# Group Blog Posts\n## GET /posts\n```\n# Group Not a heading\n```\n",
+                          "# Group Comments\n## GET /comments\n",
+                          "# Data Structures\n## Post (object)\n"])
+
+        self.assertEqual(split_blueprint("# GET /posts\n"), ["# GET /posts\n"])
+
+    def test_group_docnames(self):
+        chunks = ["# Group Blog Posts\n", "# Group Blog Posts\n", "# Data Structures\n"]
+        self.assertEqual(group_docnames('subdir/index', 'api.md', chunks),
+                         ['subdir/api/group-blog-posts', 'subdir/api/group-blog-posts-1',
+                          'subdir/api/data-structures'])
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+import unittest
+from sphinx_testing import with_app
+from sphinxcontrib.apiblueprint import validation
+from sphinxcontrib.apiblueprint.ir import Payload
+
+try:
+    import jsonschema
+except ImportError:
+    jsonschema = None
+
+SCHEMA = '{"type": "object", "required": ["id"], "properties": {"id": {"type": "integer"}}}'
+
+
+@unittest.skipIf(jsonschema is None, 'jsonschema is not installed')
+class TestCase(unittest.TestCase):
+    def test_validate_payload(self):
+        def validate(body, schema=SCHEMA, content_type='application/json'):
+            return validation.validate_payload(Payload(content_type=content_type, body=body, schema=schema))
+
+        self.assertIsNone(validate('{"id": 1}'))
+        self.assertIsNone(validate('{"id": 1}', schema=None))
+        self.assertIsNone(validate('<id>1</id>', content_type='application/xml'))
+        self.assertEqual(validate('{}'), "Body does not match the Schema: 'id' is a required property")
+        self.assertEqual(validate('{"id": "1"}'),
+                         "Body does not match the Schema: '1' is not of type 'integer' (at id)")
+        self.assertTrue(validate('{"id": ').startswith('Body is not a valid JSON: '))
+        self.assertTrue(validate('{}', schema='{"type": ').startswith('Schema is not a valid JSON: '))
+        self.assertTrue(validate('{}', schema='{"type": 1}').startswith('Schema is not a valid JSON Schema: '))
+
+    def test_validator_cache(self):
+        cache = validation.ValidatorCache(maxsize=2)
+        validator, _ = cache.get(SCHEMA)
+        self.assertIs(cache.get(SCHEMA)[0], validator)
+        self.assertEqual(cache.compiled, 1)
+
+        cache.get('{"type": "string"}')
+        cache.get('{"type": "integer"}')
+        self.assertIsNot(cache.get(SCHEMA)[0], validator)  # evicted
+        self.assertEqual(cache.compiled, 4)
+
+    @with_app(srcdir='tests/template', copy_srcdir_to_tmpdir=True,
+              confoverrides={'apiblueprint_validate_bodies': True})
+    def test_validate_bodies(self, app, status, warnings):
+        schema = ("    + Schema\n"
+                  "\n"
+                  "            " + SCHEMA + "\n"
+                  "\n")
+        (app.srcdir / 'api.md').write_text(
+            "# GET /messages/1\n"
+            "+ Response 200 (application/json)\n"
+            "    + Body\n"
+            "\n"
+            "            {\"id\": 1}\n"
+            "\n" + schema +
+            "# GET /messages/2\n"
+            "+ Response 200 (application/json)\n"
+            "    + Body\n"
+            "\n"
+            "            {\"id\": \"2\"}\n"
+            "\n" + schema
+        )
+        validation.cache.compiled = 0
+        app.build()
+        print(status.getvalue(), warnings.getvalue())
+        self.assertNotIn('GET /messages/1:', warnings.getvalue())
+        self.assertIn("api.md:", warnings.getvalue())
+        self.assertIn("WARNING: GET /messages/2: Response 200: "
+                      "Body does not match the Schema: '2' is not of type 'integer' (at id)",
+                      warnings.getvalue())
+        self.assertLessEqual(validation.cache.compiled, 1)  # the shared schema is compiled once
+
+    @with_app(srcdir='tests/template', copy_srcdir_to_tmpdir=True)
+    def test_validate_bodies_disabled(self, app, status, warnings):
+        (app.srcdir / 'api.md').write_text(
+            "# GET /messages/1\n"
+            "+ Response 200 (application/json)\n"
+            "    + Body\n"
+            "\n"
+            "            {}\n"
+            "\n"
+            "    + Schema\n"
+            "\n"
+            "            " + SCHEMA + "\n"
+        )
+        app.build()
+        print(status.getvalue(), warnings.getvalue())
+        self.assertNotIn('Body does not match the Schema', warnings.getvalue())